@@ -1,17 +1,31 @@
 import streamlit as st
 import time
-import hashlib
-from modules.database import init_db, get_connection, log_action, get_hash
-from modules.views_emp import render_employee_view
-from modules.views_mgr import render_manager_view
-from modules.views_hr import render_hr_view
-from modules.views_admin import render_admin_view
+import importlib
+from modules.database import log_action
+from modules.auth import authenticate
+from modules import profiler, bootstrap
+
+# Pogledi (i s njima pandas/plotly) se uvoze tek kad su prvi put odabrani, pa ekran za
+# prijavu i novi worker ne plaćaju njihov import (vidi tools/import_benchmark.py)
+VIEWS = {
+    "admin": ("modules.views_admin", "render_admin_view"),
+    "hr": ("modules.views_hr", "render_hr_view"),
+    "manager": ("modules.views_mgr", "render_manager_view"),
+    "employee": ("modules.views_emp", "render_employee_view"),
+}
+
+def load_view(name):
+    module, func = VIEWS[name]
+    return getattr(importlib.import_module(module), func)
 
 # Postavke stranice
 st.set_page_config(page_title="Talent App", layout="wide", page_icon="⭐")
 
-# Inicijalizacija baze
-init_db()
+# Profiler upita (opt-in): mjeri cijeli rerun
+profiler.begin_run(st.session_state.get('username'))
+
+# Inicijalizacija baze i cacheva - jednom po procesu, rerun ne izvodi DDL
+bootstrap.ensure_ready()
 
 if 'logged_in' not in st.session_state:
     st.session_state['logged_in'] = False
@@ -28,34 +42,24 @@ if not st.session_state['logged_in']:
             p = st.text_input("Lozinka", type="password")
             
             if st.form_submit_button("Prijava"):
-                h = get_hash(p)
-                
-                # --- NOVO: Provjera je li korisnik aktivan (active=1) ---
-                conn = get_connection()
-                query = """
-                    SELECT u.role, u.company_id, u.department 
-                    FROM users u
-                    JOIN employees_master e ON u.username = e.kadrovski_broj
-                    WHERE u.username=? AND u.password=? AND e.active=1
-                """
-                user = conn.execute(query, (str(u).strip(), h)).fetchone()
-                conn.close()
+                # Provjera lozinke, aktivnosti računa (active=1) i limita pokušaja je u auth.authenticate
+                user, err = authenticate(u, p)
                 
                 if user:
                     st.session_state['logged_in'] = True
                     st.session_state['username'] = u
-                    st.session_state['role'] = user[0]
-                    st.session_state['company_id'] = user[1]
-                    st.session_state['department'] = user[2]
+                    st.session_state['role'] = user['role']
+                    st.session_state['company_id'] = user['company_id']
+                    st.session_state['department'] = user['department']
                     
                     # Logiranje prijave
-                    log_action(u, "LOGIN", "Uspješna prijava", user[1])
+                    log_action(u, "LOGIN", "Uspješna prijava", user['company_id'])
                     
                     st.success(f"Dobrodošli, {u}!")
                     time.sleep(0.5)
                     st.rerun()
                 else:
-                    st.error("Neispravni podaci ili je korisnički račun neaktivan.")
+                    st.error(err)
 
 # --- GLAVNI IZBORNIK NAKON PRIJAVE ---
 else:
@@ -73,18 +77,20 @@ else:
     # Rutiranje po rolama
     if role == 'SuperAdmin':
         mode = st.sidebar.radio("MODUL:", ["🛡️ Super Admin Konzola", "📊 HR Panel (Glavno)"])
-        if mode == "🛡️ Super Admin Konzola": render_admin_view()
-        else: render_hr_view()
+        view = load_view("admin" if mode == "🛡️ Super Admin Konzola" else "hr")
 
     elif role == 'HR':
         mode = st.sidebar.radio("MODUL:", ["📊 HR Panel", "👤 Moj Profil"])
-        if mode == "📊 HR Panel": render_hr_view()
-        else: render_employee_view()
+        view = load_view("hr" if mode == "📊 HR Panel" else "employee")
 
     elif role == 'Manager':
         mode = st.sidebar.radio("MODUL:", ["👔 Voditeljski pogled", "👤 Moj profil"])
-        if mode == "👔 Voditeljski pogled": render_manager_view()
-        else: render_employee_view()
+        view = load_view("manager" if mode == "👔 Voditeljski pogled" else "employee")
 
     else: 
-        render_employee_view()
\ No newline at end of file
+        mode, view = "👤 Moj profil", load_view("employee")
+
+    with profiler.view(mode):
+        view()
+
+profiler.end_run()
\ No newline at end of file
@@ -0,0 +1,279 @@
+# modules/audit.py
+import atexit
+import glob
+import gzip
+import os
+import queue
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date
+
+from modules.db_pool import get_pool
+from modules.constants import (
+    AUDIT_QUEUE_SIZE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_SECONDS, AUDIT_RETENTION_MONTHS, AUDIT_PAGE_SIZE
+)
+
+# Audit zapisi se ne pišu u niti koja obrađuje zahtjev: log_action samo stavlja red u
+# ograničeni red čekanja, a pozadinska nit ih skuplja i upisuje jednim executemany po
+# batchu (po veličini ili nakon AUDIT_FLUSH_SECONDS). Ako je red pun, zapis se odbacuje
+# i broji - prijava korisnika nikad ne čeka na audit log.
+
+INSERT_SQL = "INSERT INTO audit_log (timestamp, user, action, details, company_id) VALUES (?,?,?,?,?)"
+
+_STOP = object()
+
+
+class AuditWriter:
+    """Pozadinski pisač audit loga s batchiranim flushom."""
+
+    def __init__(self, db_file, max_queue=AUDIT_QUEUE_SIZE, batch_size=AUDIT_BATCH_SIZE,
+                 flush_interval=AUDIT_FLUSH_SECONDS):
+        self.db_file = db_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._metrics = {"submitted": 0, "written": 0, "batches": 0, "dropped": 0, "failed": 0, "last_error": None}
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._metrics[key] += n
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, row):
+        """Stavlja red (timestamp, user, action, details, company_id) u red čekanja. Ne blokira."""
+        self.start()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("submitted")
+        return True
+
+    def flush(self, timeout=5.0):
+        """Čeka da se svi do sada predani zapisi upišu. Vraća False ako nije stiglo na vrijeme."""
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def stop(self, timeout=5.0):
+        """Upisuje preostale zapise i zaustavlja nit (poziva se i iz atexit)."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._metrics)
+        out["queued"] = self._queue.qsize()
+        out["running"] = self._thread is not None and self._thread.is_alive()
+        return out
+
+    def _write(self, batch):
+        if not batch: return
+        try:
+            with get_pool(self.db_file).writer() as conn:
+                conn.executemany(INSERT_SQL, batch)
+            self._count("written", len(batch))
+            self._count("batches")
+        except Exception as e:
+            self._count("failed", len(batch))
+            with self._lock:
+                self._metrics["last_error"] = str(e)
+            print(f"Audit log: {len(batch)} zapisa nije upisano: {e}")
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._write(batch)
+                return
+            if isinstance(item, threading.Event):
+                self._write(batch)
+                batch, deadline = [], None
+                item.set()
+                continue
+            if item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if len(batch) >= self.batch_size or (batch and time.monotonic() >= deadline):
+                self._write(batch)
+                batch, deadline = [], None
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_audit_writer(db_file):
+    """Process-wide pisač za zadanu bazu (nit se pokreće pri prvom zapisu)."""
+    with _writers_lock:
+        writer = _writers.get(db_file)
+        if writer is None:
+            writer = _writers[db_file] = AuditWriter(db_file)
+        return writer
+
+
+@atexit.register
+def shutdown():
+    """Flush svih pisača pri gašenju procesa."""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.stop()
+
+
+# --- UPITI (keyset paginacija) ---
+# Stranice idu od najnovijeg prema starijem; kursor je (timestamp, id) zadnjeg reda stranice,
+# pa sljedeća stranica kreće od indeksa umjesto preskakanja OFFSET redova.
+
+def query_audit_log(conn, company_id=None, user=None, action=None, start=None, end=None,
+                    after=None, limit=AUDIT_PAGE_SIZE):
+    """Vraća (redovi, kursor_sljedeće_stranice ili None). start/end su 'YYYY-MM-DD HH:MM:SS', end je isključiv."""
+    clauses, params = [], []
+    for col, val in (("company_id", company_id), ("user", user), ("action", action)):
+        if val is not None:
+            clauses.append(f"{col} = ?")
+            params.append(val)
+    if start:
+        clauses.append("timestamp >= ?")
+        params.append(start)
+    if end:
+        clauses.append("timestamp < ?")
+        params.append(end)
+    if after:
+        ts, last_id = after
+        clauses.append("timestamp <= ? AND (timestamp < ? OR id < ?)")
+        params += [ts, ts, last_id]
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = conn.execute(f"""
+        SELECT id, timestamp, user, action, details, company_id FROM audit_log {where}
+        ORDER BY timestamp DESC, id DESC LIMIT ?
+    """, params + [limit + 1]).fetchall()
+    rows = [dict(r) for r in rows]
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, (rows[-1]["timestamp"], rows[-1]["id"])
+    return rows, None
+
+def audit_actions(conn, company_id=None):
+    """Popis različitih akcija (za filter u pregledu)."""
+    if company_id is None:
+        return [r[0] for r in conn.execute("SELECT DISTINCT action FROM audit_log ORDER BY action")]
+    return [r[0] for r in conn.execute("SELECT DISTINCT action FROM audit_log WHERE company_id=? ORDER BY action", (company_id,))]
+
+# --- ARHIVIRANJE ---
+# Mjeseci stariji od AUDIT_RETENTION_MONTHS sele se u archive_dir/audit_YYYY-MM.db.gz
+# (SQLite datoteka s istom tablicom audit_log i indeksima, komprimirana gzipom).
+# Redoslijed je siguran za prekid: prvo se zapiše arhiva, tek onda brišu redovi iz žive baze;
+# ponovno pokretanje samo dopuni arhivu (INSERT OR IGNORE po id-u).
+
+ARCHIVE_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS audit_log (id INTEGER PRIMARY KEY, timestamp TEXT, user TEXT, action TEXT, details TEXT, company_id INTEGER)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_time ON audit_log (timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_company_time ON audit_log (company_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_user_time ON audit_log (user, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_action_time ON audit_log (action, timestamp)",
+]
+
+def _month_start(year, month):
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return f"{year:04d}-{month:02d}-01 00:00:00"
+
+def _archive_path(archive_dir, month):
+    return os.path.join(archive_dir, f"audit_{month}.db.gz")
+
+def _gunzip(src, dst):
+    with gzip.open(src, "rb") as fin, open(dst, "wb") as fout:
+        shutil.copyfileobj(fin, fout)
+
+def _gzip(src, dst):
+    tmp = dst + ".tmp"
+    with open(src, "rb") as fin, gzip.open(tmp, "wb") as fout:
+        shutil.copyfileobj(fin, fout)
+    os.replace(tmp, dst)
+
+def archive_audit_log(db_file, archive_dir, retention_months=AUDIT_RETENTION_MONTHS, today=None):
+    """Seli zapise starije od retention_months u mjesečne arhive. Vraća {'YYYY-MM': broj_redova}."""
+    today = today or date.today()
+    cutoff = _month_start(today.year, today.month - retention_months)
+    pool = get_pool(db_file)
+    with pool.reader() as conn:
+        months = [r[0] for r in conn.execute(
+            "SELECT DISTINCT substr(timestamp, 1, 7) FROM audit_log WHERE timestamp < ? ORDER BY 1", (cutoff,))]
+    if not months: return {}
+
+    os.makedirs(archive_dir, exist_ok=True)
+    moved = {}
+    for month in months:
+        y, m = int(month[:4]), int(month[5:7])
+        lo, hi = _month_start(y, m), min(_month_start(y, m + 1), cutoff)
+        path = _archive_path(archive_dir, month)
+        fd, work = tempfile.mkstemp(suffix=".db", dir=archive_dir)
+        os.close(fd)
+        try:
+            if os.path.exists(path): _gunzip(path, work)
+            with pool.writer() as conn:
+                conn.execute("ATTACH DATABASE ? AS arch", (work,))
+                try:
+                    for sql in ARCHIVE_SCHEMA:
+                        conn.execute(sql.replace("EXISTS ", "EXISTS arch.", 1))
+                    max_id = conn.execute("SELECT MAX(id) FROM audit_log WHERE timestamp >= ? AND timestamp < ?", (lo, hi)).fetchone()[0]
+                    conn.execute("""INSERT OR IGNORE INTO arch.audit_log (id, timestamp, user, action, details, company_id)
+                                    SELECT id, timestamp, user, action, details, company_id FROM audit_log
+                                    WHERE timestamp >= ? AND timestamp < ? AND id <= ?""", (lo, hi, max_id))
+                    conn.commit()
+                finally:
+                    if conn.in_transaction: conn.rollback()
+                    conn.execute("DETACH DATABASE arch")
+            _gzip(work, path)
+            # Arhiva je na disku - tek sada brišemo iz žive baze
+            with pool.writer() as conn:
+                cur = conn.execute("DELETE FROM audit_log WHERE timestamp >= ? AND timestamp < ? AND id <= ?", (lo, hi, max_id))
+                moved[month] = cur.rowcount
+        finally:
+            if os.path.exists(work): os.remove(work)
+    return moved
+
+def list_audit_archives(archive_dir):
+    """[(mjesec 'YYYY-MM', putanja)] od najnovijeg prema starijem."""
+    paths = glob.glob(os.path.join(archive_dir, "audit_*.db.gz"))
+    return sorted(((os.path.basename(p)[6:13], p) for p in paths), reverse=True)
+
+def open_audit_archive(path):
+    """Read-only konekcija na raspakiranu arhivu (raspakirana kopija se čuva u temp direktoriju)."""
+    cache_dir = os.path.join(tempfile.gettempdir(), "talent_audit_archive")
+    os.makedirs(cache_dir, exist_ok=True)
+    plain = os.path.join(cache_dir, os.path.basename(path)[:-3])
+    if not os.path.exists(plain) or os.path.getmtime(plain) < os.path.getmtime(path):
+        _gunzip(path, plain + ".tmp")
+        os.replace(plain + ".tmp", plain)
+    conn = sqlite3.connect(f"file:{plain}?mode=ro", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
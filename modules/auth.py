@@ -1,8 +1,105 @@
 # auth.py (Ostaje skoro isti, samo mala provjera)
 import streamlit as st
-import pandas as pd
-from modules.database import get_connection, perform_backup, log_action, get_active_period_info
-from modules.utils import check_hashes
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from modules.database import read_connection, write_connection, perform_backup, log_action, get_active_period_info
+from modules.utils import check_hashes, make_hashes, needs_rehash
+from modules.constants import (
+    LOGIN_HASH_WORKERS, LOGIN_HASH_TIMEOUT, LOGIN_MAX_FAILURES, LOGIN_LOCKOUT_SECONDS, LOGIN_NEGATIVE_TTL,
+    LOGIN_TRACKED_MAX
+)
+
+# --- BRZA PRIJAVA ---
+# Provjera lozinke (scrypt) radi u malom poolu niti, pa val prijava ne zauzme Streamlit niti.
+# Nepostojeći/neaktivni korisnici pamte se LOGIN_NEGATIVE_TTL sekundi, a nakon LOGIN_MAX_FAILURES
+# neuspjelih pokušaja korisničko ime je zaključano LOGIN_LOCKOUT_SECONDS - u oba slučaja bez upita u bazu.
+# Oba rječnika su ograničena na LOGIN_TRACKED_MAX imena: pri upisu u pun rječnik brišu se istekli
+# zapisi, a ako ih nema dovoljno, najstariji.
+
+_hash_pool = ThreadPoolExecutor(max_workers=LOGIN_HASH_WORKERS, thread_name_prefix="login-hash")
+_lock = threading.Lock()
+_failures = {}   # username -> [vremena neuspjelih pokušaja]
+_unknown = {}    # username -> istek negativnog cachea
+
+MSG_INVALID = "Neispravni podaci ili je korisnički račun neaktivan."
+MSG_LOCKED = "Previše neuspjelih pokušaja. Pokušajte ponovno za nekoliko minuta."
+MSG_BUSY = "Sustav je trenutno preopterećen. Pokušajte ponovno za nekoliko trenutaka."
+
+def _is_locked(username, now):
+    recent = [t for t in _failures.get(username, []) if now - t < LOGIN_LOCKOUT_SECONDS]
+    if recent: _failures[username] = recent
+    else: _failures.pop(username, None)
+    return len(recent) >= LOGIN_MAX_FAILURES
+
+def _make_room(entries, expired):
+    """Poziva se pod _lock prije upisa novog imena: pun rječnik se čisti na 90% kapaciteta."""
+    if len(entries) < LOGIN_TRACKED_MAX: return
+    for key in [k for k, v in entries.items() if expired(v)]:
+        del entries[key]
+    # Rječnici čuvaju redoslijed upisa, pa su prvi ključevi najstariji
+    for key in list(entries)[:max(0, len(entries) - LOGIN_TRACKED_MAX * 9 // 10)]:
+        del entries[key]
+
+def _record_failure(username):
+    now = time.monotonic()
+    with _lock:
+        if username not in _failures:
+            _make_room(_failures, lambda times: now - times[-1] >= LOGIN_LOCKOUT_SECONDS)
+        _failures.setdefault(username, []).append(now)
+
+def invalidate_login_cache(username=None):
+    """Briše negativni cache (npr. nakon kreiranja novih korisničkih računa)."""
+    with _lock:
+        if username is None: _unknown.clear()
+        else: _unknown.pop(username, None)
+
+def _verify(password, stored):
+    """Izvršava se u poolu: provjera i, po potrebi, novi hash u trenutnom formatu."""
+    if not check_hashes(password, stored): return False, None
+    return True, make_hashes(password) if needs_rehash(stored) else None
+
+def authenticate(username, password):
+    """Vraća (dict s role/company_id/department, None) ili (None, poruka greške)."""
+    username = str(username).strip()
+    now = time.monotonic()
+    with _lock:
+        if _is_locked(username, now): return None, MSG_LOCKED
+        if _unknown.get(username, 0) > now: return None, MSG_INVALID
+
+    with read_connection() as conn:
+        row = conn.execute("""
+            SELECT u.password, u.role, u.company_id, u.department
+            FROM users u
+            JOIN employees_master e ON u.username = e.kadrovski_broj
+            WHERE u.username=? AND e.active=1
+        """, (username,)).fetchone()
+    if row is None:
+        with _lock:
+            _unknown.pop(username, None)
+            _make_room(_unknown, lambda expires: expires <= now)
+            _unknown[username] = now + LOGIN_NEGATIVE_TTL
+        _record_failure(username)
+        return None, MSG_INVALID
+
+    future = _hash_pool.submit(_verify, password, row[0])
+    try:
+        ok, new_hash = future.result(timeout=LOGIN_HASH_TIMEOUT)
+    except FuturesTimeoutError:
+        # Pool je zagušen; provjera koja još nije krenula se otkazuje i ne broji kao neuspjeh
+        future.cancel()
+        return None, MSG_BUSY
+    if not ok:
+        _record_failure(username)
+        return None, MSG_INVALID
+
+    with _lock:
+        _failures.pop(username, None)
+    if new_hash:
+        # Transparentni prelazak na novi format; uvjet na staru vrijednost štiti istovremenu promjenu lozinke
+        with write_connection() as db:
+            db.execute("UPDATE users SET password=? WHERE username=? AND password=?", (new_hash, username, row[0]))
+    return {'role': row[1], 'company_id': row[2], 'department': row[3]}, None
 
 def login_screen():
     col1, col2, col3 = st.columns([1,2,1])
@@ -16,30 +113,28 @@ def login_screen():
         p = st.text_input("Lozinka", type="password", key="login_pass")
         
         if st.button("Prijavi se", use_container_width=True):
-            conn = get_connection()
-            c = conn.cursor()
-            data = c.execute("SELECT password, role, department, company_id FROM users WHERE username=?", (u,)).fetchone()
-            conn.close()
+            data, err = authenticate(u, p)
             
-            if data and check_hashes(p, data[0]):
-                cid = data[3] if data[3] else 1
+            if data:
+                cid = data['company_id'] if data['company_id'] else 1
                 st.session_state.update({
                     'logged_in': True, 
                     'username': u, 
-                    'role': data[1], 
-                    'department': data[2],
+                    'role': data['role'], 
+                    'department': data['department'],
                     'company_id': cid
                 })
                 
                 # Poziv log_action sada radi jer smo je dodali u database.py
                 log_action(u, "LOGIN", "Prijava u sustav", company_id=cid)
                 
-                if data[1] == 'HR':
-                    perform_backup(auto=True)
+                if data['role'] == 'HR':
+                    # U pozadini; perform_backup sam preskače ako je zadnji backup svjež ili baza nepromijenjena
+                    threading.Thread(target=perform_backup, kwargs={'auto': True}, daemon=True).start()
                 
                 st.rerun()
             else:
-                st.error("Pogrešno korisničko ime ili lozinka.")
+                st.error(err)
         
         st.markdown("---")
         st.caption("Verzija: 2.0 (Commercial Edition)")
\ No newline at end of file
@@ -0,0 +1,232 @@
+# modules/backup.py
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from modules.constants import (
+    BACKUP_PAGES_PER_STEP, BACKUP_STEP_SLEEP, BACKUP_COMPRESS, BACKUP_KEEP_COUNT,
+    BACKUP_MAX_AGE_DAYS, BACKUP_AUTO_MIN_INTERVAL
+)
+
+# Online backup u koracima: sqlite3 backup API kopira BACKUP_PAGES_PER_STEP stranica pa
+# pusti bazu BACKUP_STEP_SLEEP sekundi, tako da pisači ne čekaju cijelu kopiju.
+# Svaki backup prolazi PRAGMA integrity_check, a metapodaci (veličina, vrijeme, sha256)
+# se čuvaju u manifest.json pa popis backupa ne čita same datoteke.
+# Duplikati se preskaču: prvo po potpisu datoteka baze (veličina + mtime, uklj. WAL),
+# a ako se potpis promijenio, po sha256 same kopije (npr. samo checkpoint bez novih podataka).
+
+MANIFEST = "manifest.json"
+
+_lock = threading.Lock()
+
+
+def _manifest_path(backup_dir):
+    return os.path.join(backup_dir, MANIFEST)
+
+
+def load_manifest(backup_dir):
+    try:
+        with open(_manifest_path(backup_dir), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def _save_manifest(backup_dir, entries):
+    tmp = _manifest_path(backup_dir) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, _manifest_path(backup_dir))
+
+
+def db_signature(db_file):
+    """Jeftin potpis stanja baze: veličina i mtime glavne datoteke i WAL-a."""
+    sig = []
+    for path in (db_file, db_file + "-wal"):
+        try:
+            st = os.stat(path)
+            sig.append([st.st_size, st.st_mtime_ns])
+        except OSError:
+            sig.append(None)
+    return sig
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _copy_online(db_file, dst_path):
+    src = sqlite3.connect(db_file, timeout=30.0)
+    dst = sqlite3.connect(dst_path)
+    try:
+        # Otvorena transakcija čitanja drži isti WAL snapshot kroz sve korake. Bez nje bi svaki
+        # commit druge konekcije između koraka pokrenuo kopiranje ispočetka (i na zauzetoj bazi
+        # backup nikad ne bi završio); u WAL modu čitač ne blokira pisače.
+        src.execute("BEGIN")
+        src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        src.backup(dst, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP)
+        src.rollback()
+        result = dst.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        dst.close()
+        src.close()
+    return result
+
+
+def create_backup(db_file, backup_dir, kind="MANUAL", compress=BACKUP_COMPRESS, force=False):
+    """Kreira backup ako se baza promijenila od zadnjeg.
+
+    Vraća {'status': 'created'|'skipped'|'failed', 'message': str, 'entry': dict|None}.
+    """
+    if not os.path.exists(db_file):
+        return {"status": "failed", "message": "Baza ne postoji", "entry": None}
+    with _lock:
+        os.makedirs(backup_dir, exist_ok=True)
+        entries = load_manifest(backup_dir)
+        last = entries[-1] if entries else None
+        now = datetime.now()
+
+        if last and not force:
+            if kind == "AUTO" and time.time() - last.get("epoch", 0) < BACKUP_AUTO_MIN_INTERVAL:
+                return {"status": "skipped", "message": "Zadnji backup je svjež", "entry": last}
+            if last.get("signature") == db_signature(db_file):
+                return {"status": "skipped", "message": "Baza nije mijenjana od zadnjeg backupa", "entry": last}
+
+        signature = db_signature(db_file)
+        name = f"{kind}_{now.strftime('%Y%m%d_%H%M%S')}"
+        partial = os.path.join(backup_dir, name + ".db.partial")
+        try:
+            check = _copy_online(db_file, partial)
+            if check != "ok":
+                return {"status": "failed", "message": f"Integrity check: {check}", "entry": None}
+            sha = _sha256(partial)
+            if last and not force and last.get("sha256") == sha:
+                # Isti sadržaj - samo osvježimo potpis da sljedeći put preskočimo bez kopiranja
+                last["signature"] = signature
+                _save_manifest(backup_dir, entries)
+                return {"status": "skipped", "message": "Sadržaj baze je isti kao u zadnjem backupu", "entry": last}
+
+            db_size = os.path.getsize(partial)
+            if compress:
+                fname = name + ".db.gz"
+                with open(partial, "rb") as fin, gzip.open(os.path.join(backup_dir, fname + ".tmp"), "wb") as fout:
+                    shutil.copyfileobj(fin, fout)
+                os.replace(os.path.join(backup_dir, fname + ".tmp"), os.path.join(backup_dir, fname))
+            else:
+                fname = name + ".db"
+                os.replace(partial, os.path.join(backup_dir, fname))
+        finally:
+            if os.path.exists(partial): os.remove(partial)
+
+        entry = {
+            "file": fname,
+            "kind": kind,
+            "created": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "epoch": time.time(),
+            "size": os.path.getsize(os.path.join(backup_dir, fname)),
+            "db_size": db_size,
+            "sha256": sha,
+            "compressed": bool(compress),
+            "integrity": check,
+            "signature": signature,
+        }
+        entries.append(entry)
+        removed = _apply_retention(backup_dir, entries)
+        _save_manifest(backup_dir, entries)
+        msg = f"Backup {fname} kreiran"
+        if removed: msg += f", obrisano starih: {len(removed)}"
+        return {"status": "created", "message": msg, "entry": entry}
+
+
+def _apply_retention(backup_dir, entries):
+    """Briše backupe starije od BACKUP_MAX_AGE_DAYS i višak iznad BACKUP_KEEP_COUNT (najnoviji ostaje uvijek)."""
+    cutoff = time.time() - BACKUP_MAX_AGE_DAYS * 86400
+    keep = [e for e in entries if e.get("epoch", 0) >= cutoff][-BACKUP_KEEP_COUNT:]
+    if not keep and entries: keep = entries[-1:]
+    removed = [e for e in entries if e not in keep]
+    for e in removed:
+        try:
+            os.remove(os.path.join(backup_dir, e["file"]))
+        except OSError:
+            pass
+    entries[:] = keep
+    return removed
+
+
+def _prepare_restore(path, entry, work):
+    """Raspakira backup u work i provjerava sha256 (prema manifestu) i integritet. Vraća None ili poruku greške."""
+    if entry.get("compressed"):
+        with gzip.open(path, "rb") as fin, open(work, "wb") as fout:
+            shutil.copyfileobj(fin, fout)
+    else:
+        shutil.copyfile(path, work)
+    if entry.get("sha256") and _sha256(work) != entry["sha256"]:
+        return "Kontrolni zbroj (sha256) ne odgovara manifestu"
+    conn = sqlite3.connect(f"file:{work}?mode=ro", uri=True)
+    try:
+        check = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        has_users = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='users'").fetchone()
+    except sqlite3.DatabaseError as e:
+        return f"Datoteka nije ispravna SQLite baza: {e}"
+    finally:
+        conn.close()
+    if check != "ok": return f"Integrity check: {check}"
+    if not has_users: return "Backup ne sadrži tablicu users"
+    return None
+
+
+def restore_backup(db_file, backup_dir, fname, pool):
+    """Vraća bazu iz backupa fname (mora biti u manifestu).
+
+    Backup se prvo raspakira i provjeri, zatim se trenutno stanje sprema kao PRERESTORE backup,
+    a sadržaj se kopira u živu bazu backup API-jem preko pisača iz poola - pisanja iz procesa
+    čekaju, a čitači do kraja kopiranja vide staro stanje.
+    Vraća {'status': 'restored'|'failed', 'message': str}.
+    """
+    entry = next((e for e in load_manifest(backup_dir) if e["file"] == fname), None)
+    path = os.path.join(backup_dir, fname)
+    if entry is None or not os.path.exists(path):
+        return {"status": "failed", "message": f"Backup {fname} ne postoji"}
+
+    work = os.path.join(backup_dir, fname + ".restore")
+    try:
+        error = _prepare_restore(path, entry, work)
+        if error: return {"status": "failed", "message": error}
+
+        # Trenutno stanje se čuva (preskače se ako je već u zadnjem backupu)
+        safety = create_backup(db_file, backup_dir, kind="PRERESTORE")
+        if safety["status"] == "failed":
+            return {"status": "failed", "message": f"Sigurnosni backup nije uspio: {safety['message']}"}
+
+        with _lock, pool.writer() as conn:
+            src = sqlite3.connect(work)
+            try:
+                src.backup(conn)
+            finally:
+                src.close()
+    finally:
+        if os.path.exists(work): os.remove(work)
+
+    # Slobodne konekcije poola mogu imati zastarjelu shemu u cacheu - otvaraju se nove
+    pool.close_idle()
+    return {"status": "restored", "message": f"Baza vraćena iz {fname} (prethodno stanje: {safety['entry']['file']})"}
+
+
+def list_backups(backup_dir):
+    """Backupi iz manifesta, najnoviji prvi, s apsolutnom putanjom (bez čitanja samih datoteka)."""
+    out = []
+    for e in reversed(load_manifest(backup_dir)):
+        path = os.path.join(backup_dir, e["file"])
+        if os.path.exists(path):
+            out.append(dict(e, path=path))
+    return out
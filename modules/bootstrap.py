@@ -0,0 +1,80 @@
+# modules/bootstrap.py
+import threading
+import time
+from datetime import datetime
+
+from modules import database
+from modules.database import (
+    read_connection, init_db, SCHEMA_VERSION, get_company_ids, get_active_period_info, explain_known_queries,
+    print_index_report
+)
+from modules.utils import get_active_survey_questions
+
+# Pokretanje aplikacije jednom po procesu i bazi. Streamlit izvodi main.py na svakom rerunu,
+# pa ensure_ready() nakon prvog poziva samo provjeri rječnik - rerun ne dira DDL ni lock pisanja.
+# Shema se (re)kreira samo ako PRAGMA user_version baze nije SCHEMA_VERSION (nova baza,
+# nove migracije); inače se init_db preskače. EXPLAIN QUERY PLAN izvještaj o indeksima se radi
+# uvijek (i kad je init_db preskočen) i sprema u statistiku pokretanja. Nakon toga se jednom
+# pokreće retencija audit loga i zagrijavaju cachevi aktivnog razdoblja i upitnika za svaku
+# tvrtku. Postavke tvrtke (app_settings) se čitaju samo kao zamjena za aktivno razdoblje, pa ih
+# zagrijava već get_active_period_info.
+
+_lock = threading.Lock()
+_ready = {}     # DB_FILE -> statistika pokretanja
+
+
+def ensure_ready():
+    """Priprema bazu ako to u ovom procesu još nije napravljeno. Vraća statistiku pokretanja."""
+    stats = _ready.get(database.DB_FILE)
+    if stats is not None:
+        return stats
+    with _lock:
+        stats = _ready.get(database.DB_FILE)
+        if stats is None:
+            stats = _ready[database.DB_FILE] = _bootstrap()
+    return stats
+
+
+def startup_stats():
+    """Statistika pokretanja za trenutnu bazu ili None ako bootstrap još nije izveden."""
+    return _ready.get(database.DB_FILE)
+
+
+def _bootstrap():
+    t0 = time.perf_counter()
+    stats = {"db_file": database.DB_FILE, "started": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+    # 1. Shema: DDL i migracije samo kad verzija baze ne odgovara kodu
+    with read_connection() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    stats["initialized"] = version != SCHEMA_VERSION
+    if stats["initialized"]:
+        init_db()
+    with read_connection() as conn:
+        stats["schema_version"] = conn.execute("PRAGMA user_version").fetchone()[0]
+        stats["index_report"] = explain_known_queries(conn)
+        # init_db ispisuje izvještaj sam kad se izvodi
+        if not stats["initialized"]:
+            print_index_report(conn, stats["index_report"])
+    t1 = time.perf_counter()
+
+    # 2. Retencija audit loga (ATTACH ne smije biti unutar transakcije - zasebno od sheme)
+    try:
+        moved = database.archive_audit_log()
+        if moved: print(f"Audit log arhiviran: {moved}")
+    except Exception as e:
+        print(f"Arhiviranje audit loga nije uspjelo: {e}")
+    t2 = time.perf_counter()
+
+    # 3. Zagrijavanje cacheva: aktivno razdoblje i upitnik po tvrtki
+    companies = [cid for cid, _ in get_company_ids()]
+    for cid in companies:
+        period, _ = get_active_period_info(cid)
+        get_active_survey_questions(period, cid)
+    t3 = time.perf_counter()
+
+    stats.update(companies=len(companies), schema_ms=(t1 - t0) * 1000, maintenance_ms=(t2 - t1) * 1000,
+                 warm_ms=(t3 - t2) * 1000, total_ms=(t3 - t0) * 1000)
+    print(f"Bootstrap: shema v{stats['schema_version']} ({'inicijalizirana' if stats['initialized'] else 'bez DDL-a'}), "
+          f"{len(companies)} tvrtki zagrijano, ukupno {stats['total_ms']:.0f} ms")
+    return stats
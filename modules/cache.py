@@ -0,0 +1,54 @@
+# modules/cache.py
+import threading
+
+# Process-wide cache s brojačima generacija.
+# Svaki unos pamti "token" (epoha scope-a, generacija tvrtke) u trenutku učitavanja.
+# invalidate() samo povećava brojač - sve sesije u procesu pri sljedećem rerunu vide
+# da je token zastario i ponovno učitaju podatke iz baze, bez pollanja baze na svakom rerunu.
+
+PERIOD_SCOPE = "period"
+SURVEY_SCOPE = "survey"
+HISTORY_SCOPE = "history"
+
+_lock = threading.Lock()
+_epochs = {}        # scope -> int (invalidacija za sve tvrtke)
+_generations = {}   # (scope, company_id) -> int
+_entries = {}       # (scope, company_id, key) -> (token, value)
+
+
+def _token(scope, company_id):
+    return (_epochs.get(scope, 0), _generations.get((scope, company_id), 0))
+
+
+def get_or_load(scope, company_id, key, loader):
+    """Vraća vrijednost iz cachea ili je učitava pozivom loader(). Iznimke iz loadera se ne cacheiraju."""
+    with _lock:
+        token = _token(scope, company_id)
+        hit = _entries.get((scope, company_id, key))
+        if hit is not None and hit[0] == token:
+            return hit[1]
+    value = loader()
+    with _lock:
+        # Ako je netko invalidirao dok smo učitavali, ne spremamo (možda zastarjelu) vrijednost
+        if _token(scope, company_id) == token:
+            _entries[(scope, company_id, key)] = (token, value)
+    return value
+
+
+def invalidate(scope, company_id=None):
+    """Povećava generaciju za tvrtku; bez company_id invalidira scope za sve tvrtke."""
+    with _lock:
+        if company_id is None:
+            _epochs[scope] = _epochs.get(scope, 0) + 1
+            for k in [k for k in _entries if k[0] == scope]:
+                del _entries[k]
+        else:
+            _generations[(scope, company_id)] = _generations.get((scope, company_id), 0) + 1
+            for k in [k for k in _entries if k[0] == scope and k[1] == company_id]:
+                del _entries[k]
+
+
+def generation(scope, company_id=None):
+    """Trenutni token generacije (za dijagnostiku i vanjske cacheve)."""
+    with _lock:
+        return _token(scope, company_id)
@@ -23,3 +23,62 @@ DEFAULT_PASSWORD = "lozinka123"
 
 # --- OVO JE ONAJ KLJUČNI DIO ---
 SECRET_SALT = "SaaS_Secure_Performance_2026"
+
+# Pool konekcija (modules/db_pool.py)
+POOL_MAX_READERS = 8
+POOL_MAX_WRITERS = 1
+POOL_TIMEOUT = 30.0
+POOL_HEALTH_CHECK_SECONDS = 60.0
+
+# Import zaposlenika: broj redova po chunku (ograničava memoriju kod velikih datoteka)
+IMPORT_CHUNK_ROWS = 5000
+
+# Export: broj redova po fetchmany batchu i maksimalna starost privremenih datoteka (s)
+EXPORT_BATCH_ROWS = 2000
+EXPORT_FILE_MAX_AGE = 3600
+
+# 9-box: iznad ovog broja točaka graf prelazi u prikaz gustoće (3x3 ćelije s brojem zaposlenika)
+NINEBOX_DENSITY_THRESHOLD = 500
+NINEBOX_PAGE_SIZE = 50
+
+# Popisi zaposlenika s panelima (procjene, ciljevi, IDP): zaglavlja po stranici
+EMPLOYEE_PAGE_SIZE = 20
+
+# Audit log: veličina reda čekanja, redova po batchu i najdulje čekanje prije upisa (s)
+AUDIT_QUEUE_SIZE = 10000
+AUDIT_BATCH_SIZE = 200
+AUDIT_FLUSH_SECONDS = 1.0
+
+# Audit log: mjeseci koji ostaju u živoj bazi (stariji idu u arhivu) i redova po stranici pregleda
+AUDIT_RETENTION_MONTHS = 12
+AUDIT_PAGE_SIZE = 100
+
+# Lozinke: scrypt parametri (uz n=2**14, r=8 jedan hash troši ~16 MB memorije)
+PASSWORD_SCRYPT_N = 2 ** 14
+PASSWORD_SCRYPT_R = 8
+PASSWORD_SCRYPT_P = 1
+
+# Prijava: niti za provjeru lozinke, limit neuspjelih pokušaja i trajanje negativnog cachea (s)
+LOGIN_HASH_WORKERS = 2
+LOGIN_HASH_TIMEOUT = 10.0
+LOGIN_MAX_FAILURES = 5
+LOGIN_LOCKOUT_SECONDS = 300
+LOGIN_NEGATIVE_TTL = 60
+# Najviše korisničkih imena u memoriji za lockout i negativni cache (štiti od napada nasumičnim imenima)
+LOGIN_TRACKED_MAX = 10000
+
+# Backup: stranica po koraku i pauza između koraka (s), kompresija i retencija
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP = 0.01
+BACKUP_COMPRESS = True
+BACKUP_KEEP_COUNT = 10
+BACKUP_MAX_AGE_DAYS = 30
+# Automatski backup (pri prijavi HR-a) najviše jednom u ovom intervalu (s)
+BACKUP_AUTO_MIN_INTERVAL = 3600
+
+# Profiler upita (uključuje se i env varijablom TALENT_PROFILE=1 ili iz Super Admin konzole):
+# zapamćeni rerunovi, najviše upita po rerunu i uzoraka po upitu/pogledu za p50/p95
+PROFILER_ENABLED = False
+PROFILER_MAX_RUNS = 50
+PROFILER_MAX_QUERIES_PER_RUN = 2000
+PROFILER_SAMPLES = 1000
@@ -1,146 +1,432 @@
 # modules/database.py
-import sqlite3
 import os
 import json
-import glob
 from datetime import datetime
 
 # Importamo hash funkciju iz utils
-from modules.utils import make_hashes as get_hash
+from modules.utils import make_hashes as get_hash, NINEBOX_EDGES
+from modules.db_pool import get_pool
+from modules import audit, backup
+from modules.audit import get_audit_writer
+from modules import cache
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__)).replace("modules", "")
-DB_FILE = os.path.join(BASE_DIR, 'talent_database.db')
+# TALENT_DB_FILE omogućuje rad nad drugom bazom (npr. generirani podaci za benchmark, tools/)
+DB_FILE = os.environ.get('TALENT_DB_FILE') or os.path.join(BASE_DIR, 'talent_database.db')
+# Arhiva audit loga i backupi stoje uz bazu na koju se odnose
+AUDIT_ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(DB_FILE)), 'archive')
+BACKUP_DIR = os.path.join(os.path.dirname(os.path.abspath(DB_FILE)), 'backups')
 
-def get_connection():
-    """Kreira konekciju s bazom uz Anti-Locking postavke (WAL mode)."""
-    # Povećan timeout na 30 sekundi da se izbjegne "Database is locked"
-    conn = sqlite3.connect(DB_FILE, check_same_thread=False, timeout=30.0)
-    conn.row_factory = sqlite3.Row  # Omogućuje pristup stupcima po imenu
-    try:
-        # WAL mode omogućuje istovremeno čitanje i pisanje bez zaključavanja
-        conn.execute("PRAGMA journal_mode=WAL;")
-        conn.execute("PRAGMA synchronous=NORMAL;")
-        conn.execute("PRAGMA busy_timeout=5000;")
-        conn.execute("PRAGMA foreign_keys=ON;")
-    except Exception as e:
-        print(f"Baza PRAGMA error: {e}")
-    return conn
+def read_connection():
+    """Context manager: posuđuje konekciju za čitanje iz process-wide poola."""
+    return get_pool(DB_FILE).reader()
+
+def write_connection():
+    """Context manager: posuđuje (jedinu) konekciju za pisanje; commit na izlazu iz bloka."""
+    return get_pool(DB_FILE).writer()
+
+def get_pool_stats():
+    """Metrike poola konekcija (čekanje, checkouti, high-water mark)."""
+    return get_pool(DB_FILE).stats()
 
 def init_db():
-    """Inicijalizira baze podataka i tablice s NAJNOVIJOM shemom."""
-    conn = get_connection()
-    c = conn.cursor()
+    """Inicijalizira baze podataka i tablice s NAJNOVIJOM shemom (aplikacija ga zove preko bootstrap.ensure_ready)."""
+    global _index_report_done
+    with write_connection() as conn:
+        c = conn.cursor()
     
-    # 1. Osnovne tablice
-    c.execute('CREATE TABLE IF NOT EXISTS companies (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, subdomain TEXT, logo_url TEXT, plan_type TEXT)')
-    c.execute('CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password TEXT, role TEXT, department TEXT, company_id INTEGER)')
-    c.execute('CREATE TABLE IF NOT EXISTS employees_master (kadrovski_broj TEXT PRIMARY KEY, ime_prezime TEXT, radno_mjesto TEXT, department TEXT, manager_id TEXT, company_id INTEGER, is_manager INTEGER DEFAULT 0, active INTEGER DEFAULT 1)')
+        # 1. Osnovne tablice
+        c.execute('CREATE TABLE IF NOT EXISTS companies (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, subdomain TEXT, logo_url TEXT, plan_type TEXT)')
+        c.execute('CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password TEXT, role TEXT, department TEXT, company_id INTEGER)')
+        c.execute('CREATE TABLE IF NOT EXISTS employees_master (kadrovski_broj TEXT PRIMARY KEY, ime_prezime TEXT, radno_mjesto TEXT, department TEXT, manager_id TEXT, company_id INTEGER, is_manager INTEGER DEFAULT 0, active INTEGER DEFAULT 1)')
     
-    # 2. Evaluacije i Ciljevi
-    c.execute('CREATE TABLE IF NOT EXISTS evaluations (id INTEGER PRIMARY KEY AUTOINCREMENT, period TEXT, kadrovski_broj TEXT, ime_prezime TEXT, radno_mjesto TEXT, department TEXT, manager_id TEXT, avg_performance REAL, avg_potential REAL, category TEXT, action_plan TEXT, status TEXT, feedback_date TEXT, company_id INTEGER, is_self_eval INTEGER DEFAULT 0, json_answers TEXT)')
-    c.execute('CREATE TABLE IF NOT EXISTS goals (id INTEGER PRIMARY KEY AUTOINCREMENT, period TEXT, kadrovski_broj TEXT, manager_id TEXT, title TEXT, description TEXT, weight INTEGER, progress REAL, status TEXT, last_updated TEXT, deadline TEXT, company_id INTEGER)')
-    c.execute('CREATE TABLE IF NOT EXISTS goal_kpis (id INTEGER PRIMARY KEY AUTOINCREMENT, goal_id INTEGER, description TEXT, weight INTEGER, progress REAL, deadline TEXT)')
-    c.execute('CREATE TABLE IF NOT EXISTS development_plans (id INTEGER PRIMARY KEY AUTOINCREMENT, period TEXT, kadrovski_broj TEXT, manager_id TEXT, strengths TEXT, areas_improve TEXT, career_goal TEXT, json_70 TEXT, json_20 TEXT, json_10 TEXT, support_needed TEXT, support_notes TEXT, status TEXT, company_id INTEGER)')
+        # 2. Evaluacije i Ciljevi
+        c.execute('CREATE TABLE IF NOT EXISTS evaluations (id INTEGER PRIMARY KEY AUTOINCREMENT, period TEXT, kadrovski_broj TEXT, ime_prezime TEXT, radno_mjesto TEXT, department TEXT, manager_id TEXT, avg_performance REAL, avg_potential REAL, category TEXT, action_plan TEXT, status TEXT, feedback_date TEXT, company_id INTEGER, is_self_eval INTEGER DEFAULT 0, json_answers TEXT)')
+        c.execute('CREATE TABLE IF NOT EXISTS goals (id INTEGER PRIMARY KEY AUTOINCREMENT, period TEXT, kadrovski_broj TEXT, manager_id TEXT, title TEXT, description TEXT, weight INTEGER, progress REAL, status TEXT, last_updated TEXT, deadline TEXT, company_id INTEGER)')
+        c.execute('CREATE TABLE IF NOT EXISTS goal_kpis (id INTEGER PRIMARY KEY AUTOINCREMENT, goal_id INTEGER, description TEXT, weight INTEGER, progress REAL, deadline TEXT)')
+        c.execute('CREATE TABLE IF NOT EXISTS development_plans (id INTEGER PRIMARY KEY AUTOINCREMENT, period TEXT, kadrovski_broj TEXT, manager_id TEXT, strengths TEXT, areas_improve TEXT, career_goal TEXT, json_70 TEXT, json_20 TEXT, json_10 TEXT, support_needed TEXT, support_notes TEXT, status TEXT, company_id INTEGER)')
     
-    # 3. Postavke i Periodi (Ažurirana shema s is_active i datumima)
-    c.execute('CREATE TABLE IF NOT EXISTS periods (period_name TEXT PRIMARY KEY, start_date TEXT, deadline TEXT, end_date TEXT, is_active INTEGER DEFAULT 0, company_id INTEGER)')
-    c.execute('CREATE TABLE IF NOT EXISTS app_settings (setting_key TEXT PRIMARY KEY, setting_value TEXT, company_id INTEGER)')
+        # 3. Postavke i Periodi (Ažurirana shema s is_active i datumima)
+        c.execute('CREATE TABLE IF NOT EXISTS periods (period_name TEXT PRIMARY KEY, start_date TEXT, deadline TEXT, end_date TEXT, is_active INTEGER DEFAULT 0, company_id INTEGER)')
+        c.execute('CREATE TABLE IF NOT EXISTS app_settings (setting_key TEXT PRIMARY KEY, setting_value TEXT, company_id INTEGER)')
     
-    # 4. Logovi i Pohvale
-    c.execute('CREATE TABLE IF NOT EXISTS audit_log (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, user TEXT, action TEXT, details TEXT, company_id INTEGER)')
-    c.execute('CREATE TABLE IF NOT EXISTS recognitions (id INTEGER PRIMARY KEY AUTOINCREMENT, sender_id TEXT, receiver_id TEXT, message TEXT, timestamp TEXT, company_id INTEGER)')
-
-    # 5. NOVO: Tablice za Dinamičke Upitnike (Dizajner)
-    c.execute("""CREATE TABLE IF NOT EXISTS form_templates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                description TEXT,
-                created_at TEXT,
-                company_id INTEGER
-              )""")
+        # 4. Logovi i Pohvale
+        c.execute('CREATE TABLE IF NOT EXISTS audit_log (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, user TEXT, action TEXT, details TEXT, company_id INTEGER)')
+        c.execute('CREATE TABLE IF NOT EXISTS recognitions (id INTEGER PRIMARY KEY AUTOINCREMENT, sender_id TEXT, receiver_id TEXT, message TEXT, timestamp TEXT, company_id INTEGER)')
+
+        # 5. NOVO: Tablice za Dinamičke Upitnike (Dizajner)
+        c.execute("""CREATE TABLE IF NOT EXISTS form_templates (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT,
+                    description TEXT,
+                    created_at TEXT,
+                    company_id INTEGER
+                  )""")
     
-    c.execute("""CREATE TABLE IF NOT EXISTS form_questions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                template_id INTEGER,
-                section TEXT,
-                title TEXT,
-                description TEXT,
-                criteria_desc TEXT,
-                order_index INTEGER,
-                company_id INTEGER
-              )""")
+        c.execute("""CREATE TABLE IF NOT EXISTS form_questions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    template_id INTEGER,
+                    section TEXT,
+                    title TEXT,
+                    description TEXT,
+                    criteria_desc TEXT,
+                    order_index INTEGER,
+                    company_id INTEGER
+                  )""")
     
-    c.execute("""CREATE TABLE IF NOT EXISTS cycle_templates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                period_name TEXT,
-                template_id INTEGER,
-                company_id INTEGER
-              )""")
+        c.execute("""CREATE TABLE IF NOT EXISTS cycle_templates (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    period_name TEXT,
+                    template_id INTEGER,
+                    company_id INTEGER
+                  )""")
     
-    # Inicijalni podaci (Bootstrap ako je baza prazna)
-    default_period = '2026-Q1'
-    # Provjera postoji li barem jedan period, ako ne, kreiraj ga i postavi kao aktivnog
-    if c.execute("SELECT COUNT(*) FROM periods").fetchone()[0] == 0:
-        c.execute("INSERT INTO periods (period_name, start_date, deadline, is_active, company_id) VALUES (?, ?, '2026-03-31', 1, 1)", 
-                  (default_period, datetime.now().strftime("%Y-%m-%d")))
-        # Postavi i u settings za svaki slučaj (legacy fallback)
-        c.execute("INSERT OR IGNORE INTO app_settings (setting_key, setting_value, company_id) VALUES ('active_period', ?, 1)", (default_period,))
+        # Inicijalni podaci (Bootstrap ako je baza prazna)
+        default_period = '2026-Q1'
+        # Provjera postoji li barem jedan period, ako ne, kreiraj ga i postavi kao aktivnog
+        if c.execute("SELECT COUNT(*) FROM periods").fetchone()[0] == 0:
+            c.execute("INSERT INTO periods (period_name, start_date, deadline, is_active, company_id) VALUES (?, ?, '2026-03-31', 1, 1)", 
+                      (default_period, datetime.now().strftime("%Y-%m-%d")))
+            # Postavi i u settings za svaki slučaj (legacy fallback)
+            c.execute("INSERT OR IGNORE INTO app_settings (setting_key, setting_value, company_id) VALUES ('active_period', ?, 1)", (default_period,))
     
-    conn.commit()
-    conn.close()
+        conn.commit()
+
+        # 6. Migracije (indeksi, ograničenja) - verzionirane preko PRAGMA user_version
+        applied = run_migrations(conn)
+        if applied or not _index_report_done:
+            print_index_report(conn)
+            _index_report_done = True
+
+# --- AGREGAT 9-BOX MATRICE ---
+# Zaključane (Submitted) voditeljske procjene zbrojene po (tvrtka, period, odjel, voditelj, kategorija,
+# ćelija 9-box mreže). Odjel se uzima iz employees_master (kao na HR dashboardu), a ocjene se
+# pretvaraju u broj kao pd.to_numeric(errors='coerce').fillna(0). Ćelija (0-8, redak = potencijal,
+# stupac = učinak) se računa isto kao utils.ninebox_cells. Filteri se dodaju na kraj WHERE dijela.
+NINEBOX_PERF_SQL = "COALESCE(CAST(ev.avg_performance AS REAL), 0)"
+NINEBOX_POT_SQL = "COALESCE(CAST(ev.avg_potential AS REAL), 0)"
+NINEBOX_CELL_SQL = (f"(({NINEBOX_POT_SQL} >= {NINEBOX_EDGES[0]}) + ({NINEBOX_POT_SQL} >= {NINEBOX_EDGES[1]})) * 3"
+                    f" + ({NINEBOX_PERF_SQL} >= {NINEBOX_EDGES[0]}) + ({NINEBOX_PERF_SQL} >= {NINEBOX_EDGES[1]})")
+NINEBOX_AGG_DDL = """CREATE TABLE IF NOT EXISTS ninebox_agg (
+    company_id INTEGER, period TEXT, department TEXT, manager_id TEXT, category TEXT, cell INTEGER,
+    n INTEGER, sum_perf REAL, sum_pot REAL,
+    PRIMARY KEY (company_id, period, department, manager_id, category, cell)) WITHOUT ROWID"""
+NINEBOX_AGG_SELECT = f"""
+    INSERT INTO ninebox_agg (company_id, period, department, manager_id, category, cell, n, sum_perf, sum_pot)
+    SELECT ev.company_id, ev.period, COALESCE(TRIM(em.department), ''), COALESCE(ev.manager_id, ''),
+           COALESCE(ev.category, ''), {NINEBOX_CELL_SQL}, COUNT(*),
+           SUM({NINEBOX_PERF_SQL}), SUM({NINEBOX_POT_SQL})
+    FROM evaluations ev
+    JOIN employees_master em ON ev.kadrovski_broj = em.kadrovski_broj
+    WHERE ev.is_self_eval = 0 AND ev.status = 'Submitted' {{where}}
+    GROUP BY ev.company_id, ev.period, 3, 4, 5, 6
+"""
+
+# --- ODGOVORI PROCJENA PO PITANJU ---
+# evaluation_answers je normalizirana kopija json_answers (red po procjeni i pitanju), pa se
+# prosjeci po pitanju, gap samoprocjena/voditelj i distribucije računaju u SQL-u bez json.loads.
+# json_answers ostaje izvor za forme; redovi se izvode iz njega preko json_each (nevaljan JSON
+# ili nebrojčane vrijednosti se preskaču). Filteri se dodaju na kraj WHERE dijela.
+# Tekstualna ocjena je broj ako je, bez razmaka i jednog vodećeg predznaka, sastavljena samo od
+# znamenki i najviše jedne točke ("3", "-1", ".5", "4.25"); "3abc", "1.2.3" ili "-" se preskaču.
+_ANSWER_DIGITS = "SUBSTR(TRIM(j.value), 1 + (TRIM(j.value) GLOB '[+-]*'))"
+EVALUATION_ANSWERS_SELECT = f"""
+    INSERT INTO evaluation_answers (evaluation_id, question_id, score)
+    SELECT ev.id, j.key, CAST(TRIM(j.value) AS REAL)
+    FROM evaluations ev,
+         json_each(CASE WHEN json_valid(ev.json_answers) AND json_type(ev.json_answers) = 'object'
+                        THEN ev.json_answers ELSE '{{{{}}}}' END) j
+    WHERE (j.type IN ('integer', 'real')
+           OR (j.type = 'text' AND {_ANSWER_DIGITS} GLOB '*[0-9]*'
+               AND {_ANSWER_DIGITS} NOT GLOB '*[^0-9.]*' AND {_ANSWER_DIGITS} NOT GLOB '*.*.*')) {{where}}
+"""
+
+# --- MIGRACIJE SHEME ---
+# Svaka migracija je (verzija, opis, lista koraka). Korak je SQL naredba ili funkcija fn(conn)
+# za korake koji trebaju Python. Verzije se primjenjuju redom, a zadnja primijenjena se pamti
+# u PRAGMA user_version same baze.
+_DUPLICATE_EVALUATIONS = """
+    SELECT * FROM evaluations WHERE id NOT IN (
+        SELECT MIN(id) FROM evaluations GROUP BY company_id, period, kadrovski_broj, is_self_eval)
+"""
+
+def _archive_duplicate_evaluations(conn):
+    """Duplikate procjena premješta u evaluations_duplicates (s vremenom uklanjanja) i bilježi
+    broj i id-eve na stdout i u audit log, prije nego UNIQUE indeks zahtijeva jedinstvenost."""
+    conn.execute(f"CREATE TABLE IF NOT EXISTS evaluations_duplicates AS SELECT *, '' AS removed_at FROM ({_DUPLICATE_EVALUATIONS}) WHERE 0")
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = conn.execute(f"SELECT id, company_id FROM ({_DUPLICATE_EVALUATIONS}) ORDER BY id").fetchall()
+    if not rows: return
+    conn.execute(f"INSERT INTO evaluations_duplicates SELECT *, ? FROM ({_DUPLICATE_EVALUATIONS})", (now,))
+    conn.execute("DELETE FROM evaluations WHERE id IN (SELECT value FROM json_each(?))", (json.dumps([r[0] for r in rows]),))
+    by_company = {}
+    for eid, cid in rows: by_company.setdefault(cid, []).append(eid)
+    for cid, ids in by_company.items():
+        details = f"Uklonjeno {len(ids)} duplikata procjena (kopije u evaluations_duplicates), id: {', '.join(map(str, ids))}"
+        print(details)
+        conn.execute("INSERT INTO audit_log (timestamp, user, action, details, company_id) VALUES (?,?,?,?,?)",
+                     (now, "system", "MIGRATION_DEDUPE_EVALUATIONS", details, cid))
+
+def _add_ninebox_cell(conn):
+    """ninebox_agg iz migracije 2 prije stupca cell: tablica se gradi ponovno (stupac je dio ključa)."""
+    if "cell" in {row[1] for row in conn.execute("PRAGMA table_info(ninebox_agg)")}: return
+    conn.execute("DROP TABLE ninebox_agg")
+    conn.execute(NINEBOX_AGG_DDL)
+    conn.execute(NINEBOX_AGG_SELECT.format(where=""))
+
+MIGRATIONS = [
+    (1, "Indeksi za najčešće upite + UNIQUE na procjenama", [
+        # Duplikati bi srušili UNIQUE indeks. Zadržavamo najstariji red jer njega
+        # aplikacija dohvaća (fetchone / iloc[0]) i ažurira; ostali idu u evaluations_duplicates.
+        _archive_duplicate_evaluations,
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_evaluations_company_period_emp ON evaluations (company_id, period, kadrovski_broj, is_self_eval)",
+        "CREATE INDEX IF NOT EXISTS idx_evaluations_emp_period_self ON evaluations (kadrovski_broj, period, is_self_eval)",
+        "CREATE INDEX IF NOT EXISTS idx_evaluations_period_manager ON evaluations (period, manager_id, is_self_eval)",
+        "CREATE INDEX IF NOT EXISTS idx_goals_emp_period ON goals (kadrovski_broj, period)",
+        "CREATE INDEX IF NOT EXISTS idx_goal_kpis_goal ON goal_kpis (goal_id)",
+        "CREATE INDEX IF NOT EXISTS idx_employees_manager ON employees_master (manager_id, company_id)",
+        "CREATE INDEX IF NOT EXISTS idx_development_plans_emp_period ON development_plans (kadrovski_broj, period)",
+    ]),
+    (2, "Agregat 9-box matrice (ninebox_agg)", [
+        NINEBOX_AGG_DDL,
+        "DELETE FROM ninebox_agg",
+        NINEBOX_AGG_SELECT.format(where=""),
+    ]),
+    (3, "Indeksi audit loga (vrijeme, korisnik, akcija, tvrtka)", [
+        "CREATE INDEX IF NOT EXISTS idx_audit_time ON audit_log (timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_audit_company_time ON audit_log (company_id, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_audit_user_time ON audit_log (user, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_audit_action_time ON audit_log (action, timestamp)",
+    ]),
+    (4, "Odgovori procjena po pitanju (evaluation_answers) + backfill iz json_answers", [
+        # Brisanje procjene briše i njene odgovore (pool uključuje PRAGMA foreign_keys)
+        """CREATE TABLE IF NOT EXISTS evaluation_answers (
+               evaluation_id INTEGER NOT NULL REFERENCES evaluations(id) ON DELETE CASCADE,
+               question_id TEXT NOT NULL, score REAL,
+               PRIMARY KEY (evaluation_id, question_id)) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS idx_evaluation_answers_question ON evaluation_answers (question_id, score)",
+        "DELETE FROM evaluation_answers",
+        EVALUATION_ANSWERS_SELECT.format(where=""),
+    ]),
+    (5, "Ćelija 9-box mreže u agregatu ninebox_agg", [
+        _add_ninebox_cell,
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def run_migrations(conn):
+    """Primjenjuje sve migracije novije od PRAGMA user_version. Vraća listu primijenjenih verzija."""
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    applied = []
+    for version, desc, statements in MIGRATIONS:
+        if version <= current: continue
+        try:
+            conn.execute("BEGIN")
+            for step in statements:
+                if callable(step): step(conn)
+                else: conn.execute(step)
+            # PRAGMA ne prima parametre, verzija je uvijek int iz MIGRATIONS
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Migracija {version} ({desc}) nije uspjela: {e}")
+            break
+        applied.append(version)
+        print(f"Migracija {version} primijenjena: {desc}")
+    return applied
+
+# --- IZVJEŠTAJ O KORIŠTENJU INDEKSA ---
+# Poznati "vrući" upiti iz pogleda, s primjernim parametrima za EXPLAIN QUERY PLAN.
+KNOWN_QUERIES = {
+    "evaluacija zaposlenika": ("SELECT * FROM evaluations WHERE kadrovski_broj=? AND period=? AND is_self_eval=?", ('x', 'x', 0)),
+    "procjene voditelja": ("SELECT * FROM evaluations WHERE period=? AND manager_id=? AND is_self_eval=0", ('x', 'x')),
+    "ciljevi zaposlenika": ("SELECT * FROM goals WHERE kadrovski_broj=? AND period=?", ('x', 'x')),
+    "KPI-evi cilja": ("SELECT description, weight, progress FROM goal_kpis WHERE goal_id=?", (0,)),
+    "tim voditelja": ("SELECT * FROM employees_master WHERE manager_id=? AND company_id=?", ('x', 1)),
+    "IDP zaposlenika": ("SELECT * FROM development_plans WHERE kadrovski_broj=? AND period=?", ('x', 'x')),
+    "audit po korisniku": ("SELECT * FROM audit_log WHERE user=? AND timestamp>=? ORDER BY timestamp DESC, id DESC", ('x', 'x')),
+    "audit tvrtke": ("SELECT * FROM audit_log WHERE company_id=? AND timestamp<? ORDER BY timestamp DESC, id DESC", (1, 'x')),
+    "distribucija ocjena pitanja": ("SELECT score, COUNT(*) FROM evaluation_answers WHERE question_id=? GROUP BY score", ('x',)),
+}
+
+_index_report_done = False
+
+def explain_known_queries(conn):
+    """Vraća [(naziv, [koraci plana], koristi_indeks)] za KNOWN_QUERIES."""
+    # EXPLAIN ne čita bazu pa ne provjerava verziju sheme; pravi upit osvježava shemu konekcije
+    # (npr. čitača otvorenog prije migracija) da plan vidi nove indekse
+    conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+    report = []
+    for name, (sql, params) in KNOWN_QUERIES.items():
+        try:
+            steps = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+        except Exception as e:
+            steps = [f"GREŠKA: {e}"]
+        uses_index = any("USING INDEX" in s or "USING COVERING INDEX" in s for s in steps)
+        report.append((name, steps, uses_index))
+    return report
+
+def print_index_report(conn, report=None):
+    """Ispisuje na stdout koji poznati upiti koriste indekse (startup izvještaj).
+
+    report je već izračunat rezultat explain_known_queries (inače se računa ovdje).
+    """
+    print(f"Shema v{conn.execute('PRAGMA user_version').fetchone()[0]} - korištenje indeksa:")
+    for name, steps, uses_index in report if report is not None else explain_known_queries(conn):
+        print(f"  {'OK  ' if uses_index else 'SCAN'} {name}: {' | '.join(steps)}")
 
 def save_evaluation_json_method(company_id, period, employee_id, manager_id, user_data, 
                                 scores_p, scores_pot, avg_p, avg_pot, category, 
                                 action_plan, answers_dict, is_self_eval, target_status):
     """Centralizirana metoda za spremanje procjena."""
     try:
-        conn = get_connection()
-        cur = conn.cursor()
+        submitted_changed = False
+        with write_connection() as conn:
+            cur = conn.cursor()
         
-        # ensure_ascii=False osigurava ispravno spremanje hrvatskih znakova
-        json_str = json.dumps(answers_dict, ensure_ascii=False)
+            # ensure_ascii=False osigurava ispravno spremanje hrvatskih znakova
+            json_str = json.dumps(answers_dict, ensure_ascii=False)
         
-        # Ako je self-eval, manager_id u tablici evaluations je zapravo ID radnika (ili pravi manager ID, ovisno o logici)
-        # Ovdje zadržavamo originalnu logiku: manager_id polje u tablici čuva ID onoga tko je nadređen (za report)
+            # Ako je self-eval, manager_id u tablici evaluations je zapravo ID radnika (ili pravi manager ID, ovisno o logici)
+            # Ovdje zadržavamo originalnu logiku: manager_id polje u tablici čuva ID onoga tko je nadređen (za report)
         
-        cur.execute("SELECT id FROM evaluations WHERE kadrovski_broj=? AND period=? AND is_self_eval=? AND company_id=?", 
-                    (employee_id, period, 1 if is_self_eval else 0, company_id))
-        row = cur.fetchone()
+            cur.execute("SELECT id, status, manager_id FROM evaluations WHERE kadrovski_broj=? AND period=? AND is_self_eval=? AND company_id=?", 
+                        (employee_id, period, 1 if is_self_eval else 0, company_id))
+            row = cur.fetchone()
 
-        if row:
-            # UPDATE postojeće procjene
-            cur.execute("""UPDATE evaluations SET 
-                avg_performance=?, avg_potential=?, category=?, 
-                action_plan=?, feedback_date=?, status=?, json_answers=?
-                WHERE id=?""", 
-                (avg_p, avg_pot, category, action_plan, datetime.now().strftime("%Y-%m-%d"), target_status, json_str, row[0]))
-        else:
-            # INSERT nove procjene
-            # Pazi: user_data mora biti dict s ključevima 'ime', 'radno_mjesto', 'odjel'
-            cur.execute("""INSERT INTO evaluations 
-                (period, kadrovski_broj, ime_prezime, radno_mjesto, department, manager_id, 
-                avg_performance, avg_potential, category, action_plan, status, feedback_date, company_id, is_self_eval, json_answers) 
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)""", 
-                (period, employee_id, user_data.get('ime',''), user_data.get('radno_mjesto',''), user_data.get('odjel',''), manager_id,
-                 avg_p, avg_pot, category, action_plan, target_status, datetime.now().strftime("%Y-%m-%d"), company_id, 1 if is_self_eval else 0, json_str))
+            if row:
+                # UPDATE postojeće procjene
+                cur.execute("""UPDATE evaluations SET 
+                    avg_performance=?, avg_potential=?, category=?, 
+                    action_plan=?, feedback_date=?, status=?, json_answers=?
+                    WHERE id=?""", 
+                    (avg_p, avg_pot, category, action_plan, datetime.now().strftime("%Y-%m-%d"), target_status, json_str, row[0]))
+                evaluation_id = row[0]
+            else:
+                # INSERT nove procjene
+                # Pazi: user_data mora biti dict s ključevima 'ime', 'radno_mjesto', 'odjel'
+                cur.execute("""INSERT INTO evaluations 
+                    (period, kadrovski_broj, ime_prezime, radno_mjesto, department, manager_id, 
+                    avg_performance, avg_potential, category, action_plan, status, feedback_date, company_id, is_self_eval, json_answers) 
+                    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)""", 
+                    (period, employee_id, user_data.get('ime',''), user_data.get('radno_mjesto',''), user_data.get('odjel',''), manager_id,
+                     avg_p, avg_pot, category, action_plan, target_status, datetime.now().strftime("%Y-%m-%d"), company_id, 1 if is_self_eval else 0, json_str))
+                evaluation_id = cur.lastrowid
 
-        conn.commit()
-        conn.close()
+            # Odgovori po pitanju u istoj transakciji kao i json_answers
+            refresh_evaluation_answers(conn, [evaluation_id])
+
+            # Agregat se mijenja samo kad procjena jest ili je bila zaključana
+            if not is_self_eval and (target_status == 'Submitted' or (row and row['status'] == 'Submitted')):
+                managers = {manager_id} | ({row['manager_id']} if row else set())
+                refresh_ninebox_slice(conn, company_id, period, managers)
+                submitted_changed = True
+
+        # Tek nakon commita, da nitko ne učita povijest bez ove procjene pod novom generacijom
+        if submitted_changed: cache.invalidate(cache.HISTORY_SCOPE, company_id)
         return True, "Uspješno spremljeno"
     except Exception as e:
         return False, str(e)
 
-def get_active_period_info():
+def refresh_ninebox_slice(conn, company_id, period, manager_ids):
+    """Preračunava redove agregata za zadane voditelje u periodu (unutar postojeće transakcije)."""
+    for mid in manager_ids:
+        conn.execute("DELETE FROM ninebox_agg WHERE company_id=? AND period=? AND manager_id=?",
+                     (company_id, period, mid or ''))
+        conn.execute(NINEBOX_AGG_SELECT.format(where="AND ev.company_id=? AND ev.period=? AND COALESCE(ev.manager_id, '')=?"),
+                     (company_id, period, mid or ''))
+
+def refresh_evaluation_answers(conn, evaluation_ids):
+    """Ponovno izvodi redove evaluation_answers za zadane procjene (unutar postojeće transakcije)."""
+    for eid in evaluation_ids:
+        conn.execute("DELETE FROM evaluation_answers WHERE evaluation_id=?", (eid,))
+        conn.execute(EVALUATION_ANSWERS_SELECT.format(where="AND ev.id=?"), (eid,))
+
+def rebuild_evaluation_answers():
+    """Ponovno gradi cijelu tablicu evaluation_answers iz json_answers (npr. nakon masovnog unosa procjena)."""
+    with write_connection() as conn:
+        conn.execute("DELETE FROM evaluation_answers")
+        return conn.execute(EVALUATION_ANSWERS_SELECT.format(where="")).rowcount
+
+def rebuild_ninebox_agg(company_id=None):
+    """Ponovno gradi cijeli agregat (za tvrtku ili sve tvrtke), npr. nakon promjene odjela ili brisanja."""
+    with write_connection() as conn:
+        if company_id is None:
+            conn.execute("DELETE FROM ninebox_agg")
+            conn.execute(NINEBOX_AGG_SELECT.format(where=""))
+        else:
+            conn.execute("DELETE FROM ninebox_agg WHERE company_id=?", (company_id,))
+            conn.execute(NINEBOX_AGG_SELECT.format(where="AND ev.company_id=?"), (company_id,))
+    cache.invalidate(cache.HISTORY_SCOPE, company_id)
+
+# --- MASOVNE OPERACIJE NAD KORISNIČKIM RAČUNIMA ---
+# Jedna SQL naredba po operaciji, ograničeno na tvrtku. S dry_run=True naredbe se izvrše
+# pa se transakcija vrati (rollback), tako da je pregled točan broj redova koji bi se promijenio.
+_ACCOUNTS_FROM_EMPLOYEES = """
+    SELECT TRIM(kadrovski_broj), ?, CASE WHEN COALESCE(is_manager, 0) THEN 'Manager' ELSE 'Employee' END, department, company_id
+    FROM employees_master
+    WHERE company_id = ? AND kadrovski_broj != 'admin'
+"""
+
+def sync_user_accounts(company_id, password_hash, dry_run=False):
+    """Kreira račune zaposlenicima tvrtke koji ga nemaju (postojeće ne dira). Vraća broj kreiranih."""
+    with write_connection() as conn:
+        created = conn.execute(f"""INSERT OR IGNORE INTO users (username, password, role, department, company_id)
+                                   {_ACCOUNTS_FROM_EMPLOYEES}""", (password_hash, company_id)).rowcount
+        if dry_run: conn.rollback()
+    return created
+
+def reset_company_passwords(company_id, password_hash, dry_run=False):
+    """Postavlja lozinku svim računima zaposlenika tvrtke (osim SuperAdmina) i kreira nedostajuće.
+
+    Uloga i odjel postojećih računa se ne mijenjaju. Vraća {'reset': n, 'created': m}.
+    """
+    with write_connection() as conn:
+        reset = conn.execute("""
+            UPDATE users SET password = ?
+            WHERE company_id = ? AND role != 'SuperAdmin'
+              AND username IN (SELECT TRIM(kadrovski_broj) FROM employees_master WHERE company_id = ? AND kadrovski_broj != 'admin')
+        """, (password_hash, company_id, company_id)).rowcount
+        created = conn.execute(f"""INSERT OR IGNORE INTO users (username, password, role, department, company_id)
+                                   {_ACCOUNTS_FROM_EMPLOYEES}""", (password_hash, company_id)).rowcount
+        if dry_run: conn.rollback()
+    return {'reset': reset, 'created': created}
+
+def get_company_ids():
+    """[(id, naziv)] svih tvrtki koje imaju zaposlenike ili zapis u companies."""
+    with read_connection() as conn:
+        rows = conn.execute("""
+            SELECT ids.id, COALESCE(c.name, 'Tvrtka ' || ids.id)
+            FROM (SELECT company_id AS id FROM employees_master WHERE company_id IS NOT NULL
+                  UNION SELECT id FROM companies) ids
+            LEFT JOIN companies c ON c.id = ids.id
+            ORDER BY ids.id
+        """).fetchall()
+    return [(r[0], r[1]) for r in rows]
+
+def get_active_period_info(company_id=None):
     """
-    Napredni dohvat aktivnog perioda.
-    1. Prvo traži period koji ima is_active=1 u tablici periods.
+    Napredni dohvat aktivnog perioda (cacheiran po tvrtki, vidi invalidate_period_cache).
+    1. Prvo traži period koji ima is_active=1 u tablici periods (za tvrtku, ako je zadana).
     2. Ako nema, traži u app_settings.
     3. Ako nema, vraća hardcoded default.
     """
-    conn = get_connection()
     try:
-        # Prioritet 1: Tablica periods
-        row = conn.execute("SELECT period_name, deadline FROM periods WHERE is_active=1 LIMIT 1").fetchone()
+        return cache.get_or_load(cache.PERIOD_SCOPE, company_id, "active", lambda: _load_active_period(company_id))
+    except Exception as e:
+        print(f"Greška pri dohvatu perioda: {e}")
+        return "2026-Q1", "2026-03-31"
+
+def _load_active_period(company_id):
+    with read_connection() as conn:
+        # Prioritet 1: Tablica periods (prvo aktivni period tvrtke, zatim bilo koji aktivni)
+        row = None
+        if company_id is not None:
+            row = conn.execute("SELECT period_name, deadline FROM periods WHERE is_active=1 AND company_id=? LIMIT 1", (company_id,)).fetchone()
+        if not row:
+            row = conn.execute("SELECT period_name, deadline FROM periods WHERE is_active=1 LIMIT 1").fetchone()
         if row:
             return row['period_name'], row['deadline']
         
@@ -152,39 +438,52 @@ def get_active_period_info():
             return period, dl['deadline'] if dl else ""
             
         return "2026-Q1", "2026-03-31"
-    except Exception as e:
-        print(f"Greška pri dohvatu perioda: {e}")
-        return "2026-Q1", "2026-03-31"
-    finally:
-        conn.close()
+
+def invalidate_period_cache(company_id=None):
+    """Poziva se nakon svake promjene u tablici periods (aktivacija, rok, novo, brisanje)."""
+    cache.invalidate(cache.PERIOD_SCOPE, company_id)
+    # Redoslijed razdoblja u povijesti ovisi o periods.start_date
+    cache.invalidate(cache.HISTORY_SCOPE, company_id)
 
 def log_action(user, action, details, company_id=1):
-    """Zapisuje akciju u audit log (za sigurnost i praćenje)."""
-    try:
-        conn = get_connection()
-        conn.execute("INSERT INTO audit_log (timestamp, user, action, details, company_id) VALUES (?,?,?,?,?)", 
-                     (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), user, action, details, company_id))
-        conn.commit()
-        conn.close()
-    except: pass
+    """Zapisuje akciju u audit log (za sigurnost i praćenje).
 
-def perform_backup(auto=False):
-    """Kreira sigurnosnu kopiju baze podataka."""
-    if not os.path.exists(DB_FILE): return False, "Baza ne postoji"
-    try:
-        if not os.path.exists("backups"): os.makedirs("backups")
-        prefix = "AUTO" if auto else "MANUAL"
-        fname = f"backups/{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-        
-        src = get_connection()
-        dst = sqlite3.connect(fname)
-        src.backup(dst)
-        dst.close()
-        src.close()
-        return True, fname
-    except Exception as e:
-        return False, str(e)
+    Ne blokira: zapis se predaje pozadinskom pisaču (modules/audit.py), vrijeme se bilježi odmah.
+    """
+    get_audit_writer(DB_FILE).submit((datetime.now().strftime("%Y-%m-%d %H:%M:%S"), user, action, details, company_id))
+
+def flush_audit_log(timeout=5.0):
+    """Čeka da se svi predani audit zapisi upišu u bazu."""
+    return get_audit_writer(DB_FILE).flush(timeout)
+
+def get_audit_stats():
+    """Metrike audit pisača (upisano, odbačeno, neuspjelo, u redu čekanja)."""
+    return get_audit_writer(DB_FILE).stats()
+
+def archive_audit_log(retention_months=None):
+    """Seli mjesece starije od retencije u AUDIT_ARCHIVE_DIR. Vraća {'YYYY-MM': broj_redova}."""
+    flush_audit_log()
+    if retention_months is None:
+        return audit.archive_audit_log(DB_FILE, AUDIT_ARCHIVE_DIR)
+    return audit.archive_audit_log(DB_FILE, AUDIT_ARCHIVE_DIR, retention_months)
+
+def perform_backup(auto=False, force=False):
+    """Kreira sigurnosnu kopiju baze podataka (preskače se ako baza nije mijenjana). Vraća (uspjeh, poruka)."""
+    result = backup.create_backup(DB_FILE, BACKUP_DIR, kind="AUTO" if auto else "MANUAL", force=force)
+    return result["status"] != "failed", result["message"]
+
+def restore_backup(file_name):
+    """Vraća bazu iz backupa (trenutno stanje se prije sprema kao PRERESTORE backup). Vraća (uspjeh, poruka)."""
+    flush_audit_log()
+    result = backup.restore_backup(DB_FILE, BACKUP_DIR, file_name, get_pool(DB_FILE))
+    if result["status"] != "restored":
+        return False, result["message"]
+    # Stariji backup možda nema najnovije migracije; cachevi pokazuju podatke prije vraćanja
+    init_db()
+    for scope in (cache.PERIOD_SCOPE, cache.SURVEY_SCOPE, cache.HISTORY_SCOPE):
+        cache.invalidate(scope)
+    return True, result["message"]
 
 def get_available_backups():
-    """Vraća listu dostupnih backup datoteka."""
-    return glob.glob("backups/*.db")
\ No newline at end of file
+    """Vraća listu backupa s metapodacima (file, path, created, size, sha256...), najnoviji prvi."""
+    return backup.list_backups(BACKUP_DIR)
\ No newline at end of file
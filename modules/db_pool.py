@@ -0,0 +1,265 @@
+# modules/db_pool.py
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from modules import profiler
+from modules.constants import POOL_MAX_READERS, POOL_MAX_WRITERS, POOL_TIMEOUT, POOL_HEALTH_CHECK_SECONDS
+
+# PRAGMA postavke se izvršavaju JEDNOM po konekciji (pri otvaranju), ne po upitu.
+# WAL mode omogućuje istovremeno čitanje i pisanje bez zaključavanja.
+BASE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA busy_timeout=5000;",
+    "PRAGMA foreign_keys=ON;",
+]
+
+READER, WRITER = "reader", "writer"
+
+
+class PoolTimeout(Exception):
+    """Nema slobodne konekcije u zadanom vremenu."""
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 konekcija koja se na close() vraća u pool umjesto da se stvarno zatvori.
+
+    Nasljeđuje sqlite3.Connection kako bi pd.read_sql_query i dalje radio bez upozorenja.
+    """
+
+    # Profiler (modules/profiler.py): kad je uključen, kursori mjere vrijeme i broj redova.
+    # conn.execute() u C implementaciji ne poziva cursor(), pa se preusmjerava ručno.
+    def cursor(self, factory=sqlite3.Cursor):
+        if factory is sqlite3.Cursor and profiler.enabled():
+            factory = profiler.ProfiledCursor
+        return sqlite3.Connection.cursor(self, factory)
+
+    def execute(self, sql, parameters=()):
+        if profiler.enabled():
+            return self.cursor().execute(sql, parameters)
+        return sqlite3.Connection.execute(self, sql, parameters)
+
+    def executemany(self, sql, parameters):
+        if profiler.enabled():
+            return self.cursor().executemany(sql, parameters)
+        return sqlite3.Connection.executemany(self, sql, parameters)
+
+    def close(self):
+        pool = getattr(self, "_pool", None)
+        if pool is not None:
+            pool._release(self)
+        else:
+            sqlite3.Connection.close(self)
+
+    def _close_for_real(self):
+        self._pool = None
+        sqlite3.Connection.close(self)
+
+
+class ConnectionPool:
+    """Ograničeni, thread-safe pool s odvojenim konekcijama za čitanje i pisanje.
+
+    - čitači (READER) su u query_only modu, ima ih do max_readers,
+    - pisača (WRITER) je po defaultu jedan, pa se pisanja serijaliziraju u procesu
+      umjesto da se natječu za WAL write lock,
+    - ista nit koja već drži konekciju dobiva istu (reentrant), pa ugniježđeni
+      pozivi (npr. get_active_period_info unutar pogleda) ne mogu izazvati deadlock;
+      nit koja drži pisača čita preko njega.
+    """
+
+    def __init__(self, db_file, max_readers=POOL_MAX_READERS, max_writers=POOL_MAX_WRITERS,
+                 timeout=POOL_TIMEOUT, health_check_seconds=POOL_HEALTH_CHECK_SECONDS):
+        self.db_file = db_file
+        self.timeout = timeout
+        self.health_check_seconds = health_check_seconds
+        self._limits = {READER: max_readers, WRITER: max_writers}
+        self._idle = {READER: [], WRITER: []}
+        self._open = {READER: 0, WRITER: 0}
+        self._in_use = {READER: 0, WRITER: 0}
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._metrics = {
+            kind: {"checkouts": 0, "wait_total": 0.0, "wait_max": 0.0, "high_water": 0,
+                   "created": 0, "health_failures": 0, "timeouts": 0}
+            for kind in (READER, WRITER)
+        }
+
+    # --- Otvaranje i provjera konekcija ---
+    def _connect(self, kind):
+        # Povećan timeout na 30 sekundi da se izbjegne "Database is locked"
+        conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=30.0, factory=PooledConnection)
+        conn.row_factory = sqlite3.Row  # Omogućuje pristup stupcima po imenu
+        try:
+            for pragma in BASE_PRAGMAS:
+                conn.execute(pragma)
+            if kind == READER:
+                conn.execute("PRAGMA query_only=ON;")
+        except Exception as e:
+            print(f"Baza PRAGMA error: {e}")
+        conn._pool = self
+        conn._kind = kind
+        conn._last_used = time.monotonic()
+        self._metrics[kind]["created"] += 1
+        return conn
+
+    def _is_healthy(self, conn):
+        if time.monotonic() - conn._last_used < self.health_check_seconds:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    # --- Checkout / release ---
+    def _acquire(self, kind):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        conn = None
+        with self._cond:
+            while True:
+                if self._idle[kind]:
+                    conn = self._idle[kind].pop()
+                    break
+                if self._open[kind] < self._limits[kind]:
+                    self._open[kind] += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._metrics[kind]["timeouts"] += 1
+                    raise PoolTimeout(f"Nema slobodne {kind} konekcije nakon {self.timeout}s")
+                self._cond.wait(remaining)
+            waited = time.monotonic() - start
+            m = self._metrics[kind]
+            m["checkouts"] += 1
+            m["wait_total"] += waited
+            m["wait_max"] = max(m["wait_max"], waited)
+            self._in_use[kind] += 1
+            m["high_water"] = max(m["high_water"], self._in_use[kind])
+
+        try:
+            if conn is not None and not self._is_healthy(conn):
+                self._metrics[kind]["health_failures"] += 1
+                self._discard(conn, keep_slot=True)
+                conn = None
+            if conn is None:
+                conn = self._connect(kind)
+        except Exception:
+            with self._cond:
+                self._open[kind] -= 1
+                self._in_use[kind] -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def _release(self, conn):
+        kind = conn._kind
+        healthy = True
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            healthy = False
+        conn._last_used = time.monotonic()
+        with self._cond:
+            self._in_use[kind] -= 1
+            if healthy:
+                self._idle[kind].append(conn)
+            else:
+                self._open[kind] -= 1
+            self._cond.notify()
+        if not healthy:
+            self._discard(conn, keep_slot=True)
+
+    def _discard(self, conn, keep_slot=False):
+        try:
+            conn._close_for_real()
+        except sqlite3.Error:
+            pass
+        if not keep_slot:
+            with self._cond:
+                self._open[conn._kind] -= 1
+                self._cond.notify()
+
+    def _held(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    # --- Javni API ---
+    @contextmanager
+    def reader(self):
+        """Konekcija za čitanje. Unutar writer() bloka iste niti vraća pisača."""
+        held = self._held()
+        if held:
+            yield held[-1]
+            return
+        conn = self._acquire(READER)
+        held.append(conn)
+        try:
+            yield conn
+        finally:
+            held.pop()
+            self._release(conn)
+
+    @contextmanager
+    def writer(self):
+        """Konekcija za pisanje: commit na kraju bloka, rollback ako blok baci iznimku."""
+        held = self._held()
+        if held and held[-1]._kind == WRITER:
+            yield held[-1]
+            return
+        conn = self._acquire(WRITER)
+        held.append(conn)
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            held.pop()
+            self._release(conn)
+
+    def stats(self):
+        """Snapshot metrika poola (čekanje, broj checkouta, high-water mark...)."""
+        with self._cond:
+            out = {}
+            for kind in (READER, WRITER):
+                m = dict(self._metrics[kind])
+                m["avg_wait"] = m["wait_total"] / m["checkouts"] if m["checkouts"] else 0.0
+                m["open"] = self._open[kind]
+                m["idle"] = len(self._idle[kind])
+                m["in_use"] = self._in_use[kind]
+                m["limit"] = self._limits[kind]
+                out[kind] = m
+            return out
+
+    def close_idle(self):
+        """Zatvara sve slobodne konekcije (npr. nakon vraćanja baze iz backupa)."""
+        with self._cond:
+            idle = self._idle[READER] + self._idle[WRITER]
+            self._idle = {READER: [], WRITER: []}
+            for conn in idle:
+                self._open[conn._kind] -= 1
+            self._cond.notify_all()
+        for conn in idle:
+            try:
+                conn._close_for_real()
+            except sqlite3.Error:
+                pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_file):
+    """Vraća (i po potrebi kreira) process-wide pool za zadanu datoteku baze."""
+    with _pools_lock:
+        pool = _pools.get(db_file)
+        if pool is None:
+            pool = _pools[db_file] = ConnectionPool(db_file)
+        return pool
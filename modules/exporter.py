@@ -0,0 +1,173 @@
+# modules/exporter.py
+import csv
+import importlib.util
+import io
+import os
+import tempfile
+import time
+import zipfile
+
+from modules.database import read_connection
+from modules.constants import EXPORT_BATCH_ROWS, EXPORT_FILE_MAX_AGE
+
+# Redovi se čitaju iz SQLite kursora u batchevima od EXPORT_BATCH_ROWS i odmah pišu
+# u datoteku na disku, pa memorija ne raste s veličinom tvrtke (nema DataFrameova).
+
+# (naziv lista / datoteke, tablica, stupac perioda ili None)
+EXPORT_TABLES = [
+    ("Zaposlenici", "employees_master", None),
+    ("Procjene", "evaluations", "period"),
+    ("Ciljevi", "goals", "period"),
+    ("IDP", "development_plans", "period"),
+]
+
+EXPORT_FORMATS = {
+    "xlsx": "Excel (.xlsx)",
+    "csv": "CSV (.zip)",
+    "parquet": "Parquet (.zip)",
+}
+# Parquet piše pyarrow (requirements.txt); bez njega se opcija ne nudi (find_spec ne učitava paket)
+if importlib.util.find_spec("pyarrow") is None:
+    del EXPORT_FORMATS["parquet"]
+
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "talent_exports")
+
+def _table_query(table, period_col, company_id, period=None, department=None):
+    """SELECT za jednu tablicu s filterima; odjel se uvijek gleda preko employees_master."""
+    if table == "employees_master":
+        sql = "SELECT * FROM employees_master t WHERE t.company_id = ?"
+        params = [company_id]
+        if department:
+            sql += " AND t.department = ?"
+            params.append(department)
+        return sql + " ORDER BY t.kadrovski_broj", params
+    sql = f"SELECT t.* FROM {table} t"
+    params = [company_id]
+    if department:
+        sql += " JOIN employees_master em ON em.kadrovski_broj = t.kadrovski_broj"
+    sql += " WHERE t.company_id = ?"
+    if period and period_col:
+        sql += f" AND t.{period_col} = ?"
+        params.append(period)
+    if department:
+        sql += " AND em.department = ?"
+        params.append(department)
+    return sql + " ORDER BY t.id", params
+
+def _iter_tables(company_id, period, department):
+    """Generator (naziv, tablica, stupci, generator batcheva redova) za svaku tablicu exporta."""
+    with read_connection() as conn:
+        for name, table, period_col in EXPORT_TABLES:
+            sql, params = _table_query(table, period_col, company_id, period, department)
+            cur = conn.execute(sql, params)
+            columns = [d[0] for d in cur.description]
+
+            def batches(cur=cur):
+                while True:
+                    rows = cur.fetchmany(EXPORT_BATCH_ROWS)
+                    if not rows: break
+                    yield [tuple(r) for r in rows]
+
+            yield name, table, columns, batches()
+
+def _write_xlsx(path, company_id, period, department):
+    import xlsxwriter
+    # constant_memory: xlsxwriter odmah flusha svaki završeni red na disk
+    wb = xlsxwriter.Workbook(path, {'constant_memory': True, 'strings_to_numbers': False})
+    try:
+        header_fmt = wb.add_format({'bold': True})
+        for name, _, columns, batches in _iter_tables(company_id, period, department):
+            ws = wb.add_worksheet(name)
+            ws.write_row(0, 0, columns, header_fmt)
+            r = 1
+            for batch in batches:
+                for row in batch:
+                    ws.write_row(r, 0, row)
+                    r += 1
+    finally:
+        wb.close()
+
+def _write_csv_zip(path, company_id, period, department):
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, _, columns, batches in _iter_tables(company_id, period, department):
+            with zf.open(f"{name}.csv", "w", force_zip64=True) as raw:
+                # utf-8-sig da Excel ispravno prikaže hrvatske znakove
+                text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+                writer = csv.writer(text)
+                writer.writerow(columns)
+                for batch in batches:
+                    writer.writerows(batch)
+                text.flush()
+                text.detach()
+
+def _arrow_schema(conn, table, columns):
+    import pyarrow as pa
+    declared = {row[1]: (row[2] or "").upper() for row in conn.execute(f"PRAGMA table_info({table})")}
+    fields = []
+    for col in columns:
+        t = declared.get(col, "")
+        if "INT" in t: fields.append(pa.field(col, pa.int64()))
+        elif "REAL" in t or "FLOA" in t or "DOUB" in t: fields.append(pa.field(col, pa.float64()))
+        else: fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+def _coerce(value, kind):
+    # SQLite je dinamički tipiziran; vrijednosti koje ne odgovaraju deklariranom tipu postaju null
+    if value is None: return None
+    try:
+        if kind == "int": return int(value)
+        if kind == "float": return float(value)
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+def _write_parquet_zip(path, company_id, period, department):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name, table, columns, batches in _iter_tables(company_id, period, department):
+            with read_connection() as conn:
+                schema = _arrow_schema(conn, table, columns)
+            kinds = ["int" if pa.types.is_integer(f.type) else "float" if pa.types.is_floating(f.type) else "str" for f in schema]
+            fd, part = tempfile.mkstemp(suffix=".parquet", dir=EXPORT_DIR)
+            os.close(fd)
+            try:
+                with pq.ParquetWriter(part, schema) as writer:
+                    for batch in batches:
+                        arrays = [pa.array([_coerce(row[i], kinds[i]) for row in batch], type=schema.field(i).type)
+                                  for i in range(len(columns))]
+                        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                zf.write(part, f"{name}.parquet")
+            finally:
+                os.remove(part)
+
+_WRITERS = {"xlsx": _write_xlsx, "csv": _write_csv_zip, "parquet": _write_parquet_zip}
+
+def cleanup_exports(max_age=EXPORT_FILE_MAX_AGE):
+    """Briše stare export datoteke iz privremenog direktorija."""
+    if not os.path.isdir(EXPORT_DIR): return
+    cutoff = time.time() - max_age
+    for fname in os.listdir(EXPORT_DIR):
+        fpath = os.path.join(EXPORT_DIR, fname)
+        try:
+            if os.path.getmtime(fpath) < cutoff: os.remove(fpath)
+        except OSError:
+            pass
+
+def export_to_file(fmt, company_id, period=None, department=None):
+    """Piše export u privremenu datoteku i vraća (putanja, ime_za_download)."""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    cleanup_exports()
+    ext = "xlsx" if fmt == "xlsx" else "zip"
+    fd, path = tempfile.mkstemp(prefix=f"export_{company_id}_", suffix=f".{ext}", dir=EXPORT_DIR)
+    os.close(fd)
+    try:
+        _WRITERS[fmt](path, company_id, period, department)
+    except Exception:
+        os.remove(path)
+        raise
+    parts = ["export", time.strftime("%Y-%m-%d")]
+    if period: parts.append(str(period).replace(" ", "_"))
+    if department: parts.append(str(department).replace(" ", "_"))
+    suffix = "" if fmt == "xlsx" else f"_{fmt}"
+    return path, f"{'_'.join(parts)}{suffix}.{ext}"
@@ -0,0 +1,82 @@
+# modules/history.py
+import numpy as np
+import pandas as pd
+
+from modules.database import read_connection
+from modules.utils import ninebox_cells, ninebox_cell_label
+from modules import cache
+
+# Povijest (snail trail) za cijelu tvrtku: jedan upit po tvrtki, cacheiran u HISTORY_SCOPE
+# i invalidiran pri zaključavanju procjene ili promjeni razdoblja. Svi izračuni kretanja
+# (prijelazi ćelija, brzina, nizovi u istoj kategoriji) rade se vektorski nad cijelim DataFrameom.
+# Razdoblja se redaju po periods.start_date, a ne po nazivu ('2026-Q10' < '2026-Q2' kao string).
+
+HISTORY_COLUMNS = ['kadrovski_broj', 'ime_prezime', 'period', 'period_order', 'avg_performance', 'avg_potential',
+                   'category', 'box', 'prev_period', 'prev_box', 'd_perf', 'd_pot', 'velocity', 'moved', 'streak']
+
+def _load_history(company_id):
+    with read_connection() as conn:
+        df = pd.read_sql_query("""
+            SELECT ev.kadrovski_broj, ev.ime_prezime, ev.period, p.start_date,
+                   COALESCE(CAST(ev.avg_performance AS REAL), 0) AS avg_performance,
+                   COALESCE(CAST(ev.avg_potential AS REAL), 0) AS avg_potential,
+                   ev.category
+            FROM evaluations ev
+            LEFT JOIN periods p ON p.period_name = ev.period
+            WHERE ev.company_id = ? AND ev.is_self_eval = 0 AND ev.status = 'Submitted'
+        """, conn, params=(company_id,))
+    return compute_movements(df)
+
+def compute_movements(df):
+    """Dodaje redoslijed razdoblja i vektore kretanja po zaposleniku (ulaz: jedan red po procjeni)."""
+    df = df.copy()
+    # Razdoblja bez start_date idu na kraj, abecedno
+    order = (df[['period', 'start_date']].drop_duplicates('period')
+             .assign(_missing=lambda x: x['start_date'].isna())
+             .sort_values(['_missing', 'start_date', 'period'])['period'].tolist())
+    df['period_order'] = df['period'].map({p: i for i, p in enumerate(order)}).astype(int)
+    df = df.sort_values(['kadrovski_broj', 'period_order'], kind='stable').reset_index(drop=True)
+    df['box'] = ninebox_cells(df)
+
+    g = df.groupby('kadrovski_broj', sort=False)
+    first = g.cumcount().to_numpy() == 0
+    df['prev_period'] = g['period'].shift()
+    df['prev_box'] = g['box'].shift().fillna(-1).astype(int)
+    df['d_perf'] = g['avg_performance'].diff()
+    df['d_pot'] = g['avg_potential'].diff()
+    gap = g['period_order'].diff().to_numpy(dtype=float)
+    # Brzina = pomak u (učinak, potencijal) ravnini po razdoblju (preskočena razdoblja se računaju)
+    df['velocity'] = np.hypot(df['d_perf'], df['d_pot']) / np.where(gap > 0, gap, np.nan)
+    df['moved'] = ~first & (df['box'].to_numpy() != df['prev_box'].to_numpy())
+
+    # Niz = broj uzastopnih procjena u istoj kategoriji do uključivo ovog razdoblja;
+    # preskočeno razdoblje (gap > 1) prekida niz
+    cat = df['category'].fillna('').to_numpy()
+    new_run = first | np.r_[True, cat[1:] != cat[:-1]] | (gap > 1)
+    run_id = np.cumsum(new_run)
+    df['streak'] = df.groupby(run_id).cumcount() + 1
+    return df[HISTORY_COLUMNS]
+
+def get_history(company_id):
+    """Cijela povijest zaključanih voditeljskih procjena tvrtke s vektorima kretanja (cacheirano)."""
+    return cache.get_or_load(cache.HISTORY_SCOPE, company_id, "history", lambda: _load_history(company_id))
+
+def employee_trail(company_id, kadrovski_broj):
+    """Povijest jednog zaposlenika, poredana po razdobljima."""
+    h = get_history(company_id)
+    return h[h['kadrovski_broj'] == str(kadrovski_broj)].reset_index(drop=True)
+
+def transition_matrix(company_id, to_period=None, employee_ids=None):
+    """Broj prijelaza ćelija 9-box matrice (redak = prethodna ćelija, stupac = nova).
+
+    to_period ograničava na prijelaze koji završavaju u tom razdoblju, employee_ids na skup zaposlenika.
+    """
+    h = get_history(company_id)
+    mask = h['prev_box'].to_numpy() >= 0
+    if to_period is not None:
+        mask &= (h['period'] == to_period).to_numpy()
+    if employee_ids is not None:
+        mask &= h['kadrovski_broj'].isin([str(x) for x in employee_ids]).to_numpy()
+    counts = np.bincount(h['prev_box'].to_numpy()[mask] * 9 + h['box'].to_numpy()[mask], minlength=81).reshape(9, 9)
+    labels = [ninebox_cell_label(i) for i in range(9)]
+    return pd.DataFrame(counts, index=pd.Index(labels, name="Prije"), columns=pd.Index(labels, name="Poslije"))
@@ -0,0 +1,284 @@
+# modules/importer.py
+import os
+import csv
+import sqlite3
+import tempfile
+import pandas as pd
+
+from modules.database import read_connection, write_connection
+from modules.constants import IMPORT_CHUNK_ROWS
+
+# Ugovor stupaca za import zaposlenika (Excel / HRIS export)
+IMPORT_COLUMNS = ['kadrovski_broj', 'ime_prezime', 'radno_mjesto', 'department', 'manager_id', 'is_manager']
+
+# Razlozi odbijanja reda (prikazuju se HR-u u sažetku)
+REJECT_EMPTY_ID = "Prazan kadrovski_broj"
+REJECT_DUPLICATE = "Duplikat u datoteci (vrijedi zadnji red)"
+REJECT_OTHER_COMPANY = "Kadrovski broj pripada drugoj tvrtki"
+REJECT_SELF_MANAGER = "Zaposlenik je sam sebi nadređeni"
+REJECT_DANGLING = "Nepostojeći manager_id"
+REJECT_CYCLE = "Ciklus u hijerarhiji"
+
+_STAGE_DDL = """CREATE TABLE import_stage (
+    row_no INTEGER PRIMARY KEY,
+    kadrovski_broj TEXT, ime_prezime TEXT, radno_mjesto TEXT, department TEXT,
+    manager_id TEXT, is_manager INTEGER, reject_reason TEXT
+)"""
+
+def clean_id_series(s):
+    """Vektorizirana verzija čišćenja ID-eva iz Excela (NaN/None/'' -> '', '123.0' -> '123')."""
+    s = s.astype(object).where(s.notna(), "").astype(str).str.strip()
+    s = s.mask(s.str.lower().isin(['nan', 'none']), "")
+    return s.str.replace(r"\.0$", "", regex=True)
+
+def _text_series(df, col):
+    if col not in df.columns:
+        return pd.Series([None] * len(df), index=df.index, dtype=object)
+    s = df[col].astype(object)
+    return s.where(s.notna(), None)
+
+def normalize_import_frame(df, first_row_no=2):
+    """Svodi ulazni DataFrame na IMPORT_COLUMNS + row_no (redni broj retka u datoteci, zaglavlje je red 1)."""
+    out = pd.DataFrame(index=df.index)
+    out['row_no'] = range(first_row_no, first_row_no + len(df))
+    out['kadrovski_broj'] = clean_id_series(df['kadrovski_broj']) if 'kadrovski_broj' in df.columns else ""
+    out['ime_prezime'] = _text_series(df, 'ime_prezime')
+    out['radno_mjesto'] = _text_series(df, 'radno_mjesto')
+    out['department'] = _text_series(df, 'department')
+    out['manager_id'] = clean_id_series(df['manager_id']) if 'manager_id' in df.columns else ""
+    if 'is_manager' in df.columns:
+        flag = df['is_manager'].astype(str).str.strip().str.lower()
+        out['is_manager'] = flag.isin(['da', '1', '1.0', 'true']).astype(int)
+    else:
+        out['is_manager'] = 0
+    return out
+
+# --- ČITANJE U CHUNKOVIMA ---
+# Svaki reader vraća generator parova (DataFrame, udio_obrađenog 0..1), tako da
+# se datoteka nikad ne parsira cijela odjednom i da HR vidi napredak.
+
+IMPORT_FORMATS = ['xlsx', 'csv', 'parquet']
+
+def _file_size(f):
+    pos = f.tell()
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(pos)
+    return size or 1
+
+def _sniff_delimiter(f):
+    # HRIS exporti dolaze i s ',' i s ';' (hrvatski Excel) - gledamo samo početak datoteke
+    pos = f.tell()
+    sample = f.read(65536)
+    f.seek(pos)
+    if isinstance(sample, bytes): sample = sample.decode('utf-8-sig', errors='ignore')
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ","
+
+def _iter_csv(f, chunk_rows):
+    size = _file_size(f)
+    sep = _sniff_delimiter(f)
+    # dtype=str: ID-evi ostaju tekst (bez '123.0'), prazne ćelije su NaN
+    for chunk in pd.read_csv(f, chunksize=chunk_rows, dtype=str, sep=sep, encoding='utf-8-sig'):
+        yield chunk, min(f.tell() / size, 1.0)
+
+def _iter_parquet(f, chunk_rows):
+    import pyarrow.parquet as pq
+    pf = pq.ParquetFile(f)
+    total = pf.metadata.num_rows or 1
+    columns = [c for c in IMPORT_COLUMNS if c in pf.schema_arrow.names]
+    done = 0
+    for batch in pf.iter_batches(batch_size=chunk_rows, columns=columns):
+        done += batch.num_rows
+        yield batch.to_pandas(), done / total
+
+def _iter_xlsx(f, chunk_rows):
+    # read_only način čita list kao stream redova umjesto da gradi cijeli workbook u memoriji
+    from openpyxl import load_workbook
+    wb = load_workbook(f, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows, [])]
+        total = max((ws.max_row or 1) - 1, 1)
+        buf, done = [], 0
+        for row in rows:
+            buf.append(row)
+            if len(buf) >= chunk_rows:
+                done += len(buf)
+                yield pd.DataFrame(buf, columns=header), min(done / total, 1.0)
+                buf = []
+        if buf or not done:
+            yield pd.DataFrame(buf, columns=header), 1.0
+    finally:
+        wb.close()
+
+def iter_import_chunks(f, file_name, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Generator (DataFrame, udio) za xlsx/csv/parquet datoteku, po chunk_rows redova."""
+    ext = os.path.splitext(file_name)[1].lower().lstrip('.')
+    if ext == 'csv': return _iter_csv(f, chunk_rows)
+    if ext == 'parquet': return _iter_parquet(f, chunk_rows)
+    if ext == 'xlsx': return _iter_xlsx(f, chunk_rows)
+    raise ValueError(f"Nepodržan format datoteke: {file_name}")
+
+# --- STAGING ---
+# Redovi se prvo učitavaju u privatnu privremenu SQLite datoteku (ne drži write lock
+# glavne baze), tamo se validiraju, a tek se onda jednom transakcijom prenose u bazu.
+
+def _open_stage():
+    fd, path = tempfile.mkstemp(prefix="talent_import_", suffix=".db")
+    os.close(fd)
+    stage = sqlite3.connect(path)
+    stage.execute("PRAGMA journal_mode=OFF")
+    stage.execute("PRAGMA synchronous=OFF")
+    stage.execute(_STAGE_DDL)
+    stage.execute("CREATE INDEX idx_stage_kid ON import_stage (kadrovski_broj)")
+    return stage, path
+
+def _stage_frame(stage, frame):
+    frame = frame.copy()
+    frame['reject_reason'] = None
+    frame.loc[frame['kadrovski_broj'] == "", 'reject_reason'] = REJECT_EMPTY_ID
+    cols = ['row_no'] + IMPORT_COLUMNS + ['reject_reason']
+    stage.executemany(
+        f"INSERT INTO import_stage ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+        frame[cols].itertuples(index=False, name=None))
+
+def _reject(stage, reasons):
+    """reasons: {row_no: razlog}"""
+    stage.executemany("UPDATE import_stage SET reject_reason=? WHERE row_no=?", [(r, n) for n, r in reasons.items()])
+
+def _find_cycles(parent):
+    """Vraća skup čvorova koji leže na ciklusu u grafu {čvor: roditelj} (jedan prolaz, O(n))."""
+    state = {}  # 1 = na trenutnom putu, 2 = obrađen
+    in_cycle = set()
+    for start in parent:
+        if start in state: continue
+        path = []
+        node = start
+        while node in parent and node not in state:
+            state[node] = 1
+            path.append(node)
+            node = parent[node]
+        if state.get(node) == 1:
+            in_cycle.update(path[path.index(node):])
+        for n in path:
+            state[n] = 2
+    return in_cycle
+
+def _hierarchy_rejects(parent, rows):
+    """Nepostojeći manageri i ciklusi u hijerarhiji nakon importa.
+
+    parent je postojeća hijerarhija tvrtke {kadrovski_broj: manager_id}, rows redovi iz datoteke
+    {kadrovski_broj: manager_id}. Vraća {kadrovski_broj: razlog} za odbijene redove. Odbijeni red
+    se ne importira, pa se provjere ponavljaju dok ima novih odbijanja: tko prijavljuje odbijenom
+    (novom) zaposleniku postaje nepostojeći, a odbijeni postojeći zaposlenik zadržava staru vezu.
+    """
+    rows = dict(rows)
+    rejected = {}
+    while True:
+        known_ids = set(parent) | set(rows)
+        new = {kid: REJECT_DANGLING for kid, mid in rows.items() if mid and mid not in known_ids}
+        if not new:
+            # Hijerarhija nakon importa = postojeća hijerarhija tvrtke + prihvaćeni redovi iz datoteke
+            graph = {k: v for k, v in {**parent, **rows}.items() if v}
+            new = {kid: REJECT_CYCLE for kid in _find_cycles(graph) if kid in rows}
+        if not new:
+            return rejected
+        rejected.update(new)
+        for kid in new:
+            del rows[kid]
+
+def _validate_stage(stage, company_id):
+    """Duplikati, tuđa tvrtka, self-reference, nepostojeći manager i ciklusi (ponavljano do stabilnog skupa)."""
+    stage.execute("""UPDATE import_stage SET reject_reason=?
+        WHERE reject_reason IS NULL AND row_no < (
+            SELECT MAX(s2.row_no) FROM import_stage s2 WHERE s2.kadrovski_broj = import_stage.kadrovski_broj)""",
+        (REJECT_DUPLICATE,))
+
+    with read_connection() as conn:
+        existing = conn.execute("SELECT kadrovski_broj, manager_id, company_id FROM employees_master").fetchall()
+    other_company = {r[0] for r in existing if r[2] is not None and r[2] != company_id}
+    parent = {r[0]: (r[1] or "") for r in existing if r[2] == company_id}
+
+    rows = stage.execute("SELECT row_no, kadrovski_broj, manager_id FROM import_stage WHERE reject_reason IS NULL").fetchall()
+    reasons = {}
+    accepted = {}
+    for row_no, kid, mid in rows:
+        if kid in other_company: reasons[row_no] = REJECT_OTHER_COMPANY
+        elif mid and mid == kid: reasons[row_no] = REJECT_SELF_MANAGER
+        else: accepted[kid] = (row_no, mid)
+
+    rejected = _hierarchy_rejects(parent, {kid: mid for kid, (_, mid) in accepted.items()})
+    reasons.update({accepted[kid][0]: reason for kid, reason in rejected.items()})
+    _reject(stage, reasons)
+
+def _apply_stage(stage_path, company_id, password_hash):
+    """Set-based upsert iz staging tablice u employees_master i users, u jednoj transakciji."""
+    with write_connection() as conn:
+        conn.execute("ATTACH DATABASE ? AS stage", (stage_path,))
+        try:
+            counts = conn.execute("""
+                SELECT
+                    SUM(e.kadrovski_broj IS NULL),
+                    SUM(e.kadrovski_broj IS NOT NULL AND (
+                        e.ime_prezime IS NOT s.ime_prezime OR e.radno_mjesto IS NOT s.radno_mjesto OR
+                        e.department IS NOT s.department OR e.manager_id IS NOT s.manager_id OR
+                        e.is_manager IS NOT s.is_manager OR e.active IS NOT 1)),
+                    COUNT(*)
+                FROM stage.import_stage s
+                LEFT JOIN main.employees_master e ON e.kadrovski_broj = s.kadrovski_broj
+                WHERE s.reject_reason IS NULL
+            """).fetchone()
+            conn.execute("""
+                INSERT INTO main.employees_master (kadrovski_broj, ime_prezime, radno_mjesto, department, manager_id, is_manager, active, company_id)
+                SELECT kadrovski_broj, ime_prezime, radno_mjesto, department, manager_id, is_manager, 1, ?
+                FROM stage.import_stage WHERE reject_reason IS NULL
+                ON CONFLICT(kadrovski_broj) DO UPDATE SET
+                    ime_prezime=excluded.ime_prezime, radno_mjesto=excluded.radno_mjesto,
+                    department=excluded.department, manager_id=excluded.manager_id,
+                    is_manager=excluded.is_manager, active=1, company_id=excluded.company_id
+            """, (company_id,))
+            users_created = conn.execute("""
+                INSERT OR IGNORE INTO main.users (username, password, role, department, company_id)
+                SELECT kadrovski_broj, ?, CASE WHEN is_manager THEN 'Manager' ELSE 'Employee' END, department, ?
+                FROM stage.import_stage WHERE reject_reason IS NULL
+            """, (password_hash, company_id)).rowcount
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.execute("DETACH DATABASE stage")
+    inserted, updated, accepted = (int(x or 0) for x in counts)
+    return {'inserted': inserted, 'updated': updated, 'unchanged': accepted - inserted - updated,
+            'users_created': users_created}
+
+def import_employees(chunks, company_id, password_hash, progress=None):
+    """Import zaposlenika iz niza (DataFrame, udio) chunkova, vidi iter_import_chunks.
+
+    progress(redova_učitano, udio) se poziva nakon svakog chunka.
+    Vraća sažetak: {'total', 'inserted', 'updated', 'unchanged', 'users_created',
+                    'rejected': DataFrame(row_no, kadrovski_broj, reject_reason)}
+    """
+    stage, stage_path = _open_stage()
+    try:
+        next_row = 2
+        for df, fraction in chunks:
+            frame = normalize_import_frame(df, next_row)
+            _stage_frame(stage, frame)
+            next_row += len(frame)
+            if progress: progress(next_row - 2, fraction)
+        _validate_stage(stage, company_id)
+        stage.commit()
+        rejected = pd.read_sql_query(
+            "SELECT row_no, kadrovski_broj, reject_reason FROM import_stage WHERE reject_reason IS NOT NULL ORDER BY row_no", stage)
+        summary = _apply_stage(stage_path, company_id, password_hash)
+    finally:
+        stage.close()
+        os.remove(stage_path)
+    summary['total'] = next_row - 2
+    summary['rejected'] = rejected
+    return summary
@@ -0,0 +1,246 @@
+# modules/profiler.py
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from modules.constants import PROFILER_ENABLED, PROFILER_MAX_RUNS, PROFILER_MAX_QUERIES_PER_RUN, PROFILER_SAMPLES
+
+# Opt-in profiler upita po Streamlit rerunu. Kad je uključen, PooledConnection daje
+# ProfiledCursor koji mjeri execute + dohvat redova; upiti se bilježe samo u niti koja
+# izvodi skriptu (begin_run/end_run u main.py), pozadinske niti (audit, backup) se ne broje.
+# Bilježi se samo OBLIK parametara (broj, imena), nikad vrijednosti - u upitima su i lozinke.
+# Kad je isključen, jedini trošak je provjera zastavice pri otvaranju kursora.
+
+_enabled = PROFILER_ENABLED or os.environ.get("TALENT_PROFILE") == "1"
+
+_lock = threading.Lock()
+_local = threading.local()
+_runs = deque(maxlen=PROFILER_MAX_RUNS)
+_statements = {}    # normalizirani SQL -> {'count', 'total', 'rows', 'samples'}
+_views = {}         # naziv pogleda -> {'count', 'total', 'samples'}
+
+
+def enabled():
+    return _enabled
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = bool(on)
+
+
+def reset():
+    with _lock:
+        _runs.clear()
+        _statements.clear()
+        _views.clear()
+
+
+# --- NORMALIZACIJA ---
+_RE_WS = re.compile(r"\s+")
+_RE_STR = re.compile(r"'(?:[^']|'')*'")
+_RE_NUM = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize_sql(sql):
+    """SQL bez literala i viška razmaka; IN (?,?,...) liste se sažimaju da se upiti grupiraju."""
+    s = _RE_WS.sub(" ", sql).strip()
+    s = _RE_STR.sub("?", s)
+    s = _RE_NUM.sub("?", s)
+    return _RE_IN_LIST.sub("(?, ...)", s)
+
+
+def _param_shape(params):
+    if params is None: return ""
+    if isinstance(params, dict): return "named:" + ",".join(sorted(params))
+    try:
+        return str(len(params))
+    except TypeError:
+        return "?"
+
+
+# --- RERUN I POGLEDI ---
+def _current():
+    return getattr(_local, "run", None) if _enabled else None
+
+
+def begin_run(user=None):
+    """Početak reruna u ovoj niti (nedovršeni prethodni run, npr. nakon st.rerun, se zatvara)."""
+    if getattr(_local, "run", None) is not None:
+        end_run(interrupted=True)
+    if not _enabled: return
+    _local.run = {"started": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "user": user, "view": None,
+                  "t0": time.perf_counter(), "queries": [], "dropped": 0}
+
+
+def end_run(interrupted=False):
+    """Zatvara rerun ove niti i pribraja ga agregatima."""
+    run = getattr(_local, "run", None)
+    _local.run = None
+    if run is None: return
+    run["total_ms"] = (time.perf_counter() - run.pop("t0")) * 1000
+    run["sql_ms"] = sum(q["ms"] for q in run["queries"])
+    run["interrupted"] = interrupted
+    with _lock:
+        for q in run["queries"]:
+            agg = _statements.get(q["sql"])
+            if agg is None:
+                agg = _statements[q["sql"]] = {"count": 0, "total": 0.0, "rows": 0, "samples": deque(maxlen=PROFILER_SAMPLES)}
+            agg["count"] += 1
+            agg["total"] += q["ms"]
+            agg["rows"] += max(q["rows"], 0)
+            agg["samples"].append(q["ms"])
+        _runs.append(run)
+
+
+@contextmanager
+def view(name):
+    """Mjeri renderiranje pogleda; set_view() unutar bloka može dodati podizbornik u naziv."""
+    run = _current()
+    if run is None:
+        yield
+        return
+    run["view"] = name
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - t0) * 1000
+        run["view_ms"] = ms
+        with _lock:
+            agg = _views.get(run["view"])
+            if agg is None:
+                agg = _views[run["view"]] = {"count": 0, "total": 0.0, "samples": deque(maxlen=PROFILER_SAMPLES)}
+            agg["count"] += 1
+            agg["total"] += ms
+            agg["samples"].append(ms)
+
+
+@contextmanager
+def fragment(name, user=None):
+    """Rerun samo fragmenta (st.fragment) ne prolazi kroz main.py - mjeri se kao zaseban rerun.
+    Unutar punog reruna fragment je dio pogleda i ovdje se ništa ne radi."""
+    if not _enabled or getattr(_local, "run", None) is not None:
+        yield
+        return
+    begin_run(user)
+    try:
+        with view(name):
+            yield
+    finally:
+        end_run()
+
+
+def set_view(sub):
+    """Dodaje podizbornik nazivu trenutnog pogleda (npr. 'HR Panel › Export')."""
+    run = _current()
+    if run is not None and run["view"]:
+        run["view"] = f"{run['view']} › {sub}"
+
+
+# --- KURSOR ---
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor koji mjeri vrijeme izvršavanja i dohvata te broj redova (samo unutar aktivnog reruna)."""
+
+    _rec = None
+
+    def _begin(self, sql, shape):
+        run = _current()
+        if run is None:
+            self._rec = None
+            return
+        if len(run["queries"]) >= PROFILER_MAX_QUERIES_PER_RUN:
+            run["dropped"] += 1
+            self._rec = None
+            return
+        self._rec = {"sql": normalize_sql(sql), "params": shape, "rows": 0, "ms": 0.0, "view": run["view"]}
+        run["queries"].append(self._rec)
+
+    def _timed(self, fn, *args):
+        rec = self._rec
+        if rec is None: return fn(*args)
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            rec["ms"] += (time.perf_counter() - t0) * 1000
+
+    def execute(self, sql, params=()):
+        self._begin(sql, _param_shape(params))
+        cur = self._timed(super().execute, sql, params)
+        if self._rec is not None and self.rowcount > 0: self._rec["rows"] = self.rowcount
+        return cur
+
+    def executemany(self, sql, seq_of_params):
+        if not isinstance(seq_of_params, (list, tuple)): seq_of_params = list(seq_of_params)
+        self._begin(sql, f"{len(seq_of_params)}x{_param_shape(seq_of_params[0]) if seq_of_params else 0}")
+        cur = self._timed(super().executemany, sql, seq_of_params)
+        if self._rec is not None and self.rowcount > 0: self._rec["rows"] = self.rowcount
+        return cur
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is not None and self._rec is not None: self._rec["rows"] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        if self._rec is not None: self._rec["rows"] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        if self._rec is not None: self._rec["rows"] += len(rows)
+        return rows
+
+    def __next__(self):
+        row = self._timed(super().__next__)
+        if self._rec is not None: self._rec["rows"] += 1
+        return row
+
+
+# --- IZVJEŠTAJI ---
+def _percentile(sorted_values, q):
+    if not sorted_values: return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def _summary(agg):
+    s = sorted(agg["samples"])
+    return {"count": agg["count"], "total_ms": agg["total"], "avg_ms": agg["total"] / agg["count"],
+            "p50_ms": _percentile(s, 0.5), "p95_ms": _percentile(s, 0.95), "max_ms": s[-1] if s else 0.0}
+
+
+def statement_stats():
+    """Po normaliziranom upitu: broj, ukupno/prosjek, p50/p95/max (ms) i prosječan broj redova."""
+    with _lock:
+        out = [dict(_summary(a), sql=sql, avg_rows=a["rows"] / a["count"]) for sql, a in _statements.items()]
+    return sorted(out, key=lambda r: r["p95_ms"], reverse=True)
+
+
+def view_stats():
+    """Po pogledu: broj renderiranja i p50/p95/max trajanja (ms)."""
+    with _lock:
+        out = [dict(_summary(a), view=name) for name, a in _views.items()]
+    return sorted(out, key=lambda r: r["p95_ms"], reverse=True)
+
+
+def recent_runs():
+    """Zadnji rerunovi (najnoviji prvi) bez pojedinačnih upita."""
+    with _lock:
+        runs = list(_runs)
+    return [{k: v for k, v in r.items() if k != "queries"} | {"queries": len(r["queries"])} for r in reversed(runs)]
+
+
+def dump_jsonl():
+    """Svi zapamćeni rerunovi kao JSONL (jedan rerun s upitima po retku) za offline analizu."""
+    with _lock:
+        runs = list(_runs)
+    return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in runs)
@@ -0,0 +1,429 @@
+# modules/repository.py
+import json
+from datetime import datetime, date
+import pandas as pd
+
+from modules.database import (
+    read_connection, write_connection, invalidate_period_cache, rebuild_ninebox_agg,
+    NINEBOX_PERF_SQL, NINEBOX_POT_SQL, NINEBOX_CELL_SQL
+)
+from modules.utils import safe_load_json, invalidate_survey_cache
+
+# Sloj pristupa podacima za poglede: views_* ne sadrže SQL nego zovu funkcije odavde,
+# pa se cacheiranje, batchiranje i mjerenje (tools/benchmark.py) rade na jednom mjestu
+# i bez preglednika. Svaka funkcija posuđuje konekciju iz poola samo za svoj upit i odmah je
+# vraća (pogled ne drži konekciju dok crta widgete). Pisanja invalidiraju odgovarajuće cacheve.
+#
+# Set-based upiti: popis zaposlenika se šalje kao JSON niz i raspakira preko json_each,
+# pa je svaki upit jedan round-trip bez obzira na veličinu tima
+# (i bez SQLite limita na broj '?' parametara).
+
+def _ids_param(employee_ids):
+    return json.dumps([str(x) for x in employee_ids])
+
+def _group(df, column, keys, columns=None):
+    """{key: DataFrame} za svaki traženi ključ; ključevi bez redova dobivaju (dijeljeni) prazan DataFrame."""
+    data = df if columns is None else df[columns]
+    grouped = {k: g.reset_index(drop=True) for k, g in data.groupby(df[column], sort=False)}
+    empty = data.iloc[0:0]
+    return {k: grouped.get(k, empty) for k in keys}
+
+def load_team_goals(employee_ids, period, with_kpis=True):
+    """Ciljevi (i KPI-evi) za skup zaposlenika u periodu u dva upita.
+
+    Vraća (goals_by_emp, kpis_by_goal):
+      goals_by_emp = {kadrovski_broj: DataFrame redova iz goals}
+      kpis_by_goal = {goal_id: DataFrame(description, weight, progress)}
+    """
+    employee_ids = [str(x) for x in employee_ids]
+    ids = _ids_param(employee_ids)
+    with read_connection() as conn:
+        goals = pd.read_sql_query("""
+            SELECT * FROM goals
+            WHERE period = ? AND kadrovski_broj IN (SELECT value FROM json_each(?))
+            ORDER BY id
+        """, conn, params=(period, ids))
+        kpis = None
+        if with_kpis:
+            kpis = pd.read_sql_query("""
+                SELECT k.goal_id, k.description, k.weight, k.progress
+                FROM goals g
+                JOIN goal_kpis k ON k.goal_id = g.id
+                WHERE g.period = ? AND g.kadrovski_broj IN (SELECT value FROM json_each(?))
+                ORDER BY k.id
+            """, conn, params=(period, ids))
+
+    goals_by_emp = _group(goals, 'kadrovski_broj', employee_ids)
+    kpis_by_goal = {}
+    if kpis is not None:
+        kpis_by_goal = _group(kpis, 'goal_id', goals['id'].tolist(), columns=['description', 'weight', 'progress'])
+    return goals_by_emp, kpis_by_goal
+
+def load_team_evaluations(employee_ids, period, company_id):
+    """Voditeljska i samoprocjena za skup zaposlenika u periodu, u jednom upitu.
+
+    Vraća {kadrovski_broj: {'mgr': dict|None, 'self': dict|None, 'mgr_answers': dict}}
+    gdje je mgr_answers već parsiran json_answers voditeljske procjene (za formu); usporedba
+    sa samoprocjenom ide preko evaluation_answers (load_answer_gap).
+    """
+    employee_ids = [str(x) for x in employee_ids]
+    out = {kid: {'mgr': None, 'self': None, 'mgr_answers': {}} for kid in employee_ids}
+    with read_connection() as conn:
+        rows = conn.execute("""
+            SELECT * FROM evaluations
+            WHERE period = ? AND company_id = ? AND kadrovski_broj IN (SELECT value FROM json_each(?))
+            ORDER BY id
+        """, (period, company_id, _ids_param(employee_ids))).fetchall()
+    for row in rows:
+        entry = out.get(row['kadrovski_broj'])
+        if entry is None: continue
+        which = 'self' if row['is_self_eval'] else 'mgr'
+        if entry[which] is not None: continue  # stari duplikati: vrijedi najstariji red
+        entry[which] = dict(row)
+        if which == 'mgr': entry['mgr_answers'] = safe_load_json(row['json_answers'])
+    return out
+
+def load_team_status(employee_ids, period, company_id):
+    """Statusi za zaglavlja popisa zaposlenika (ciljevi, procjena, IDP) u jednom upitu.
+
+    Vraća {kadrovski_broj: {'goals': int, 'goal_weight': int, 'eval_status': str|None,
+                            'self_eval': bool, 'idp_status': str|None}}
+    Sadržaj panela (forme, KPI-evi, IDP tablice) se učitava tek kad se panel otvori.
+    """
+    employee_ids = [str(x) for x in employee_ids]
+    with read_connection() as conn:
+        rows = conn.execute("""
+            SELECT ids.value AS kadrovski_broj,
+                   (SELECT COUNT(*) FROM goals g WHERE g.kadrovski_broj = ids.value AND g.period = ?1) AS goals,
+                   (SELECT COALESCE(SUM(g.weight), 0) FROM goals g WHERE g.kadrovski_broj = ids.value AND g.period = ?1) AS goal_weight,
+                   (SELECT e.status FROM evaluations e
+                    WHERE e.kadrovski_broj = ids.value AND e.period = ?1 AND e.company_id = ?2 AND e.is_self_eval = 0
+                    ORDER BY e.id LIMIT 1) AS eval_status,
+                   EXISTS (SELECT 1 FROM evaluations e
+                           WHERE e.kadrovski_broj = ids.value AND e.period = ?1 AND e.company_id = ?2 AND e.is_self_eval = 1) AS self_eval,
+                   (SELECT d.status FROM development_plans d WHERE d.kadrovski_broj = ids.value AND d.period = ?1
+                    ORDER BY d.id LIMIT 1) AS idp_status
+            FROM json_each(?3) AS ids
+        """, (period, company_id, _ids_param(employee_ids))).fetchall()
+    out = {kid: {'goals': 0, 'goal_weight': 0, 'eval_status': None, 'self_eval': False, 'idp_status': None} for kid in employee_ids}
+    for row in rows:
+        out[row['kadrovski_broj']] = {'goals': row['goals'], 'goal_weight': int(row['goal_weight'] or 0),
+                                      'eval_status': row['eval_status'], 'self_eval': bool(row['self_eval']),
+                                      'idp_status': row['idp_status']}
+    return out
+
+def _ninebox_agg_where(company_id, period, department, manager_id):
+    where, params = "company_id = ? AND period = ?", [company_id, period]
+    if department is not None:
+        where += " AND department = TRIM(?)"
+        params.append(department)
+    if manager_id is not None:
+        where += " AND manager_id = ?"
+        params.append(manager_id)
+    return where, params
+
+def load_ninebox_cells(company_id, period, department=None, manager_id=None):
+    """Broj zaključanih voditeljskih procjena po ćeliji 9-box mreže iz agregata ninebox_agg. Vraća listu od 9 brojeva."""
+    where, params = _ninebox_agg_where(company_id, period, department, manager_id)
+    counts = [0] * 9
+    with read_connection() as conn:
+        for cell, n in conn.execute(f"SELECT cell, SUM(n) FROM ninebox_agg WHERE {where} GROUP BY cell", params):
+            counts[cell] = n
+    return counts
+
+def load_ninebox_summary(company_id, period, department=None, manager_id=None):
+    """Sažetak 9-box matrice iz agregata ninebox_agg, po kategoriji.
+
+    Vraća DataFrame(category, n, sum_perf, sum_pot, avg_performance, avg_potential).
+    """
+    where, params = _ninebox_agg_where(company_id, period, department, manager_id)
+    sql = f"""
+        SELECT category, SUM(n) AS n, SUM(sum_perf) AS sum_perf, SUM(sum_pot) AS sum_pot
+        FROM ninebox_agg WHERE {where}
+        GROUP BY category ORDER BY n DESC
+    """
+    with read_connection() as conn:
+        df = pd.read_sql_query(sql, conn, params=params)
+    df['avg_performance'] = (df['sum_perf'] / df['n']).round(2)
+    df['avg_potential'] = (df['sum_pot'] / df['n']).round(2)
+    return df
+
+# --- ZAPOSLENICI ---
+def get_employee(kadrovski_broj):
+    """Red iz employees_master kao dict ili None."""
+    with read_connection() as conn:
+        row = conn.execute("SELECT * FROM employees_master WHERE kadrovski_broj=?", (kadrovski_broj,)).fetchone()
+    return dict(row) if row else None
+
+def get_team(manager_id, company_id):
+    """Izravni podređeni voditelja (DataFrame redova iz employees_master)."""
+    with read_connection() as conn:
+        return pd.read_sql_query("SELECT * FROM employees_master WHERE manager_id=? AND company_id=?",
+                                 conn, params=(manager_id, company_id))
+
+def get_company_employees(company_id):
+    """Svi zaposlenici tvrtke s imenom nadređenog (stupac 'Nadređeni Manager')."""
+    with read_connection() as conn:
+        return pd.read_sql_query("""
+            SELECT e.kadrovski_broj, e.ime_prezime, e.radno_mjesto, e.department, 
+                   m.ime_prezime as 'Nadređeni Manager', e.is_manager, e.active, e.manager_id
+            FROM employees_master e
+            LEFT JOIN employees_master m ON e.manager_id = m.kadrovski_broj
+            WHERE e.company_id = ?
+        """, conn, params=(company_id,))
+
+def save_employee(company_id, kadrovski_broj, ime_prezime, radno_mjesto, department, manager_id, is_manager, password_hash):
+    """Dodaje (ili zamjenjuje) zaposlenika i kreira mu račun ako ga nema."""
+    with write_connection() as conn:
+        conn.execute("""INSERT OR REPLACE INTO employees_master
+                        (kadrovski_broj, ime_prezime, radno_mjesto, department, manager_id, is_manager, active, company_id)
+                        VALUES (?,?,?,?,?,?,1,?)""",
+                     (kadrovski_broj, ime_prezime, radno_mjesto, department, manager_id, 1 if is_manager else 0, company_id))
+        conn.execute("INSERT OR IGNORE INTO users (username, password, role, department, company_id) VALUES (?,?,?,?,?)",
+                     (kadrovski_broj, password_hash, "Manager" if is_manager else "Employee", department, company_id))
+
+def update_employee(company_id, kadrovski_broj, ime_prezime, department, manager_id, password_hash=None):
+    """Mijenja ime, odjel i nadređenog (i lozinku ako je zadana); odjel i voditelj mijenjaju 9-box agregat."""
+    with write_connection() as conn:
+        conn.execute("UPDATE employees_master SET ime_prezime=?, department=?, manager_id=? WHERE kadrovski_broj=?",
+                     (ime_prezime, department, manager_id, kadrovski_broj))
+        conn.execute("UPDATE users SET department=? WHERE username=?", (department, kadrovski_broj))
+        if password_hash:
+            conn.execute("UPDATE users SET password=? WHERE username=?", (password_hash, kadrovski_broj))
+    rebuild_ninebox_agg(company_id)
+
+def delete_employee(company_id, kadrovski_broj):
+    """Trajno briše zaposlenika, njegov račun, procjene, ciljeve i IDP-ove."""
+    with write_connection() as conn:
+        for table, col in (("employees_master", "kadrovski_broj"), ("users", "username"), ("evaluations", "kadrovski_broj"),
+                           ("goals", "kadrovski_broj"), ("development_plans", "kadrovski_broj")):
+            conn.execute(f"DELETE FROM {table} WHERE {col}=?", (kadrovski_broj,))
+    rebuild_ninebox_agg(company_id)
+
+# --- PROCJENE ---
+def get_evaluation(kadrovski_broj, period, is_self_eval):
+    """Voditeljska (is_self_eval=False) ili samoprocjena zaposlenika u periodu kao dict ili None."""
+    with read_connection() as conn:
+        row = conn.execute("SELECT * FROM evaluations WHERE kadrovski_broj=? AND period=? AND is_self_eval=? ORDER BY id LIMIT 1",
+                           (kadrovski_broj, period, 1 if is_self_eval else 0)).fetchone()
+    return dict(row) if row else None
+
+_SUBMITTED_WHERE = """
+    FROM evaluations ev
+    JOIN employees_master em ON ev.kadrovski_broj = em.kadrovski_broj
+    WHERE ev.period = ? AND ev.company_id = ? AND ev.status = 'Submitted' AND ev.is_self_eval = 0
+      AND (? IS NULL OR TRIM(em.department) = TRIM(?))
+      AND (? IS NULL OR ev.manager_id = ?)
+"""
+
+def get_submitted_evaluations(company_id, period, department=None, manager_id=None, cell=None, limit=None, offset=0):
+    """Zaključane voditeljske procjene tvrtke u periodu, odjel iz employees_master.
+
+    cell ograničava na jednu ćeliju 9-box mreže (0-8), a limit/offset vraćaju jednu stranicu
+    sortiranu po imenu (tablica i popis kliknute ćelije; brojke dolaze iz ninebox_agg).
+    """
+    with read_connection() as conn:
+        return pd.read_sql_query(f"""
+            SELECT ev.kadrovski_broj, ev.ime_prezime,
+                   {NINEBOX_PERF_SQL} AS avg_performance, {NINEBOX_POT_SQL} AS avg_potential,
+                   ev.category, ev.is_self_eval, em.department
+            {_SUBMITTED_WHERE}
+              AND (? IS NULL OR {NINEBOX_CELL_SQL} = ?)
+            ORDER BY ev.ime_prezime, ev.id
+            LIMIT ? OFFSET ?
+        """, conn, params=(period, company_id, department, department, manager_id, manager_id, cell, cell,
+                           -1 if limit is None else limit, offset))
+
+# --- ODGOVORI PO PITANJU (evaluation_answers) ---
+def load_answer_gap(company_id, period, kadrovski_broj):
+    """Ocjene samoprocjene i voditelja po pitanju za jednog zaposlenika, u jednom upitu.
+
+    Vraća {question_id: {'self': float|None, 'mgr': float|None}}.
+    """
+    with read_connection() as conn:
+        rows = conn.execute("""
+            SELECT a.question_id,
+                   MAX(CASE WHEN ev.is_self_eval = 1 THEN a.score END) AS self_score,
+                   MAX(CASE WHEN ev.is_self_eval = 0 THEN a.score END) AS mgr_score
+            FROM evaluations ev
+            JOIN evaluation_answers a ON a.evaluation_id = ev.id
+            WHERE ev.company_id = ? AND ev.period = ? AND ev.kadrovski_broj = ?
+            GROUP BY a.question_id
+        """, (company_id, period, kadrovski_broj)).fetchall()
+    return {r['question_id']: {'self': r['self_score'], 'mgr': r['mgr_score']} for r in rows}
+
+def load_question_stats(company_id, period, department=None):
+    """Prosjeci po pitanju za zaključane procjene tvrtke u periodu, u jednom prolazu.
+
+    Vraća DataFrame(question_id, n_mgr, avg_mgr, n_self, avg_self, n_pairs, avg_gap) gdje je
+    avg_gap prosjek razlike voditelj - samoprocjena za zaposlenike koji imaju obje ocjene.
+    """
+    with read_connection() as conn:
+        return pd.read_sql_query("""
+            WITH per_emp AS (
+                SELECT ev.kadrovski_broj, a.question_id,
+                       MAX(CASE WHEN ev.is_self_eval = 0 THEN a.score END) AS mgr,
+                       MAX(CASE WHEN ev.is_self_eval = 1 THEN a.score END) AS self
+                FROM evaluations ev
+                JOIN evaluation_answers a ON a.evaluation_id = ev.id
+                JOIN employees_master em ON ev.kadrovski_broj = em.kadrovski_broj
+                WHERE ev.company_id = ? AND ev.period = ? AND ev.status = 'Submitted'
+                  AND (? IS NULL OR TRIM(em.department) = TRIM(?))
+                GROUP BY ev.kadrovski_broj, a.question_id
+            )
+            SELECT question_id, COUNT(mgr) AS n_mgr, ROUND(AVG(mgr), 2) AS avg_mgr,
+                   COUNT(self) AS n_self, ROUND(AVG(self), 2) AS avg_self,
+                   COUNT(mgr - self) AS n_pairs, ROUND(AVG(mgr - self), 2) AS avg_gap
+            FROM per_emp
+            GROUP BY question_id
+        """, conn, params=(company_id, period, department, department))
+
+def load_score_distribution(company_id, period, is_self_eval=False, department=None):
+    """Broj zaključanih ocjena po pitanju i ocjeni. Vraća DataFrame(question_id, score, n)."""
+    with read_connection() as conn:
+        return pd.read_sql_query("""
+            SELECT a.question_id, a.score, COUNT(*) AS n
+            FROM evaluations ev
+            JOIN evaluation_answers a ON a.evaluation_id = ev.id
+            JOIN employees_master em ON ev.kadrovski_broj = em.kadrovski_broj
+            WHERE ev.company_id = ? AND ev.period = ? AND ev.status = 'Submitted' AND ev.is_self_eval = ?
+              AND (? IS NULL OR TRIM(em.department) = TRIM(?))
+            GROUP BY a.question_id, a.score
+            ORDER BY a.question_id, a.score
+        """, conn, params=(company_id, period, 1 if is_self_eval else 0, department, department))
+
+# --- CILJEVI ---
+def add_goal(company_id, period, kadrovski_broj, manager_id, title, description, weight, deadline):
+    with write_connection() as conn:
+        conn.execute("""INSERT INTO goals (period, kadrovski_broj, manager_id, title, description, weight, progress, status, last_updated, deadline, company_id)
+                        VALUES (?,?,?,?,?,?,0,'On Track',?,?,?)""",
+                     (period, kadrovski_broj, manager_id, title, description, weight, datetime.now().strftime("%Y-%m-%d"), str(deadline), company_id))
+
+def update_goal(goal_id, title, weight, description):
+    with write_connection() as conn:
+        conn.execute("UPDATE goals SET title=?, weight=?, description=? WHERE id=?", (title, weight, description, goal_id))
+
+def delete_goal(goal_id):
+    """Briše cilj i sve njegove KPI-eve."""
+    with write_connection() as conn:
+        conn.execute("DELETE FROM goals WHERE id=?", (goal_id,))
+        conn.execute("DELETE FROM goal_kpis WHERE goal_id=?", (goal_id,))
+
+def save_goal_kpis(goal_id, kpis):
+    """Zamjenjuje KPI-eve cilja listom (opis, težina, ostvarenje) i upisuje ponderirani napredak cilja. Vraća napredak."""
+    progress = sum(w * p / 100 for _, w, p in kpis)
+    with write_connection() as conn:
+        conn.execute("DELETE FROM goal_kpis WHERE goal_id=?", (goal_id,))
+        conn.executemany("INSERT INTO goal_kpis (goal_id, description, weight, progress) VALUES (?,?,?,?)",
+                         [(goal_id, d, w, p) for d, w, p in kpis])
+        conn.execute("UPDATE goals SET progress=?, last_updated=? WHERE id=?", (progress, datetime.now().strftime("%Y-%m-%d"), goal_id))
+    return progress
+
+# --- RAZVOJNI PLANOVI (IDP) ---
+def load_team_development_plans(employee_ids, period):
+    """IDP-ovi skupa zaposlenika u periodu u jednom upitu. Vraća {kadrovski_broj: dict ili None}."""
+    employee_ids = [str(x) for x in employee_ids]
+    out = {kid: None for kid in employee_ids}
+    with read_connection() as conn:
+        rows = conn.execute("""
+            SELECT * FROM development_plans
+            WHERE period = ? AND kadrovski_broj IN (SELECT value FROM json_each(?))
+            ORDER BY id
+        """, (period, _ids_param(employee_ids))).fetchall()
+    for row in rows:
+        if out.get(row['kadrovski_broj'], 0) is None:
+            out[row['kadrovski_broj']] = dict(row)
+    return out
+
+def get_development_plan(kadrovski_broj, period):
+    """IDP zaposlenika u periodu kao dict ili None."""
+    return load_team_development_plans([kadrovski_broj], period)[str(kadrovski_broj)]
+
+def save_development_plan(company_id, period, kadrovski_broj, manager_id, plan):
+    """Zamjenjuje IDP zaposlenika u periodu; plan je dict sa stupcima development_plans."""
+    with write_connection() as conn:
+        conn.execute("DELETE FROM development_plans WHERE kadrovski_broj=? AND period=?", (kadrovski_broj, period))
+        conn.execute("""INSERT INTO development_plans 
+                        (period, kadrovski_broj, manager_id, strengths, areas_improve, career_goal, 
+                        json_70, json_20, json_10, support_needed, support_notes, status, company_id) 
+                        VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)""",
+                     (period, kadrovski_broj, manager_id, plan.get('strengths', ''), plan.get('areas_improve', ''), plan.get('career_goal', ''),
+                      plan.get('json_70', '[]'), plan.get('json_20', '[]'), plan.get('json_10', '[]'),
+                      plan.get('support_needed', ''), plan.get('support_notes', ''), plan.get('status', 'Active'), company_id))
+
+# --- RAZDOBLJA ---
+def get_periods(company_id):
+    """DataFrame(period_name, start_date, deadline, is_active), najnovije prvo."""
+    with read_connection() as conn:
+        return pd.read_sql_query("SELECT period_name, start_date, deadline, is_active FROM periods WHERE company_id=? ORDER BY period_name DESC",
+                                 conn, params=(company_id,))
+
+def get_export_periods(company_id):
+    """Sva razdoblja koja imaju procjene ili postoje u periods, najnovije prvo."""
+    with read_connection() as conn:
+        return [r[0] for r in conn.execute(
+            "SELECT DISTINCT period FROM evaluations WHERE company_id=? UNION SELECT period_name FROM periods WHERE company_id=? ORDER BY 1 DESC",
+            (company_id, company_id))]
+
+def activate_period(company_id, period_name):
+    with write_connection() as conn:
+        conn.execute("UPDATE periods SET is_active=0 WHERE company_id=?", (company_id,))
+        conn.execute("UPDATE periods SET is_active=1 WHERE period_name=? AND company_id=?", (period_name, company_id))
+        conn.execute("UPDATE app_settings SET setting_value=? WHERE setting_key='active_period'", (period_name,))
+    invalidate_period_cache()
+
+def set_period_deadline(period_name, deadline):
+    with write_connection() as conn:
+        conn.execute("UPDATE periods SET deadline=? WHERE period_name=?", (str(deadline), period_name))
+    invalidate_period_cache()
+
+def create_period(company_id, period_name, start_date, deadline):
+    with write_connection() as conn:
+        conn.execute("INSERT INTO periods (period_name, start_date, deadline, is_active, company_id) VALUES (?,?,?,0,?)",
+                     (period_name, str(start_date), str(deadline), company_id))
+    invalidate_period_cache(company_id)
+
+def delete_period(period_name):
+    with write_connection() as conn:
+        conn.execute("DELETE FROM periods WHERE period_name=?", (period_name,))
+    invalidate_period_cache()
+
+# --- UPITNICI ---
+def get_templates(company_id):
+    with read_connection() as conn:
+        return pd.read_sql_query("SELECT * FROM form_templates WHERE company_id=?", conn, params=(company_id,))
+
+def get_template_questions(template_id):
+    with read_connection() as conn:
+        return pd.read_sql_query("SELECT * FROM form_questions WHERE template_id=?", conn, params=(template_id,))
+
+def create_template(company_id, name, description):
+    with write_connection() as conn:
+        conn.execute("INSERT INTO form_templates (name, description, created_at, company_id) VALUES (?,?,?,?)",
+                     (name, description, datetime.now().strftime("%Y-%m-%d"), company_id))
+    invalidate_survey_cache(company_id)
+
+def add_template_question(company_id, template_id, section, title, description):
+    """section je 'p' (učinak) ili 'pot' (potencijal)."""
+    with write_connection() as conn:
+        conn.execute("""INSERT INTO form_questions (template_id, section, title, description, criteria_desc, company_id, order_index)
+                        VALUES (?,?,?,?,'',?,0)""", (template_id, section, title, description, company_id))
+    invalidate_survey_cache(company_id)
+
+def assign_template(company_id, period, template_id):
+    """Povezuje upitnik s razdobljem (zamjenjuje prethodno povezani)."""
+    with write_connection() as conn:
+        conn.execute("DELETE FROM cycle_templates WHERE period_name=? AND company_id=?", (period, company_id))
+        conn.execute("INSERT INTO cycle_templates (period_name, template_id, company_id) VALUES (?,?,?)", (period, int(template_id), company_id))
+    invalidate_survey_cache(company_id)
+
+# --- OSTALO ---
+def add_recognition(company_id, sender_id, receiver_id, message):
+    with write_connection() as conn:
+        conn.execute("INSERT INTO recognitions (sender_id, receiver_id, message, timestamp, company_id) VALUES (?,?,?,?,?)",
+                     (sender_id, receiver_id, message, str(date.today()), company_id))
+
+def get_users():
+    """Svi korisnički računi (bez lozinki) za Super Admin pregled."""
+    with read_connection() as conn:
+        return pd.read_sql_query("SELECT username, role, department FROM users", conn)
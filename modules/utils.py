@@ -1,9 +1,9 @@
 # modules/utils.py
 import hashlib
-import pandas as pd
+import hmac
+import base64
 import json
 import streamlit as st
-import sqlite3
 import os
 
 # IMPORT KONSTANTI (Sada uključuje i SECRET_SALT)
@@ -12,29 +12,65 @@ from modules.constants import (
     MAX_TEXT_LONG, 
     SECRET_SALT, 
     MIN_SCORE, 
-    MAX_SCORE
+    MAX_SCORE,
+    NINEBOX_DENSITY_THRESHOLD,
+    NINEBOX_PAGE_SIZE,
+    EMPLOYEE_PAGE_SIZE,
+    PASSWORD_SCRYPT_N,
+    PASSWORD_SCRYPT_R,
+    PASSWORD_SCRYPT_P
 )
+from modules.db_pool import get_pool
+from modules import cache
+
+# pandas/numpy/plotly se uvoze unutar funkcija koje ih trebaju: utils je na putu prijave
+# (database, auth), a ekran za prijavu ne treba nijedan od njih (vidi tools/import_benchmark.py).
 
 # Definiramo put ovdje da izbjegnemo kružni import
 BASE_DIR = os.path.dirname(os.path.abspath(__file__)).replace("modules", "")
-DB_FILE = os.path.join(BASE_DIR, 'talent_database.db')
+DB_FILE = os.environ.get('TALENT_DB_FILE') or os.path.join(BASE_DIR, 'talent_database.db')
 
 # --- SIGURNOST I HASHIRANJE ---
-def make_hashes(password):
-    """Kreira sigurni SHA256 hash s dodatkom 'salta' iz konstanti."""
-    # Ovdje koristimo SECRET_SALT koji smo uvezli
+# Format: "scrypt$n$r$p$salt$hash" (base64), s nasumičnim saltom po lozinci.
+# Stari hashovi (SHA256 + SECRET_SALT, 64 hex znaka) i dalje se prihvaćaju; auth ih
+# pri uspješnoj prijavi prepisuje u novi format (needs_rehash).
+def legacy_hash(password):
+    """Stari SHA256 hash s 'saltom' iz konstanti (samo za provjeru postojećih lozinki)."""
     return hashlib.sha256(str.encode(password + SECRET_SALT)).hexdigest()
 
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + 1024 * 1024, dklen=32)
+
+def make_hashes(password):
+    """Kreira scrypt hash lozinke s nasumičnim saltom (parametri iz konstanti)."""
+    salt = os.urandom(16)
+    n, r, p = PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P
+    digest = _scrypt(password, salt, n, r, p)
+    return f"scrypt${n}${r}${p}${base64.b64encode(salt).decode()}${base64.b64encode(digest).decode()}"
+
 def check_hashes(password, hashed_text):
-    """Provjerava podudara li se lozinka s hashom."""
-    return make_hashes(password) == hashed_text
+    """Provjerava podudara li se lozinka s hashom (scrypt ili stari SHA256)."""
+    if not hashed_text: return False
+    if hashed_text.startswith("scrypt$"):
+        try:
+            _, n, r, p, salt, digest = hashed_text.split("$")
+            expected = base64.b64decode(digest)
+            return hmac.compare_digest(_scrypt(password, base64.b64decode(salt), int(n), int(r), int(p)), expected)
+        except (ValueError, TypeError):
+            return False
+    return hmac.compare_digest(legacy_hash(password), hashed_text)
+
+def needs_rehash(hashed_text):
+    """True ako hash nije scrypt s trenutnim parametrima."""
+    return not str(hashed_text).startswith(f"scrypt${PASSWORD_SCRYPT_N}${PASSWORD_SCRYPT_R}${PASSWORD_SCRYPT_P}$")
 
 # --- SIGURNO UČITAVANJE PODATAKA (Safe Load) ---
 def safe_load_json(json_str, default_output=None):
     """Sigurno učitava JSON niz. Ako je neispravan, vraća default_output (prazan dict/list)."""
     if default_output is None:
         default_output = {}
-    if not json_str or pd.isna(json_str):
+    # None, NaN iz DataFramea i ostale ne-string vrijednosti tretiraju se kao prazno
+    if not isinstance(json_str, (str, bytes, bytearray)) or not json_str:
         return default_output
     try:
         return json.loads(json_str)
@@ -51,24 +87,167 @@ def normalize_progress(value):
         return 0.0
 
 # --- CENTRALIZIRANA 9-BOX MATRICA ---
-def create_9box_grid(df, title="9-Box Matrica"):
-    """Kreira unificirani Plotly grafikon za sve Dashboarde."""
-    import plotly.express as px
-    if df.empty: return None
+# Granice ćelija (iste kao isprekidane linije na grafu) i središta ćelija za density prikaz
+NINEBOX_EDGES = (2.5, 4.0)
+NINEBOX_BOUNDS = [0.5, 2.5, 4.0, 5.5]
+NINEBOX_CENTERS = (1.5, 3.25, 4.75)
+NINEBOX_LEVELS = ["nizak", "srednji", "visok"]
+
+def ninebox_cells(df):
+    """Vektorizirano pridruživanje ćelije 3x3 mreže (0-8, redak = potencijal). -1 za nedostajuće ocjene."""
+    import numpy as np
+    import pandas as pd
+    perf = pd.to_numeric(df['avg_performance'], errors='coerce').to_numpy(dtype=float)
+    pot = pd.to_numeric(df['avg_potential'], errors='coerce').to_numpy(dtype=float)
+    cells = np.digitize(pot, NINEBOX_EDGES) * 3 + np.digitize(perf, NINEBOX_EDGES)
+    cells[np.isnan(perf) | np.isnan(pot)] = -1
+    return cells
+
+def ninebox_cell_label(cell):
+    return f"Učinak: {NINEBOX_LEVELS[cell % 3]} / Potencijal: {NINEBOX_LEVELS[cell // 3]}"
+
+def create_9box_grid(df, title="9-Box Matrica", counts=None):
+    """Kreira unificirani Plotly grafikon za sve Dashboarde.
+
+    Uz counts (9 brojeva po ćeliji, npr. repository.load_ninebox_cells) ili iznad
+    NINEBOX_DENSITY_THRESHOLD točaka šalje se samo 9 ćelija s brojem zaposlenika umjesto
+    po jedne označene točke za svakoga.
+    """
+    import numpy as np
+    if counts is None:
+        if df is None or df.empty: return None
+        if len(df) > NINEBOX_DENSITY_THRESHOLD:
+            cells = ninebox_cells(df)
+            counts = np.bincount(cells[cells >= 0], minlength=9)
     
-    fig = px.scatter(
-        df, x="avg_performance", y="avg_potential", 
-        color="category", text="ime_prezime",
-        range_x=[0.5, 5.5], range_y=[0.5, 5.5],
-        title=title,
-        labels={'avg_performance': 'Učinak', 'avg_potential': 'Potencijal'}
-    )
+    if counts is None:
+        import plotly.express as px
+        fig = px.scatter(
+            df, x="avg_performance", y="avg_potential", 
+            color="category", text="ime_prezime",
+            range_x=[0.5, 5.5], range_y=[0.5, 5.5],
+            title=title,
+            labels={'avg_performance': 'Učinak', 'avg_potential': 'Potencijal'}
+        )
+    else:
+        import plotly.graph_objects as go
+        counts = np.asarray(counts, dtype=int)
+        centers = np.asarray(NINEBOX_CENTERS)
+        idx = np.arange(9)
+        fig = go.Figure()
+        # Pločice s brojem zaposlenika po ćeliji
+        fig.add_trace(go.Heatmap(
+            x=NINEBOX_BOUNDS, y=NINEBOX_BOUNDS, z=counts.reshape(3, 3),
+            colorscale="Blues", texttemplate="%{z}", textfont=dict(size=20),
+            hoverinfo="skip", showscale=False
+        ))
+        # Nevidljivi markeri u središtima ćelija služe za klik/odabir ćelije
+        fig.add_trace(go.Scatter(
+            x=centers[idx % 3], y=centers[idx // 3], mode="markers",
+            marker=dict(size=60, opacity=0), customdata=counts,
+            hovertemplate="%{customdata} zaposlenika<extra></extra>", showlegend=False
+        ))
+        fig.update_layout(
+            title=f"{title} · {int(counts.sum())} zaposlenika",
+            xaxis=dict(title="Učinak", range=[0.5, 5.5]), yaxis=dict(title="Potencijal", range=[0.5, 5.5])
+        )
     fig.add_vline(x=2.5, line_dash="dot", line_color="gray")
     fig.add_vline(x=4.0, line_dash="dot", line_color="gray")
     fig.add_hline(y=2.5, line_dash="dot", line_color="gray")
     fig.add_hline(y=4.0, line_dash="dot", line_color="gray")
     return fig
 
+def render_9box_chart(counts, load_members, title="9-Box Matrica", key="ninebox"):
+    """Prikazuje 9-box kao gustoću iz broja zaposlenika po ćeliji (repository.load_ninebox_cells).
+
+    Redovi procjena se ne učitavaju za graf: tek klik na ćeliju poziva load_members(cell, limit,
+    offset), koji vraća jednu stranicu zaposlenika te ćelije.
+    """
+    total = int(sum(counts))
+    if not total: return
+
+    fig = create_9box_grid(None, title=title, counts=counts)
+    event = st.plotly_chart(fig, use_container_width=True, on_select="rerun", selection_mode="points", key=key)
+    points = [p for p in (event.selection.points if event else []) if p.get("curve_number") == 1]
+    if not points:
+        st.caption(f"Prikaz gustoće ({total} zaposlenika). Kliknite ćeliju za popis zaposlenika.")
+        return
+
+    cell = int(points[0]["point_index"])
+    n = int(counts[cell])
+    pages = max(1, -(-n // NINEBOX_PAGE_SIZE))
+    c1, c2 = st.columns([3, 1])
+    c1.markdown(f"**{ninebox_cell_label(cell)}** — {n} zaposlenika")
+    page = c2.number_input("Stranica", 1, pages, 1, key=f"{key}_page_{cell}")
+    members = load_members(cell, NINEBOX_PAGE_SIZE, (page - 1) * NINEBOX_PAGE_SIZE)
+    cols = [c for c in ['ime_prezime', 'department', 'avg_performance', 'avg_potential', 'category'] if c in members.columns]
+    st.dataframe(members[cols], use_container_width=True, hide_index=True)
+
+# --- PANELI PO ZAPOSLENIKU (st.fragment) ---
+# Popis zaposlenika je paginiran i pretraživ (paginated_list); zaglavlja panela se crtaju iz
+# jednog status upita za stranicu (repository.load_team_status). Panel (forma procjene, KPI
+# editor, IDP) je fragment s expanderom koji prati stanje: sadržaj i podaci zaposlenika se
+# učitavaju tek kad se panel otvori, a spremanje reruna samo taj panel. Podaci otvorenog
+# panela se drže u sesiji do sljedećeg punog rendera, kao i svježi status zaposlenika
+# spremljen pri spremanju (panel_status), pa zaglavlje ne ostaje na statusu iz zadnjeg punog runa.
+_PANEL_PREFIX = "_panel_"
+
+def paginated_list(df, key, search_cols=("ime_prezime", "kadrovski_broj", "radno_mjesto"), page_size=EMPLOYEE_PAGE_SIZE):
+    """Pretraživi, paginirani popis zaposlenika; vraća samo redove trenutne stranice."""
+    c1, c2 = st.columns([3, 1])
+    query = c1.text_input("🔍 Pretraži", key=f"{key}_search", placeholder="Ime, kadrovski broj ili radno mjesto").strip().lower()
+    if query and not df.empty:
+        cols = [c for c in search_cols if c in df.columns]
+        mask = df[cols].astype(str).apply(lambda col: col.str.lower().str.contains(query, regex=False)).any(axis=1)
+        df = df[mask]
+    pages = max(1, -(-len(df) // page_size))
+    # Nova pretraga ili promjena broja stranica vraća popis na prvu stranicu
+    page = c2.number_input("Stranica", 1, pages, 1, key=f"{key}_page_{query}_{pages}") if pages > 1 else 1
+    start = (page - 1) * page_size
+    if len(df) > page_size or query:
+        st.caption(f"Prikazano {min(start + 1, len(df))}–{min(start + page_size, len(df))} od {len(df)}")
+    return df.iloc[start:start + page_size]
+
+def panel_expander(label, key):
+    """Expander panela koji prati stanje (.open): zatvoren panel ne gradi sadržaj niti čita bazu.
+
+    Labela je dio identiteta expandera, pa se zadnje stanje prenosi kroz expanded - panel ostaje
+    otvoren i kad se zaglavlje promijeni (npr. novi status nakon spremanja).
+    """
+    open_key = f"_open_{key}"
+    return st.expander(label, key=open_key, expanded=bool(st.session_state.get(open_key)), on_change="rerun")
+
+def reset_panels():
+    """Poziva se na punom renderu stranice s panelima (podaci otvorenih panela se ponovno učitaju)."""
+    for k in [k for k in st.session_state if str(k).startswith(_PANEL_PREFIX)]:
+        del st.session_state[k]
+
+def panel_data(key, load):
+    """Podaci panela: iz sesije (zadnje učitavanje/spremanje) ili load() pri prvom otvaranju."""
+    skey = _PANEL_PREFIX + key
+    if skey not in st.session_state:
+        st.session_state[skey] = load()
+    return st.session_state[skey]
+
+def rerun_panel():
+    """Ponovno izvodi samo fragment u kojem je pozvan (ili cijelu stranicu ako je ovo puni run)."""
+    from streamlit.errors import StreamlitInvalidLayoutContextError
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitInvalidLayoutContextError:
+        st.rerun()
+
+def panel_status(key, status):
+    """Status za zaglavlje panela: svježi (spremljen u refresh_panel) ili onaj iz status upita stranice."""
+    return st.session_state.get(f"{_PANEL_PREFIX}status_{key}", status)
+
+def refresh_panel(key, data, status=None):
+    """Pamti svježe podatke (i status za zaglavlje) panela i ponovno izvodi samo taj panel."""
+    st.session_state[_PANEL_PREFIX + key] = data
+    if status is not None:
+        st.session_state[f"{_PANEL_PREFIX}status_{key}"] = status
+    rerun_panel()
+
 # --- METRIKE I UI ---
 STANDARD_METRICS = {
     "p": [
@@ -114,27 +293,34 @@ def table_to_json_string(df):
     return json.dumps(df.astype(str).to_dict(orient='records'), ensure_ascii=False)
 
 def get_df_from_json(json_str, columns):
+    import pandas as pd
     data = safe_load_json(json_str, default_output=[])
     return pd.DataFrame(data, columns=columns)
 
 def get_active_survey_questions(period, company_id):
-    conn = sqlite3.connect(DB_FILE)
-    res = conn.execute("""
-        SELECT t.id, t.name 
-        FROM cycle_templates ct
-        JOIN form_templates t ON ct.template_id = t.id
-        WHERE ct.period_name = ? AND ct.company_id = ?
-    """, (period, company_id)).fetchone()
-    if not res:
-        conn.close()
-        return 'standard', STANDARD_METRICS
-    template_id = res[0]
-    qs = pd.read_sql_query("SELECT * FROM form_questions WHERE template_id=? ORDER BY order_index", conn, params=(template_id,))
-    conn.close()
-    if qs.empty: return 'standard', STANDARD_METRICS
+    """Vraća (mode, metrike) za period; složeni set pitanja je cacheiran po tvrtki i periodu."""
+    return cache.get_or_load(cache.SURVEY_SCOPE, company_id, period, lambda: _load_survey_questions(period, company_id))
+
+def invalidate_survey_cache(company_id=None):
+    """Poziva se nakon promjene predložaka, pitanja ili povezivanja upitnika s periodom."""
+    cache.invalidate(cache.SURVEY_SCOPE, company_id)
+
+def _load_survey_questions(period, company_id):
+    with get_pool(DB_FILE).reader() as conn:
+        res = conn.execute("""
+            SELECT t.id, t.name 
+            FROM cycle_templates ct
+            JOIN form_templates t ON ct.template_id = t.id
+            WHERE ct.period_name = ? AND ct.company_id = ?
+        """, (period, company_id)).fetchone()
+        if not res:
+            return 'standard', STANDARD_METRICS
+        template_id = res[0]
+        qs = conn.execute("SELECT id, section, title, description, criteria_desc FROM form_questions WHERE template_id=? ORDER BY order_index", (template_id,)).fetchall()
+    if not qs: return 'standard', STANDARD_METRICS
     dynamic_metrics = {"p": [], "pot": []}
-    for _, row in qs.iterrows():
+    for row in qs:
         q_obj = {"id": str(row['id']), "title": row['title'], "def": row['description'], "crit": row['criteria_desc']}
         if row['section'] == 'p': dynamic_metrics['p'].append(q_obj)
         else: dynamic_metrics['pot'].append(q_obj)
-    return 'dynamic', dynamic_metrics
\ No newline at end of file
+    return 'dynamic', dynamic_metrics
@@ -1,62 +1,132 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
 import os
-from modules.database import get_connection, DB_FILE, perform_backup, get_available_backups, get_hash, get_active_period_info
+from datetime import datetime
+from modules.database import (
+    perform_backup, get_available_backups, restore_backup, log_action, get_hash, get_active_period_info,
+    sync_user_accounts, reset_company_passwords, get_company_ids
+)
+from modules.constants import DEFAULT_PASSWORD
+from modules.repository import get_users
+from modules.views_audit import render_audit_log
+from modules.auth import invalidate_login_cache
+from modules import profiler, bootstrap
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
 
 def render_admin_view():
     # INFO O PERIODU
-    curr_p, dl = get_active_period_info()
+    curr_p, dl = get_active_period_info(st.session_state.get('company_id', 1))
     st.info(f"📅 **AKTIVNO RAZDOBLJE:** {curr_p}  |  ⏳ **ROK:** {dl}")
 
     st.header("🛠️ Super Admin Panel")
     if st.session_state.get('role') != 'SuperAdmin': st.error("Access Denied"); return
 
-    tab1, tab2 = st.tabs(["👥 Korisnici", "💾 Backup"])
+    tab1, tab2, tab3, tab4 = st.tabs(["👥 Korisnici", "💾 Backup", "🔐 Audit Log", "⏱️ Profiler"])
 
     with tab1:
         st.subheader("Popravak Korisničkih Računa")
         
+        companies = get_company_ids() or [(1, "Tvrtka 1")]
+        ids = [c[0] for c in companies]
+        cur_cid = st.session_state.get('company_id', 1)
+        sel_cid = st.selectbox("Tvrtka:", ids, index=ids.index(cur_cid) if cur_cid in ids else 0,
+                               format_func=lambda i: dict(companies)[i])
+        dry_run = st.checkbox("🔍 Samo pregled (bez promjena)", value=True)
+        
         c1, c2 = st.columns(2)
         
         with c1:
             st.info("Opcija A: Sigurna sinkronizacija. Kreira račun SAMO onima koji ga nemaju. Ne dira postojeće lozinke.")
             if st.button("✅ Sigurna Sinkronizacija"):
-                pw_hash = get_hash("lozinka123")
-                with sqlite3.connect(DB_FILE) as db:
-                    emps = db.execute("SELECT kadrovski_broj, department, is_manager FROM employees_master WHERE kadrovski_broj != 'admin'").fetchall()
-                    c = 0
-                    for e in emps:
-                        kid = str(e[0]).strip()
-                        role = "Manager" if e[2] else "Employee"
-                        db.execute("INSERT OR IGNORE INTO users (username, password, role, department, company_id) VALUES (?,?,?,?,1)", (kid, pw_hash, role, e[1]))
-                        if db.total_changes > 0: c += 1
-                    db.commit()
-                st.success(f"Kreirano {c} novih računa.")
+                c = sync_user_accounts(sel_cid, get_hash(DEFAULT_PASSWORD), dry_run=dry_run)
+                if dry_run:
+                    st.info(f"Pregled: bilo bi kreirano {c} novih računa.")
+                else:
+                    invalidate_login_cache()
+                    st.success(f"Kreirano {c} novih računa.")
 
         with c2:
-            st.error("Opcija B: Potpuni Reset. Svima (osim admina) resetira lozinku na 'lozinka123'.")
+            st.error(f"Opcija B: Potpuni Reset. Svima u tvrtki (osim admina) resetira lozinku na '{DEFAULT_PASSWORD}'.")
             if st.button("⚠️ RESETIRAJ SVE LOZINKE"):
-                pw_hash = get_hash("lozinka123")
-                with sqlite3.connect(DB_FILE) as db:
-                    emps = db.execute("SELECT kadrovski_broj, department, is_manager FROM employees_master WHERE kadrovski_broj != 'admin'").fetchall()
-                    for e in emps:
-                        kid = str(e[0]).strip()
-                        role = "Manager" if e[2] else "Employee"
-                        db.execute("INSERT OR REPLACE INTO users (username, password, role, department, company_id) VALUES (?,?,?,?,1)", (kid, pw_hash, role, e[1]))
-                    db.commit()
-                st.success("Sve lozinke resetirane na 'lozinka123'!")
+                r = reset_company_passwords(sel_cid, get_hash(DEFAULT_PASSWORD), dry_run=dry_run)
+                if dry_run:
+                    st.info(f"Pregled: bilo bi resetirano {r['reset']} lozinki i kreirano {r['created']} računa.")
+                else:
+                    invalidate_login_cache()
+                    st.success(f"Resetirano {r['reset']} lozinki, kreirano {r['created']} novih računa.")
 
         st.divider()
-        users = pd.read_sql_query("SELECT username, role, department FROM users", get_connection())
-        st.dataframe(users)
+        st.dataframe(get_users())
 
     with tab2:
-        if st.button("Backup"):
-            perform_backup()
-            st.success("Backup OK!")
+        c1, c2 = st.columns([1, 3])
+        force = c2.checkbox("Kreiraj i ako baza nije mijenjana")
+        if c1.button("Backup"):
+            ok, msg = perform_backup(force=force)
+            (st.success if ok else st.error)(msg)
         bs = get_available_backups()
         if bs:
-            for b in bs:
-                with open(b, "rb") as f:
-                    st.download_button(f"Preuzmi {os.path.basename(b)}", f, file_name=os.path.basename(b))
\ No newline at end of file
+            st.dataframe(pd.DataFrame(bs)[['file', 'kind', 'created', 'size', 'db_size', 'integrity', 'sha256']],
+                         use_container_width=True, hide_index=True)
+            by_file = {b['file']: b for b in bs}
+            sel = st.selectbox("Odaberi backup", list(by_file), format_func=lambda f: f"{f} ({by_file[f]['created']})")
+            b = by_file[sel]
+            # Datoteka se čita tek na klik, ne pri svakom rerunu stranice
+            st.download_button(f"Preuzmi {sel}", data=lambda path=b['path']: _read_file(path), file_name=sel,
+                               mime="application/octet-stream", on_click="ignore")
+
+            st.subheader("Vraćanje baze")
+            st.warning("Trenutni podaci bit će zamijenjeni sadržajem odabranog backupa. "
+                       "Trenutno stanje se prije vraćanja automatski sprema kao PRERESTORE backup.")
+            confirm = st.text_input("Za potvrdu upišite naziv datoteke", key="restore_confirm")
+            if st.button("Vrati bazu iz backupa", type="primary", disabled=confirm != sel):
+                with st.spinner("Provjera i vraćanje backupa..."):
+                    ok, msg = restore_backup(sel)
+                if ok:
+                    invalidate_login_cache()
+                    log_action(st.session_state.get('username'), "RESTORE", msg, st.session_state.get('company_id', 1))
+                    st.success(msg)
+                else:
+                    st.error(msg)
+
+    with tab3:
+        render_audit_log()
+
+    with tab4:
+        boot = bootstrap.startup_stats()
+        if boot:
+            st.caption(f"Pokretanje procesa {boot['started']}: shema v{boot['schema_version']} "
+                       f"({'inicijalizirana' if boot['initialized'] else 'bez DDL-a'}) {boot['schema_ms']:.0f} ms, "
+                       f"održavanje {boot['maintenance_ms']:.0f} ms, zagrijavanje cacheva ({boot['companies']} tvrtki) "
+                       f"{boot['warm_ms']:.0f} ms, ukupno {boot['total_ms']:.0f} ms")
+            report = boot.get('index_report') or []
+            scans = sum(1 for _, _, uses_index in report if not uses_index)
+            with st.expander(f"Korištenje indeksa pri pokretanju ({len(report) - scans}/{len(report)} upita koristi indeks)"):
+                st.dataframe(pd.DataFrame([{'Upit': name, 'Indeks': '✅' if uses_index else '⚠️ SCAN', 'Plan': ' | '.join(steps)}
+                                           for name, steps, uses_index in report]),
+                             use_container_width=True, hide_index=True)
+        on = st.checkbox("Profiler upita uključen (vrijedi za cijeli proces, od sljedećeg reruna)", value=profiler.enabled())
+        if on != profiler.enabled(): profiler.enable(on)
+        runs = profiler.recent_runs()
+        if not runs:
+            st.info("Nema zabilježenih rerunova. Uključite profiler i otvorite nekoliko stranica.")
+        else:
+            st.subheader("Najsporiji upiti (p95)")
+            st.dataframe(pd.DataFrame(profiler.statement_stats())[['sql', 'count', 'p50_ms', 'p95_ms', 'max_ms', 'total_ms', 'avg_rows']].round(2),
+                         use_container_width=True, hide_index=True)
+            st.subheader("Vrijeme renderiranja po pogledu")
+            vs = profiler.view_stats()
+            if vs:
+                st.dataframe(pd.DataFrame(vs)[['view', 'count', 'p50_ms', 'p95_ms', 'max_ms']].round(1), use_container_width=True, hide_index=True)
+            st.subheader("Zadnji rerunovi")
+            st.dataframe(pd.DataFrame(runs)[['started', 'user', 'view', 'total_ms', 'sql_ms', 'queries', 'interrupted']].round(1),
+                         use_container_width=True, hide_index=True)
+            c1, c2 = st.columns(2)
+            c1.download_button("Preuzmi JSONL", data=profiler.dump_jsonl, file_name=f"profiler_{datetime.now():%Y%m%d_%H%M%S}.jsonl",
+                               mime="application/jsonl", on_click="ignore")
+            if c2.button("Očisti podatke profilera"):
+                profiler.reset()
+                st.rerun()
@@ -0,0 +1,65 @@
+import streamlit as st
+import pandas as pd
+from contextlib import closing
+from datetime import date, timedelta
+from modules.database import read_connection, archive_audit_log, AUDIT_ARCHIVE_DIR
+from modules.audit import query_audit_log, audit_actions, list_audit_archives, open_audit_archive
+from modules.constants import AUDIT_RETENTION_MONTHS
+
+def render_audit_log(company_id=None):
+    """Pregled audit loga (HR: samo vlastita tvrtka, SuperAdmin: company_id=None = sve tvrtke)."""
+    st.subheader("🔐 Audit Log")
+    key = f"audit_{company_id}"
+
+    archives = list_audit_archives(AUDIT_ARCHIVE_DIR)
+    sources = ["Živa baza"] + [f"Arhiva {m}" for m, _ in archives]
+    c1, c2, c3, c4 = st.columns([2, 2, 2, 3])
+    source = c1.selectbox("Izvor", sources, key=f"{key}_src")
+    f_user = c2.text_input("Korisnik", key=f"{key}_user").strip() or None
+    period = c4.date_input("Razdoblje", (date.today() - timedelta(days=30), date.today()), key=f"{key}_dates")
+
+    # Konekcija se drži samo za vrijeme upita, ne dok se crtaju widgeti
+    if source == "Živa baza":
+        source_conn = read_connection
+    else:
+        archive_path = dict(archives)[source.split(" ", 1)[1]]
+        source_conn = lambda: closing(open_audit_archive(archive_path))
+    with source_conn() as conn:
+        actions = ["Sve"] + audit_actions(conn, company_id)
+    f_action = c3.selectbox("Akcija", actions, key=f"{key}_action")
+    start = end = None
+    if isinstance(period, (tuple, list)) and len(period) == 2:
+        start, end = f"{period[0]} 00:00:00", f"{period[1] + timedelta(days=1)} 00:00:00"
+    if source != "Živa baza":
+        start = end = None  # arhiva je već jedan mjesec
+
+    # Stog kursora po stranicama; resetira se kad se promijene filteri
+    filters = (source, f_user, f_action, start, end)
+    if st.session_state.get(f"{key}_filters") != filters:
+        st.session_state[f"{key}_filters"] = filters
+        st.session_state[f"{key}_cursors"] = [None]
+    cursors = st.session_state[f"{key}_cursors"]
+
+    with source_conn() as conn:
+        rows, next_cursor = query_audit_log(conn, company_id=company_id, user=f_user,
+                                            action=None if f_action == "Sve" else f_action,
+                                            start=start, end=end, after=cursors[-1])
+
+    if rows:
+        st.dataframe(pd.DataFrame(rows).drop(columns=["id"]), use_container_width=True, hide_index=True)
+    else:
+        st.info("Nema zapisa za odabrane filtere.")
+
+    b1, b2, b3 = st.columns([1, 1, 4])
+    if b1.button("⬅️ Novije", disabled=len(cursors) == 1, key=f"{key}_prev"):
+        cursors.pop(); st.rerun()
+    if b2.button("Starije ➡️", disabled=next_cursor is None, key=f"{key}_next"):
+        cursors.append(next_cursor); st.rerun()
+    b3.caption(f"Stranica {len(cursors)}")
+
+    if company_id is None:
+        st.divider()
+        st.caption(f"Zapisi stariji od {AUDIT_RETENTION_MONTHS} mjeseci automatski se sele u mjesečne arhive pri pokretanju.")
+        if st.button("🗄️ Arhiviraj sada", key=f"{key}_archive"):
+            moved = archive_audit_log()
+            st.success(f"Arhivirano: {moved}" if moved else "Nema zapisa za arhiviranje.")
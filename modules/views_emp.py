@@ -2,20 +2,20 @@ import streamlit as st
 import pandas as pd
 import json
 import plotly.express as px
-import sqlite3
 import time
-from modules.database import get_connection, get_active_period_info, save_evaluation_json_method
+from modules.database import get_active_period_info, save_evaluation_json_method
 # 1. IMPORT NOVIH FUNKCIJA
 from modules.utils import (
     calculate_category, render_metric_input, get_df_from_json, 
     get_active_survey_questions, safe_load_json, normalize_progress
 )
+from modules.repository import load_team_goals, get_employee, get_evaluation, get_development_plan, load_answer_gap
+from modules.history import employee_trail
 
 def render_employee_view():
-    conn = get_connection()
-    current_period, deadline = get_active_period_info()
     username = st.session_state['username']
     company_id = st.session_state.get('company_id', 1)
+    current_period, deadline = get_active_period_info(company_id)
     
     # INFO BAR
     st.info(f"📅 **AKTIVNO RAZDOBLJE:** {current_period}  |  ⏳ **ROK:** {deadline}")
@@ -23,8 +23,8 @@ def render_employee_view():
     mode, survey_data = get_active_survey_questions(current_period, company_id)
     
     # Dohvat podataka o korisniku
-    emp_res = conn.execute("SELECT ime_prezime, radno_mjesto, department FROM employees_master WHERE kadrovski_broj=?", (username,)).fetchone()
-    my_name = emp_res[0] if emp_res else username
+    emp = get_employee(username)
+    my_name = emp['ime_prezime'] if emp else username
     
     st.header(f"👋 Dobrodošli, {my_name}")
     
@@ -35,8 +35,7 @@ def render_employee_view():
     # ----------------------------------------------------------------
     with t1:
         st.subheader("Vaša samoprocjena")
-        r_df = pd.read_sql_query("SELECT * FROM evaluations WHERE kadrovski_broj=? AND period=? AND is_self_eval=1", conn, params=(username, current_period))
-        r = r_df.iloc[0] if not r_df.empty else None
+        r = get_evaluation(username, current_period, is_self_eval=True)
         
         is_submitted = r is not None and str(r['status']).strip() == 'Submitted'
         
@@ -80,7 +79,7 @@ def render_employee_view():
                     cat = calculate_category(ap, apot)
                     
                     target_status = "Submitted" if is_final else "Draft"
-                    user_data = {'ime':emp_res[0],'radno_mjesto':emp_res[1],'odjel':emp_res[2]}
+                    user_data = {'ime':emp['ime_prezime'],'radno_mjesto':emp['radno_mjesto'],'odjel':emp['department']}
                     
                     save_evaluation_json_method(company_id, current_period, username, "Self", user_data, vals_p, vals_pot, ap, apot, cat, "", all_ans, True, target_status)
                     
@@ -98,25 +97,22 @@ def render_employee_view():
         st.subheader("📊 Gap Analiza (Usporedba)")
         st.caption("Usporedba vaše procjene i procjene voditelja.")
         
-        my_eval = pd.read_sql_query("SELECT * FROM evaluations WHERE kadrovski_broj=? AND period=? AND is_self_eval=1", conn, params=(username, current_period))
-        mgr_eval = pd.read_sql_query("SELECT * FROM evaluations WHERE kadrovski_broj=? AND period=? AND is_self_eval=0", conn, params=(username, current_period))
+        my_eval = get_evaluation(username, current_period, is_self_eval=True)
+        mgr_eval = get_evaluation(username, current_period, is_self_eval=False)
         
         # 2. FIX: Visibility Logic - Provjera je li manager zaključao
-        manager_submitted = False
-        if not mgr_eval.empty:
-            if mgr_eval.iloc[0]['status'] == 'Submitted':
-                manager_submitted = True
+        manager_submitted = mgr_eval is not None and mgr_eval['status'] == 'Submitted'
         
-        if not my_eval.empty and manager_submitted:
+        if my_eval is not None and manager_submitted:
             try:
-                my_json = safe_load_json(my_eval.iloc[0]['json_answers'])
-                mgr_json = safe_load_json(mgr_eval.iloc[0]['json_answers'])
+                # Ocjene po pitanju iz evaluation_answers (jedan upit, bez json.loads)
+                answers = load_answer_gap(company_id, current_period, username)
                 
                 gap_data = []
                 for q in survey_data['p'] + survey_data['pot']:
-                    qid = str(q['id'])
-                    my_score = int(my_json.get(qid, 0))
-                    mgr_score = int(mgr_json.get(qid, 0))
+                    a = answers.get(str(q['id']), {})
+                    my_score = int(a.get('self') or 0)
+                    mgr_score = int(a.get('mgr') or 0)
                     diff = mgr_score - my_score
                     
                     status = "✅ Suglasni"
@@ -132,15 +128,15 @@ def render_employee_view():
                     })
                 
                 c1, c2 = st.columns(2)
-                c1.metric("Moja ocjena", f"{my_eval.iloc[0]['avg_performance']:.2f}")
-                c2.metric("Ocjena Voditelja", f"{mgr_eval.iloc[0]['avg_performance']:.2f}")
+                c1.metric("Moja ocjena", f"{my_eval['avg_performance']:.2f}")
+                c2.metric("Ocjena Voditelja", f"{mgr_eval['avg_performance']:.2f}")
                 
-                st.dataframe(pd.DataFrame(gap_data).style.applymap(lambda x: 'background-color: #ffcccc' if x < 0 else ('background-color: #ccffcc' if x > 0 else ''), subset=['Razlika']), use_container_width=True)
+                st.dataframe(pd.DataFrame(gap_data).style.map(lambda x: 'background-color: #ffcccc' if x < 0 else ('background-color: #ccffcc' if x > 0 else ''), subset=['Razlika']), use_container_width=True)
                 
             except Exception as e:
                 st.error(f"Greška pri obradi podataka: {e}")
         else:
-            if mgr_eval.empty or not manager_submitted:
+            if not manager_submitted:
                 st.warning("⏳ Voditelj još nije zaključao (Submitted) svoju procjenu. Usporedba će biti dostupna nakon toga.")
             else:
                 st.info("Prvo morate ispuniti svoju samoprocjenu.")
@@ -150,7 +146,8 @@ def render_employee_view():
     # ----------------------------------------------------------------
     with t3:
         st.subheader("Moji Ciljevi")
-        goals = pd.read_sql_query("SELECT * FROM goals WHERE kadrovski_broj=? AND period=?", conn, params=(username, current_period))
+        goals_by_emp, kpis_by_goal = load_team_goals([username], current_period)
+        goals = goals_by_emp[str(username)]
         if not goals.empty:
             for _, g in goals.iterrows():
                 st.markdown(f"**{g['title']}** ({g['progress']}%)")
@@ -158,7 +155,7 @@ def render_employee_view():
                 st.progress(normalize_progress(g['progress']))
                 st.caption(g['description'])
                 
-                kpis = pd.read_sql_query("SELECT description, weight, progress FROM goal_kpis WHERE goal_id=?", conn, params=(g['id'],))
+                kpis = kpis_by_goal[g['id']]
                 if not kpis.empty:
                     st.dataframe(kpis.rename(columns={'description':'KPI', 'weight':'Težina', 'progress':'%'}), hide_index=True)
         else: st.info("Nemate dodijeljenih ciljeva.")
@@ -168,12 +165,10 @@ def render_employee_view():
     # ----------------------------------------------------------------
     with t4:
         st.subheader("Razvojni plan (IDP)")
-        res = conn.execute("SELECT * FROM development_plans WHERE kadrovski_broj=? AND period=?", (username, current_period)).fetchone()
+        d = get_development_plan(username, current_period)
         
         # FIX: Prikaz samo ako je IDP "Active" ili "Approved"
-        if res and res[13] in ['Active', 'Approved']: # indeks 13 je status
-            cols = [c[1] for c in conn.execute("PRAGMA table_info(development_plans)").fetchall()]
-            d = dict(zip(cols, res))
+        if d and d['status'] in ['Active', 'Approved']:
             st.info(f"🎯 **Karijerni cilj:** {d.get('career_goal')}")
             
             c1, c2, c3 = st.columns(3)
@@ -198,10 +193,8 @@ def render_employee_view():
     with t5:
         st.subheader("Povijest procjena")
         # FIX: Prikaz samo 'Submitted' procjena
-        hist = pd.read_sql_query("SELECT period, avg_performance, avg_potential FROM evaluations WHERE kadrovski_broj=? AND is_self_eval=0 AND status='Submitted'", conn, params=(username,))
+        hist = employee_trail(company_id, username)
         if not hist.empty: 
             fig = px.line(hist, x="period", y=["avg_performance", "avg_potential"], markers=True, title="Moj trend razvoja")
             st.plotly_chart(fig, use_container_width=True)
         else: st.info("Nema završenih povijesnih podataka.")
-    
-    conn.close()
\ No newline at end of file
@@ -2,37 +2,40 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import io
-import sqlite3
-import time
-from datetime import datetime, date
-from modules.database import get_connection, get_active_period_info, DB_FILE
+import os
+from modules.database import get_active_period_info, rebuild_ninebox_agg
 
 # 1. IMPORT SVIH POTREBNIH UTILS FUNKCIJA
-from modules.utils import get_df_from_json, make_hashes, create_9box_grid, safe_load_json
+from modules.utils import (
+    get_df_from_json, make_hashes, render_9box_chart, safe_load_json, paginated_list, panel_expander, reset_panels, panel_data,
+    get_active_survey_questions
+)
+from modules.repository import (
+    load_team_goals, load_team_status, load_ninebox_summary, load_ninebox_cells, load_team_development_plans, get_company_employees, get_submitted_evaluations,
+    load_question_stats, load_score_distribution,
+    save_employee, update_employee, delete_employee, get_periods, get_export_periods, activate_period, set_period_deadline,
+    create_period, delete_period, get_templates, get_template_questions, create_template, add_template_question, assign_template
+)
+from modules.history import get_history, employee_trail, transition_matrix
+from modules.views_audit import render_audit_log
+from modules.auth import invalidate_login_cache
+from modules.importer import import_employees, iter_import_chunks, IMPORT_FORMATS
+from modules.exporter import export_to_file, EXPORT_FORMATS
+from modules.constants import DEFAULT_PASSWORD, NINEBOX_PAGE_SIZE
+from modules import profiler
 
-def clean_excel_id(value):
-    """Pomoćna funkcija za čišćenje ID-eva iz Excela."""
-    if pd.isna(value) or str(value).lower() in ['nan', 'none', '', ' ']: return ""
-    str_val = str(value).strip()
-    return str_val[:-2] if str_val.endswith(".0") else str_val
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
 
 def render_hr_view():
-    conn = get_connection()
-    current_period, deadline = get_active_period_info()
     company_id = st.session_state.get('company_id', 1)
+    current_period, deadline = get_active_period_info(company_id)
     
     st.info(f"📅 **AKTIVNO RAZDOBLJE:** {current_period}  |  ⏳ **ROK:** {deadline if deadline else 'Nije definiran'}")
     
     # DOHVAT SVIH PODATAKA
-    query_master = """
-        SELECT e.kadrovski_broj, e.ime_prezime, e.radno_mjesto, e.department, 
-               m.ime_prezime as 'Nadređeni Manager', e.is_manager, e.active, e.manager_id
-        FROM employees_master e
-        LEFT JOIN employees_master m ON e.manager_id = m.kadrovski_broj
-        WHERE e.company_id = ?
-    """
-    df_master = pd.read_sql_query(query_master, conn, params=(company_id,))
+    df_master = get_company_employees(company_id)
     
     dept_list = ["Svi"]
     if not df_master.empty and 'department' in df_master.columns:
@@ -48,70 +51,103 @@ def render_hr_view():
         "🗂️ Šifarnik & Unos", 
         "🛠️ Uređivanje Podataka", 
         "⚙️ Postavke Razdoblja", 
-        "📥 Export"
+        "📥 Export",
+        "🔐 Audit Log"
     ])
+    profiler.set_view(menu)
 
     # ----------------------------------------------------------------
     # 1. HR DASHBOARD
     # ----------------------------------------------------------------
     if menu == "📊 HR Dashboard":
         st.header(f"📊 HR Analitika")
-        sel_dept = st.selectbox("Filtriraj po odjelu:", dept_list)
-        
-        # Prikaz samo 'Submitted' procjena
-        df_ev = pd.read_sql_query("""
-            SELECT ev.kadrovski_broj, ev.ime_prezime, ev.avg_performance, ev.avg_potential, ev.category, ev.is_self_eval, em.department 
-            FROM evaluations ev
-            JOIN employees_master em ON ev.kadrovski_broj = em.kadrovski_broj
-            WHERE ev.period = ? AND ev.company_id = ? AND ev.status = 'Submitted'
-        """, conn, params=(current_period, company_id))
-        
-        df_ev['avg_performance'] = pd.to_numeric(df_ev['avg_performance'], errors='coerce').fillna(0)
-        df_ev['avg_potential'] = pd.to_numeric(df_ev['avg_potential'], errors='coerce').fillna(0)
-        
-        if sel_dept != "Svi":
-            f_ev = df_ev[df_ev['department'].astype(str).str.strip() == str(sel_dept).strip()]
-        else: f_ev = df_ev
-        
-        f_ev_mgr = f_ev[f_ev['is_self_eval'] == 0]
-        
-        t1, t2 = st.tabs(["9-Box Matrica", "Tablični Prikaz"])
+        c_f, c_r = st.columns([4, 1])
+        sel_dept = c_f.selectbox("Filtriraj po odjelu:", dept_list)
+        if c_r.button("🔄 Preračunaj agregat", help="Ponovno gradi 9-box agregat iz svih zaključanih procjena"):
+            rebuild_ninebox_agg(company_id)
+        dept_filter = None if sel_dept == "Svi" else sel_dept
+
+        # Brojke po kategorijama dolaze iz agregata ninebox_agg (održava se pri zaključavanju procjene)
+        summary = load_ninebox_summary(company_id, current_period, dept_filter)
+        total = int(summary['n'].sum())
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Zaključane procjene", total)
+        m2.metric("Prosječni učinak", f"{summary['sum_perf'].sum() / total:.2f}" if total else "-")
+        m3.metric("Prosječni potencijal", f"{summary['sum_pot'].sum() / total:.2f}" if total else "-")
+
+
+        t1, t2, t3, t4 = st.tabs(["9-Box Matrica", "Kategorije", "Tablični Prikaz", "Po Pitanjima"])
         with t1:
-            if not f_ev_mgr.empty:
-                fig = create_9box_grid(f_ev_mgr, title=f"9-Box Distribucija ({sel_dept})")
-                if fig: st.plotly_chart(fig, use_container_width=True)
+            if total:
+                render_9box_chart(load_ninebox_cells(company_id, current_period, dept_filter),
+                                  lambda cell, limit, offset: get_submitted_evaluations(company_id, current_period, dept_filter,
+                                                                                        cell=cell, limit=limit, offset=offset),
+                                  title=f"9-Box Distribucija ({sel_dept})", key="hr_ninebox")
             else: st.warning("Nema ZAKLJUČANIH službenih procjena.")
         with t2:
-            if not f_ev_mgr.empty:
-                st.dataframe(f_ev_mgr[['ime_prezime', 'department', 'avg_performance', 'avg_potential', 'category']], use_container_width=True)
+            if total:
+                st.dataframe(summary[['category', 'n', 'avg_performance', 'avg_potential']], use_container_width=True, hide_index=True)
             else: st.info("Nema podataka.")
+        with t3:
+            # Samo 'Submitted' službene procjene; odjel se filtrira u SQL-u, a učitava se samo tražena stranica
+            if total:
+                pages = -(-total // NINEBOX_PAGE_SIZE)
+                page = st.number_input("Stranica", 1, pages, 1, key=f"hr_table_page_{sel_dept}_{pages}") if pages > 1 else 1
+                rows = get_submitted_evaluations(company_id, current_period, dept_filter,
+                                                 limit=NINEBOX_PAGE_SIZE, offset=(page - 1) * NINEBOX_PAGE_SIZE)
+                st.dataframe(rows[['ime_prezime', 'department', 'avg_performance', 'avg_potential', 'category']], use_container_width=True, hide_index=True)
+                st.caption(f"Stranica {page}/{pages} · {total} procjena")
+            else: st.info("Nema podataka.")
+        with t4:
+            # Prosjeci, gap i distribucija po pitanju računaju se u SQL-u iz evaluation_answers
+            stats = load_question_stats(company_id, current_period, dept_filter)
+            if not stats.empty:
+                _, survey_data = get_active_survey_questions(current_period, company_id)
+                titles = {str(q['id']): q['title'] for q in survey_data['p'] + survey_data['pot']}
+                stats['Pitanje'] = stats['question_id'].map(lambda qid: titles.get(qid, qid))
+                st.dataframe(stats.rename(columns={'n_mgr': 'Br. voditelja', 'avg_mgr': 'Ø Voditelj', 'n_self': 'Br. samoprocjena',
+                                                   'avg_self': 'Ø Samoprocjena', 'avg_gap': 'Ø Razlika (voditelj - radnik)'})
+                             [['Pitanje', 'Ø Voditelj', 'Ø Samoprocjena', 'Ø Razlika (voditelj - radnik)', 'Br. voditelja', 'Br. samoprocjena']],
+                             use_container_width=True, hide_index=True)
+                dist = load_score_distribution(company_id, current_period, department=dept_filter)
+                if not dist.empty:
+                    dist['Pitanje'] = dist['question_id'].map(lambda qid: titles.get(qid, qid))
+                    dist['Ocjena'] = dist['score'].map(lambda v: f"{v:g}")
+                    fig = px.bar(dist, x='n', y='Pitanje', color='Ocjena', orientation='h', title="Distribucija ocjena voditelja",
+                                 labels={'n': 'Broj ocjena'}, category_orders={'Ocjena': sorted(dist['Ocjena'].unique())})
+                    st.plotly_chart(fig, use_container_width=True)
+            else: st.info("Nema zaključanih procjena s odgovorima po pitanju.")
 
     # ----------------------------------------------------------------
     # 2. SNAIL TRAIL
     # ----------------------------------------------------------------
     elif menu == "👤 Snail Trail (Povijest)":
         st.header("👤 Snail Trail")
-        sel_emp = st.selectbox("Odaberi zaposlenika:", [f"{r['ime_prezime']} ({r['kadrovski_broj']})" for _, r in df_master.iterrows()])
-        
-        if sel_emp:
-            eid = sel_emp.split("(")[1].replace(")", "")
-            h = pd.read_sql_query("""
-                SELECT period, avg_performance, avg_potential, category 
-                FROM evaluations 
-                WHERE kadrovski_broj=? AND is_self_eval=0 AND status='Submitted' 
-                ORDER BY period ASC
-            """, conn, params=(eid,))
+        t_emp, t_org = st.tabs(["Zaposlenik", "Prijelazi (cijela tvrtka)"])
+        with t_emp:
+            sel_emp = st.selectbox("Odaberi zaposlenika:", [f"{r['ime_prezime']} ({r['kadrovski_broj']})" for _, r in df_master.iterrows()])
             
-            if not h.empty:
-                c1, c2 = st.columns([3, 1])
-                with c1:
-                    fig = px.line(h, x="avg_performance", y="avg_potential", text="period", markers=True, title=f"Put razvoja: {sel_emp}")
-                    fig.update_layout(xaxis=dict(range=[0.5, 5.5]), yaxis=dict(range=[0.5, 5.5]))
-                    st.plotly_chart(fig, use_container_width=True)
-                with c2:
-                    st.write("**Povijest ocjena:**")
-                    st.dataframe(h[['period', 'category']], hide_index=True)
-            else: st.info("Nema zaključanih povijesnih procjena.")
+            if sel_emp:
+                eid = sel_emp.split("(")[1].replace(")", "")
+                h = employee_trail(company_id, eid)
+            
+                if not h.empty:
+                    c1, c2 = st.columns([3, 1])
+                    with c1:
+                        fig = px.line(h, x="avg_performance", y="avg_potential", text="period", markers=True, title=f"Put razvoja: {sel_emp}")
+                        fig.update_layout(xaxis=dict(range=[0.5, 5.5]), yaxis=dict(range=[0.5, 5.5]))
+                        st.plotly_chart(fig, use_container_width=True)
+                    with c2:
+                        st.write("**Povijest ocjena:**")
+                        st.dataframe(h[['period', 'category', 'streak', 'velocity']], hide_index=True)
+                else: st.info("Nema zaključanih povijesnih procjena.")
+        with t_org:
+            hist_all = get_history(company_id)
+            trans_periods = hist_all.loc[hist_all['prev_box'] >= 0, 'period'].drop_duplicates().tolist()
+            sel_to = st.selectbox("Prijelazi u razdoblje:", ["Sva razdoblja"] + trans_periods)
+            tm = transition_matrix(company_id, None if sel_to == "Sva razdoblja" else sel_to)
+            st.caption(f"Ukupno prijelaza: {int(tm.values.sum())}, promjena ćelije: {int(tm.values.sum() - tm.values.trace())}")
+            st.dataframe(tm, use_container_width=True)
 
     # ----------------------------------------------------------------
     # 3. CILJEVI
@@ -122,12 +158,12 @@ def render_hr_view():
         filtered_master = df_master[df_master['department'] == sel_dept_g] if sel_dept_g != "Svi" else df_master
 
         if not filtered_master.empty:
-            for _, emp in filtered_master.iterrows():
-                eid = emp['kadrovski_broj']
-                goals = pd.read_sql_query("SELECT * FROM goals WHERE kadrovski_broj=? AND period=?", conn, params=(eid, current_period))
-                if not goals.empty:
-                    with st.expander(f"👤 {emp['ime_prezime']} ({len(goals)} ciljeva)"):
-                        st.dataframe(goals[['title', 'weight', 'progress', 'status', 'deadline']], use_container_width=True)
+            # Zaglavlja stranice iz jednog status upita; ciljevi se čitaju tek u otvorenom panelu
+            page = paginated_list(filtered_master, f"hr_goals_{sel_dept_g}")
+            status = load_team_status(page['kadrovski_broj'].tolist(), current_period, company_id)
+            reset_panels()
+            for _, emp in page.iterrows():
+                _goals_overview_panel(emp, status[emp['kadrovski_broj']], current_period)
         else: st.info("Nema zaposlenika u odabranom odjelu.")
 
     # ----------------------------------------------------------------
@@ -139,21 +175,12 @@ def render_hr_view():
         f_m = df_master[df_master['department'] == sel_dept_idp] if sel_dept_idp != "Svi" else df_master
             
         if not f_m.empty:
-            for _, emp in f_m.iterrows():
-                eid = emp['kadrovski_broj']
-                res = conn.execute("SELECT * FROM development_plans WHERE kadrovski_broj=? AND period=?", (eid, current_period)).fetchone()
-                icon = "✅" if res else "❌"
-                status_text = res[12] if res else "Nije kreiran" 
-                
-                with st.expander(f"{icon} {emp['ime_prezime']} ({emp['radno_mjesto']}) - {status_text}"):
-                    if res:
-                        cols = [c[1] for c in conn.execute("PRAGMA table_info(development_plans)").fetchall()]
-                        d = dict(zip(cols, res))
-                        st.write(f"**🎯 Karijerni cilj:** {d.get('career_goal')}")
-                        c1, c2 = st.columns(2)
-                        with c1: st.info(f"**Snage:**\n{d.get('strengths')}")
-                        with c2: st.warning(f"**Područja za razvoj:**\n{d.get('areas_improve')}")
-                    else: st.warning("Nema IDP-a.")
+            # Zaglavlja stranice iz jednog status upita; IDP se čita tek u otvorenom panelu
+            page = paginated_list(f_m, f"hr_idp_{sel_dept_idp}")
+            status = load_team_status(page['kadrovski_broj'].tolist(), current_period, company_id)
+            reset_panels()
+            for _, emp in page.iterrows():
+                _idp_overview_panel(emp, status[emp['kadrovski_broj']], current_period)
         else: st.info("Nema zaposlenika.")
 
     # ----------------------------------------------------------------
@@ -169,15 +196,12 @@ def render_hr_view():
                 td = st.text_area("Opis")
                 if st.form_submit_button("➕ Kreiraj Predložak"):
                     if tn:
-                        with sqlite3.connect(DB_FILE) as db:
-                            db.execute("INSERT INTO form_templates (name, description, created_at, company_id) VALUES (?,?,?,?)", 
-                                       (tn, td, datetime.now().strftime("%Y-%m-%d"), company_id))
-                            db.commit()
-                        st.success("Kreirano!"); time.sleep(0.5); st.rerun()
-            st.dataframe(pd.read_sql_query("SELECT * FROM form_templates WHERE company_id=?", conn, params=(company_id,)))
+                        create_template(company_id, tn, td)
+                        st.toast("Kreirano!", icon="✅"); st.rerun()
+            templates = get_templates(company_id)
+            st.dataframe(templates)
 
         with tab_q:
-            templates = pd.read_sql_query("SELECT * FROM form_templates WHERE company_id=?", conn, params=(company_id,))
             if not templates.empty:
                 sel_tmpl_name = st.selectbox("Odaberi predložak:", templates['name'].tolist())
                 tmpl_id = int(templates[templates['name'] == sel_tmpl_name]['id'].values[0])
@@ -189,32 +213,25 @@ def render_hr_view():
                     q_t = c2.text_input("Pitanje")
                     q_d = st.text_area("Opis / Pomoć")
                     if st.form_submit_button("➕ Dodaj Pitanje"):
-                        with sqlite3.connect(DB_FILE) as db:
-                            db.execute("INSERT INTO form_questions (template_id, section, title, description, criteria_desc, company_id, order_index) VALUES (?,?,?,?,'',?,0)", 
-                                       (tmpl_id, sect_val, q_t, q_d, company_id))
-                            db.commit()
+                        add_template_question(company_id, tmpl_id, sect_val, q_t, q_d)
                         st.success("Dodano!"); st.rerun()
-                st.dataframe(pd.read_sql_query("SELECT * FROM form_questions WHERE template_id=?", conn, params=(tmpl_id,)))
+                st.dataframe(get_template_questions(tmpl_id))
 
         with tab_link:
             st.info(f"Povezivanje upitnika s periodom: **{current_period}**")
-            templates = pd.read_sql_query("SELECT * FROM form_templates WHERE company_id=?", conn, params=(company_id,))
             if not templates.empty:
                 s_t = st.selectbox("Odaberi aktivni upitnik:", templates['name'].tolist())
                 tid = templates[templates['name']==s_t]['id'].values[0]
                 if st.button("🔗 Aktiviraj za ovaj period"):
-                    with sqlite3.connect(DB_FILE) as db:
-                        db.execute("DELETE FROM cycle_templates WHERE period_name=? AND company_id=?", (current_period, company_id))
-                        db.execute("INSERT INTO cycle_templates (period_name, template_id, company_id) VALUES (?,?,?)", (current_period, int(tid), company_id))
-                        db.commit()
-                    st.success("Aktivirano!"); time.sleep(1); st.rerun()
+                    assign_template(company_id, current_period, tid)
+                    st.toast("Aktivirano!", icon="✅"); st.rerun()
 
     # ----------------------------------------------------------------
     # 6. ŠIFARNIK I UNOS
     # ----------------------------------------------------------------
     elif menu == "🗂️ Šifarnik & Unos":
         st.header("🗂️ Upravljanje Zaposlenicima")
-        t1, t2, t3 = st.tabs(["Popis", "Ručni Unos", "Excel Import"])
+        t1, t2, t3 = st.tabs(["Popis", "Ručni Unos", "Import"])
         
         with t1: st.dataframe(df_master, use_container_width=True)
         
@@ -236,36 +253,37 @@ def render_hr_view():
                         if kb == sel_mid:
                             st.error("❌ Greška: Zaposlenik ne može biti sam sebi nadređeni!")
                         else:
-                            pw = make_hashes("lozinka123")
-                            with sqlite3.connect(DB_FILE) as db:
-                                db.execute("INSERT OR REPLACE INTO employees_master (kadrovski_broj, ime_prezime, radno_mjesto, department, manager_id, is_manager, active, company_id) VALUES (?,?,?,?,?,?,?,?)", 
-                                           (kb, ip, rm, od, sel_mid, 1 if is_m else 0, 1, company_id))
-                                db.execute("INSERT OR IGNORE INTO users (username, password, role, department, company_id) VALUES (?,?,?,?,?)", 
-                                           (kb, pw, "Manager" if is_m else "Employee", od, company_id))
-                                db.commit()
-                            st.success("Spremljeno!"); time.sleep(1); st.rerun()
+                            save_employee(company_id, kb, ip, rm, od, sel_mid, is_m, make_hashes("lozinka123"))
+                            invalidate_login_cache(kb)
+                            st.toast("Spremljeno!", icon="✅"); st.rerun()
                     else: st.error("Obavezna polja!")
 
         with t3:
-            f = st.file_uploader("Excel Import", type=['xlsx'])
+            st.caption("Stupci: kadrovski_broj, ime_prezime, radno_mjesto, department, manager_id, is_manager")
+            f = st.file_uploader("Import (Excel / CSV / Parquet)", type=IMPORT_FORMATS)
             if f and st.button("Import"):
                 try:
-                    df_i = pd.read_excel(f)
-                    pw = make_hashes("lozinka123")
-                    with sqlite3.connect(DB_FILE) as db:
-                        for _, r in df_i.iterrows():
-                            kid = clean_excel_id(r.get('kadrovski_broj'))
-                            if not kid: continue
-                            mid = clean_excel_id(r.get('manager_id'))
-                            # Opcionalno: ovdje također možeš dodati if kid == mid continue
-                            im = 1 if str(r.get('is_manager')).lower() in ['da','1','true'] else 0
-                            db.execute("INSERT OR REPLACE INTO employees_master (kadrovski_broj, ime_prezime, radno_mjesto, department, manager_id, is_manager, active, company_id) VALUES (?,?,?,?,?,?,?,?)", 
-                                       (kid, r.get('ime_prezime'), r.get('radno_mjesto'), r.get('department'), mid, im, 1, company_id))
-                            db.execute("INSERT OR IGNORE INTO users (username, password, role, department, company_id) VALUES (?,?,?,?,?)", 
-                                       (kid, pw, "Manager" if im else "Employee", r.get('department'), company_id))
-                        db.commit()
-                    st.success("Import završen."); st.rerun()
+                    bar = st.progress(0.0, text="Učitavanje...")
+                    summary = import_employees(iter_import_chunks(f, f.name), company_id, make_hashes(DEFAULT_PASSWORD),
+                                               progress=lambda rows, frac: bar.progress(frac, text=f"Učitano {rows} redova"))
+                    # Promjena odjela ili novi red za zaposlenika koji već ima procjene (npr. ponovno zaposlen) mijenja agregat
+                    if summary['inserted'] or summary['updated']: rebuild_ninebox_agg(company_id)
+                    if summary['users_created']: invalidate_login_cache()
+                    st.session_state['import_summary'] = summary
+                    st.rerun()
                 except Exception as e: st.error(str(e))
+            
+            summary = st.session_state.get('import_summary')
+            if summary:
+                st.success(f"Import završen: {summary['total']} redova.")
+                c1, c2, c3, c4 = st.columns(4)
+                c1.metric("Novi", summary['inserted'])
+                c2.metric("Ažurirani", summary['updated'])
+                c3.metric("Bez promjene", summary['unchanged'])
+                c4.metric("Odbijeni", len(summary['rejected']))
+                st.caption(f"Kreirano korisničkih računa: {summary['users_created']}")
+                if not summary['rejected'].empty:
+                    st.dataframe(summary['rejected'].rename(columns={'row_no': 'Red', 'kadrovski_broj': 'Kadrovski broj', 'reject_reason': 'Razlog'}), hide_index=True, use_container_width=True)
 
     # ----------------------------------------------------------------
     # 7. UREĐIVANJE & BRISANJE
@@ -308,25 +326,15 @@ def render_hr_view():
                     if new_mgr_id == real_id:
                         st.error("❌ Greška: Zaposlenik ne može biti sam sebi nadređeni!")
                     else:
-                        with sqlite3.connect(DB_FILE) as db:
-                            db.execute("UPDATE employees_master SET ime_prezime=?, department=?, manager_id=? WHERE kadrovski_broj=?", 
-                                       (n_ime, n_dept, new_mgr_id, real_id))
-                            db.execute("UPDATE users SET department=? WHERE username=?", (n_dept, real_id))
-                            if n_pass:
-                                db.execute("UPDATE users SET password=? WHERE username=?", (make_hashes(n_pass), real_id))
-                            db.commit()
-                        st.success("Podaci uspješno ažurirani!"); time.sleep(1); st.rerun()
+                        update_employee(company_id, real_id, n_ime, n_dept, new_mgr_id, make_hashes(n_pass) if n_pass else None)
+                        st.toast("Podaci uspješno ažurirani!", icon="✅"); st.rerun()
 
             st.divider()
             c1, c2 = st.columns([3, 1])
             c1.warning("Trajno brisanje korisnika!")
             if c2.button("🗑️ TRAJNO OBRIŠI"):
-                with sqlite3.connect(DB_FILE) as db:
-                    for tbl in ['employees_master', 'users', 'evaluations', 'goals', 'development_plans']:
-                        col = 'username' if tbl == 'users' else 'kadrovski_broj'
-                        db.execute(f"DELETE FROM {tbl} WHERE {col}=?", (real_id,))
-                    db.commit()
-                st.error("Obrisano!"); time.sleep(1); st.rerun()
+                delete_employee(company_id, real_id)
+                st.toast("Obrisano!", icon="🗑️"); st.rerun()
 
     # ----------------------------------------------------------------
     # 8. POSTAVKE RAZDOBLJA
@@ -336,7 +344,7 @@ def render_hr_view():
         t1, t2, t3 = st.tabs(["Aktivacija / Promjena", "Novo Razdoblje", "Brisanje"])
         
         with t1:
-            periods = pd.read_sql_query("SELECT period_name, start_date, deadline, is_active FROM periods WHERE company_id=? ORDER BY period_name DESC", conn, params=(company_id,))
+            periods = get_periods(company_id)
             if not periods.empty:
                 st.dataframe(periods, use_container_width=True)
                 active_row = periods[periods['is_active'] == 1]
@@ -345,19 +353,13 @@ def render_hr_view():
                 
                 sel_activate = st.selectbox("Postavi novo aktivno razdoblje:", periods['period_name'].tolist())
                 if st.button("✅ Aktiviraj odabrano"):
-                    with sqlite3.connect(DB_FILE) as db:
-                        db.execute("UPDATE periods SET is_active=0 WHERE company_id=?", (company_id,))
-                        db.execute("UPDATE periods SET is_active=1 WHERE period_name=? AND company_id=?", (sel_activate, company_id))
-                        db.execute("UPDATE app_settings SET setting_value=? WHERE setting_key='active_period'", (sel_activate,))
-                        db.commit()
-                    st.success(f"Razdoblje {sel_activate} je sada aktivno!"); time.sleep(1); st.rerun()
+                    activate_period(company_id, sel_activate)
+                    st.toast(f"Razdoblje {sel_activate} je sada aktivno!", icon="✅"); st.rerun()
                 
                 st.divider()
                 new_deadline = st.date_input("Novi rok")
                 if st.button("💾 Ažuriraj Rok"):
-                    with sqlite3.connect(DB_FILE) as db:
-                        db.execute("UPDATE periods SET deadline=? WHERE period_name=?", (str(new_deadline), sel_activate))
-                        db.commit()
+                    set_period_deadline(sel_activate, new_deadline)
                     st.success("Rok ažuriran."); st.rerun()
 
         with t2:
@@ -367,10 +369,8 @@ def render_hr_view():
                 ed = st.date_input("Rok završetka")
                 if st.form_submit_button("Spremi"):
                     if np:
-                        with sqlite3.connect(DB_FILE) as db:
-                            db.execute("INSERT INTO periods (period_name, start_date, deadline, is_active, company_id) VALUES (?,?,?,0,?)", (np, str(sd), str(ed), company_id))
-                            db.commit()
-                        st.success("Kreirano!"); time.sleep(1); st.rerun()
+                        create_period(company_id, np, sd, ed)
+                        st.toast("Kreirano!", icon="✅"); st.rerun()
 
         with t3:
             if not periods.empty:
@@ -378,23 +378,66 @@ def render_hr_view():
                 confirm = st.checkbox(f"Siguran sam da želim obrisati {p_del}?", value=False)
                 if st.button("🗑️ Obriši"):
                     if confirm:
-                        with sqlite3.connect(DB_FILE) as db:
-                            db.execute("DELETE FROM periods WHERE period_name=?", (p_del,))
-                            db.commit()
-                        st.success("Obrisano!"); time.sleep(1); st.rerun()
+                        delete_period(p_del)
+                        st.toast("Obrisano!", icon="🗑️"); st.rerun()
 
     # ----------------------------------------------------------------
     # 9. EXPORT
     # ----------------------------------------------------------------
     elif menu == "📥 Export":
         st.header("📥 Export")
-        if st.button("Preuzmi Excel"):
-            buffer = io.BytesIO()
-            with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-                pd.read_sql_query("SELECT * FROM employees_master WHERE company_id=?", conn, params=(company_id,)).to_excel(writer, sheet_name="Zaposlenici")
-                pd.read_sql_query("SELECT * FROM evaluations WHERE company_id=?", conn, params=(company_id,)).to_excel(writer, sheet_name="Procjene")
-                pd.read_sql_query("SELECT * FROM goals WHERE company_id=?", conn, params=(company_id,)).to_excel(writer, sheet_name="Ciljevi")
-                pd.read_sql_query("SELECT * FROM development_plans WHERE company_id=?", conn, params=(company_id,)).to_excel(writer, sheet_name="IDP")
-            st.download_button("Download", buffer.getvalue(), f"export_{date.today()}.xlsx")
+        # Export se piše redak po redak u privremenu datoteku; sprema se u sesiju pa
+        # ponovni rerun (npr. klik na Download) ne gradi datoteku iznova.
+        exp_periods = get_export_periods(company_id)
+        c1, c2, c3 = st.columns(3)
+        exp_fmt = c1.selectbox("Format", list(EXPORT_FORMATS), format_func=EXPORT_FORMATS.get)
+        p_opts = ["Sva razdoblja"] + exp_periods
+        exp_period = c2.selectbox("Razdoblje", p_opts, index=p_opts.index(current_period) if current_period in p_opts else 0)
+        exp_dept = c3.selectbox("Odjel", dept_list, key="exp_dept")
+        if st.button("Pripremi export"):
+            with st.spinner("Generiram export..."):
+                path, fname = export_to_file(exp_fmt, company_id,
+                                             None if exp_period == "Sva razdoblja" else exp_period,
+                                             None if exp_dept == "Svi" else exp_dept)
+            st.session_state['export_file'] = (path, fname)
+        exp_file = st.session_state.get('export_file')
+        if exp_file and os.path.exists(exp_file[0]):
+            # Datoteka se čita tek na klik, ne pri svakom rerunu stranice
+            st.download_button(f"Download {exp_file[1]}", data=lambda path=exp_file[0]: _read_file(path), file_name=exp_file[1],
+                               mime="application/octet-stream", on_click="ignore")
 
-    conn.close()
\ No newline at end of file
+    # ----------------------------------------------------------------
+    # 10. AUDIT LOG
+    # ----------------------------------------------------------------
+    elif menu == "🔐 Audit Log":
+        render_audit_log(company_id)
+
+# ----------------------------------------------------------------
+# PANELI PREGLEDA PO ZAPOSLENIKU (st.fragment, samo čitanje)
+# Otvaranje panela izvodi samo taj panel i tek tada čita podatke zaposlenika.
+# ----------------------------------------------------------------
+@st.fragment
+def _goals_overview_panel(emp, status, period):
+    eid = emp['kadrovski_broj']
+    with profiler.fragment("📊 HR Panel › 🎯 Upravljanje Ciljevima (panel)", st.session_state.get('username')):
+        with panel_expander(f"👤 {emp['ime_prezime']} ({status['goals']} ciljeva)", f"hr_goals_{eid}") as box:
+            if not box.open: return
+            goals = panel_data(f"hr_goals_{eid}", lambda: load_team_goals([eid], period, with_kpis=False)[0][eid])
+            if goals.empty: st.info("Nema ciljeva u ovom razdoblju.")
+            else: st.dataframe(goals[['title', 'weight', 'progress', 'status', 'deadline']], use_container_width=True)
+
+@st.fragment
+def _idp_overview_panel(emp, status, period):
+    eid = emp['kadrovski_broj']
+    with profiler.fragment("📊 HR Panel › 🚀 Razvojni Planovi (IDP) (panel)", st.session_state.get('username')):
+        icon = "✅" if status['idp_status'] is not None else "❌"
+        status_text = status['idp_status'] if status['idp_status'] is not None else "Nije kreiran"
+        with panel_expander(f"{icon} {emp['ime_prezime']} ({emp['radno_mjesto']}) - {status_text}", f"hr_idp_{eid}") as box:
+            if not box.open: return
+            d = panel_data(f"hr_idp_{eid}", lambda: load_team_development_plans([eid], period)[eid])
+            if d:
+                st.write(f"**🎯 Karijerni cilj:** {d.get('career_goal')}")
+                c1, c2 = st.columns(2)
+                with c1: st.info(f"**Snage:**\n{d.get('strengths')}")
+                with c2: st.warning(f"**Područja za razvoj:**\n{d.get('areas_improve')}")
+            else: st.warning("Nema IDP-a.")
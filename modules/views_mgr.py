@@ -1,26 +1,28 @@
 import streamlit as st
 import pandas as pd
-import json
 import plotly.express as px
 import plotly.graph_objects as go
-import sqlite3
-import time
-from datetime import datetime, date
-import streamlit.components.v1 as components
 
-from modules.database import get_connection, get_active_period_info, DB_FILE, save_evaluation_json_method
+from modules.database import get_active_period_info, save_evaluation_json_method
 # 1. IMPORT NOVIH SIGURNIH FUNKCIJA (JEDINA PROMJENA NA VRHU)
 from modules.utils import (
     calculate_category, render_metric_input, 
     table_to_json_string, get_df_from_json, get_active_survey_questions,
-    safe_load_json, normalize_progress, create_9box_grid
+    normalize_progress, render_9box_chart, paginated_list, panel_expander, reset_panels, panel_data,
+    panel_status, refresh_panel, rerun_panel
 )
+from modules.repository import (
+    load_team_goals, load_team_evaluations, load_team_status, load_ninebox_summary, load_ninebox_cells, load_team_development_plans,
+    get_team, get_evaluation, get_submitted_evaluations, load_answer_gap, add_goal, update_goal, delete_goal, save_goal_kpis,
+    save_development_plan, add_recognition
+)
+from modules.history import employee_trail
+from modules import profiler
 
 def render_manager_view():
-    conn = get_connection()
-    current_period, deadline = get_active_period_info()
     username = st.session_state.get('username')
     company_id = st.session_state.get('company_id', 1)
+    current_period, deadline = get_active_period_info(company_id)
     
     # INFO BAR
     st.info(f"📅 **AKTIVNO RAZDOBLJE:** {current_period}  |  ⏳ **ROK:** {deadline}")
@@ -36,38 +38,40 @@ def render_manager_view():
         "🚀 Razvojni Planovi (IDP)", 
         "🤝 Upravljanje Ljudima"
     ])
+    profiler.set_view(menu)
 
     # ----------------------------------------------------------------
     # 1. DASHBOARD
     # ----------------------------------------------------------------
     if menu == "📊 Dashboard":
         st.header(f"📊 Moj Dashboard")
-        my_team = pd.read_sql_query("SELECT * FROM employees_master WHERE manager_id=? AND company_id=?", conn, params=(username, company_id))
+        my_team = get_team(username, company_id)
         
-        # Statistika
-        evals = pd.read_sql_query("SELECT * FROM evaluations WHERE period=? AND manager_id=? AND is_self_eval=0", conn, params=(current_period, username))
+        # Statistika iz agregata ninebox_agg (zaključane procjene), bez učitavanja redova procjena
+        summary = load_ninebox_summary(company_id, current_period, manager_id=username)
         
         c1, c2, c3 = st.columns(3)
         c1.metric("Moj Tim", len(my_team))
-        finished = len(evals[evals['status']=='Submitted'])
+        finished = int(summary['n'].sum())
         c2.metric("Završeno", f"{finished} / {len(my_team)}")
-        avg_score = evals['avg_performance'].mean() if not evals.empty else 0
+        avg_score = summary['sum_perf'].sum() / finished if finished else 0
         c3.metric("Prosjek Tima", f"{avg_score:.2f}")
 
         t1, t2 = st.tabs(["9-Box Matrica", "Povijest (Snail Trail)"])
         with t1:
-            if not evals.empty:
+            if finished:
                 # 2. PROMJENA: Korištenje centralizirane funkcije umjesto ručnog px.scatter
-                fig = create_9box_grid(evals, title="9-Box Matrica Tima")
-                if fig:
-                    st.plotly_chart(fig, use_container_width=True)
+                render_9box_chart(load_ninebox_cells(company_id, current_period, manager_id=username),
+                                  lambda cell, limit, offset: get_submitted_evaluations(company_id, current_period, manager_id=username,
+                                                                                        cell=cell, limit=limit, offset=offset),
+                                  title="9-Box Matrica Tima", key="mgr_ninebox")
             else: st.info("Nema podataka.")
         
         with t2:
             if not my_team.empty:
                 sel = st.selectbox("Odaberi zaposlenika:", my_team['ime_prezime'].tolist())
                 kid = my_team[my_team['ime_prezime']==sel]['kadrovski_broj'].values[0]
-                hist = pd.read_sql_query("SELECT period, avg_performance, avg_potential FROM evaluations WHERE kadrovski_broj=? AND is_self_eval=0 AND status='Submitted' ORDER BY period", conn, params=(kid,))
+                hist = employee_trail(company_id, kid)
                 
                 if not hist.empty:
                     fig = go.Figure()
@@ -101,9 +105,8 @@ def render_manager_view():
     # ----------------------------------------------------------------
     elif menu == "👤 Moji Rezultati":
         st.header("👤 Moji Rezultati")
-        me_eval = pd.read_sql_query("SELECT * FROM evaluations WHERE kadrovski_broj=? AND period=? AND is_self_eval=0", conn, params=(username, current_period))
-        if not me_eval.empty:
-            r = me_eval.iloc[0]
+        r = get_evaluation(username, current_period, is_self_eval=False)
+        if r is not None:
             st.info(f"Status: {r['status']}")
             c1, c2, c3 = st.columns(3)
             c1.metric("Učinak", f"{r['avg_performance']:.2f}")
@@ -118,7 +121,7 @@ def render_manager_view():
     # ----------------------------------------------------------------
     elif menu == "🎯 Ciljevi Tima":
         st.header("🎯 Ciljevi Tima")
-        my_team = pd.read_sql_query("SELECT * FROM employees_master WHERE manager_id=?", conn, params=(username,))
+        my_team = get_team(username, company_id)
         
         with st.expander("➕ Dodaj Novi Cilj", expanded=False):
             with st.form("new_goal"):
@@ -129,91 +132,16 @@ def render_manager_view():
                 dline = st.date_input("Rok")
                 if st.form_submit_button("Kreiraj"):
                     kid = my_team[my_team['ime_prezime']==emp]['kadrovski_broj'].values[0]
-                    conn.execute("INSERT INTO goals (period, kadrovski_broj, manager_id, title, description, weight, progress, status, last_updated, deadline, company_id) VALUES (?,?,?,?,?,?,0,'On Track',?,?,?)",
-                               (current_period, kid, username, tit, desc, wei, datetime.now().strftime("%Y-%m-%d"), str(dline), company_id))
-                    conn.commit()
-                    st.success("Dodano!")
+                    add_goal(company_id, current_period, kid, username, tit, desc, wei, dline)
+                    st.toast("Cilj dodan!", icon="✅")
                     st.rerun()
 
-        for _, emp in my_team.iterrows():
-            eid = emp['kadrovski_broj']
-            goals = pd.read_sql_query("SELECT * FROM goals WHERE kadrovski_broj=? AND period=?", conn, params=(eid, current_period))
-            tot_w = goals['weight'].sum() if not goals.empty else 0
-            
-            color = "green" if tot_w == 100 else "red"
-            with st.expander(f"👤 {emp['ime_prezime']} (Ukupna težina ciljeva: :{color}[{tot_w}%])"):
-                if tot_w != 100: st.warning(f"⚠️ Zbroj težina svih ciljeva mora biti točno 100%! Trenutno: {tot_w}%")
-                
-                for _, g in goals.iterrows():
-                    gid = g['id']
-                    
-                    c_title, c_act = st.columns([4, 1])
-                    c_title.markdown(f"### 🎯 {g['title']} ({g['weight']}%)")
-                    
-                    if c_act.button("🗑️ Briši", key=f"pre_del_{gid}"):
-                        st.session_state[f"confirm_del_{gid}"] = True
-                    
-                    if st.session_state.get(f"confirm_del_{gid}"):
-                        st.error("Jeste li sigurni? Ovo briše cilj i sve njegove KPI-eve.")
-                        col_yes, col_no = st.columns(2)
-                        if col_yes.button("DA, Obriši", key=f"yes_del_{gid}"):
-                            conn.execute("DELETE FROM goals WHERE id=?", (gid,))
-                            conn.execute("DELETE FROM goal_kpis WHERE goal_id=?", (gid,))
-                            conn.commit()
-                            st.rerun()
-                        if col_no.button("Odustani", key=f"no_del_{gid}"):
-                            st.session_state[f"confirm_del_{gid}"] = False
-                            st.rerun()
-
-                    with st.expander("✏️ Uredi detalje cilja"):
-                        with st.form(f"edit_goal_{gid}"):
-                            nt = st.text_input("Naziv", g['title'])
-                            nw = st.number_input("Težina (%)", 1, 100, g['weight'])
-                            nd = st.text_area("Opis", g['description'])
-                            if st.form_submit_button("Ažuriraj Cilj"):
-                                conn.execute("UPDATE goals SET title=?, weight=?, description=? WHERE id=?", (nt, nw, nd, gid))
-                                conn.commit()
-                                st.success("Ažurirano!")
-                                st.rerun()
-
-                    st.write("**Ključni pokazatelji (KPI) unutar ovog cilja:**")
-                    kpis = pd.read_sql_query("SELECT description, weight, progress FROM goal_kpis WHERE goal_id=?", conn, params=(gid,))
-                    
-                    df_k = kpis.rename(columns={'description':'KPI Naziv','weight':'Težina (%)','progress':'Ostvarenje (%)'}) if not kpis.empty else pd.DataFrame(columns=['KPI Naziv','Težina (%)','Ostvarenje (%)'])
-                    
-                    ed = st.data_editor(df_k, key=f"k_{gid}", num_rows="dynamic", use_container_width=True)
-                    
-                    if st.button("💾 Spremi KPI i Izračunaj", key=f"s_{gid}"):
-                        ed['Težina (%)'] = pd.to_numeric(ed['Težina (%)'], errors='coerce').fillna(0)
-                        ed['Ostvarenje (%)'] = pd.to_numeric(ed['Ostvarenje (%)'], errors='coerce').fillna(0)
-                        
-                        current_kpi_sum = ed['Težina (%)'].sum()
-                        
-                        conn.execute("DELETE FROM goal_kpis WHERE goal_id=?", (gid,))
-                        weighted_progress_sum = 0
-                        
-                        for _, r in ed.iterrows():
-                            if str(r['KPI Naziv']).strip():
-                                w_val = float(r['Težina (%)'])
-                                p_val = float(r['Ostvarenje (%)'])
-                                conn.execute("INSERT INTO goal_kpis (goal_id, description, weight, progress) VALUES (?,?,?,?)", (gid, str(r['KPI Naziv']), w_val, p_val))
-                                weighted_progress_sum += (w_val * p_val) / 100
-                        
-                        conn.execute("UPDATE goals SET progress=?, last_updated=? WHERE id=?", (weighted_progress_sum, datetime.now().strftime("%Y-%m-%d"), gid))
-                        conn.commit()
-                        
-                        if current_kpi_sum != 100:
-                            st.warning(f"⚠️ KPI-evi su spremljeni, ali zbroj težina je {current_kpi_sum}% (cilj je 100%).")
-                        else:
-                            st.success(f"✅ Spremljeno! Napredak cilja: {weighted_progress_sum:.1f}%")
-                        
-                        time.sleep(1)
-                        st.rerun()
-                    
-                    # 3. PROMJENA: Dodan normalize_progress u st.progress
-                    st.progress(normalize_progress(g['progress']))
-                    st.caption(f"Ostvarenje cilja: {g['progress']:.1f}%")
-                    st.divider()
+        # Zaglavlja stranice iz jednog status upita; ciljevi i KPI-evi se čitaju tek u otvorenom panelu
+        page = paginated_list(my_team, "mgr_goals")
+        status = load_team_status(page['kadrovski_broj'].tolist(), current_period, company_id)
+        reset_panels()
+        for _, emp in page.iterrows():
+            _goals_panel(emp, current_period, status[emp['kadrovski_broj']], company_id)
 
     # ----------------------------------------------------------------
     # 4. UNOS PROCJENA
@@ -221,201 +149,29 @@ def render_manager_view():
     elif menu == "📝 Unos Procjena":
         st.header("📝 Procjena Zaposlenika")
         
-        my_team = pd.read_sql_query("SELECT * FROM employees_master WHERE manager_id=? AND company_id=?", conn, params=(username, company_id))
+        my_team = get_team(username, company_id)
         
-        for _, emp in my_team.iterrows():
-            kid = emp['kadrovski_broj']
-            r_df = pd.read_sql_query("SELECT * FROM evaluations WHERE kadrovski_broj=? AND period=? AND is_self_eval=0", conn, params=(kid, current_period))
-            r = r_df.iloc[0] if not r_df.empty else None
-            
-            is_locked = (r is not None and str(r['status']).strip() == 'Submitted')
-            status_icon = "🔒" if is_locked else "✏️"
-            status_text = "Završeno" if is_locked else ("U tijeku" if r is not None else "Nije započeto")
-            
-            with st.expander(f"{status_icon} {emp['ime_prezime']} ({status_text})"):
-                tab_input, tab_gap = st.tabs(["🖊️ Unos Ocjena", "🔍 Gap Analiza (Usporedba)"])
-                
-                with tab_input:
-                    if is_locked:
-                        st.success("✅ Ova procjena je zaključana i poslana.")
-                        c1, c2, c3 = st.columns(3)
-                        c1.metric("Učinak", f"{r['avg_performance']:.2f}")
-                        c2.metric("Potencijal", f"{r['avg_potential']:.2f}")
-                        c3.metric("Kategorija", r['category'])
-                        
-                        st.markdown("---")
-                        st.markdown("### 📋 Detaljni prikaz ocjena (Read-Only)")
-                        
-                        saved = {}
-                        if r['json_answers']:
-                            try: saved = json.loads(r['json_answers'])
-                            except: pass
-                        
-                        cr1, cr2 = st.columns(2)
-                        with cr1:
-                            st.markdown("#### Učinak")
-                            for m in survey_data['p']:
-                                val = saved.get(str(m['id']), "-")
-                                st.markdown(f"**{m['title']}**: :blue[{val}]")
-                                st.caption(f"_{m['def']}_")
-                                st.divider()
-                        with cr2:
-                            st.markdown("#### Potencijal")
-                            for m in survey_data['pot']:
-                                val = saved.get(str(m['id']), "-")
-                                st.markdown(f"**{m['title']}**: :blue[{val}]")
-                                st.caption(f"_{m['def']}_")
-                                st.divider()
-
-                        st.write("**Zaključni komentar:**")
-                        st.info(r['action_plan'])
-                    else:
-                        with st.form(f"eval_form_{kid}"):
-                            # 4. PROMJENA: safe_load_json umjesto čistog json.loads
-                            saved = safe_load_json(r['json_answers'] if r is not None else None)
-                            
-                            scores_p = []
-                            scores_pot = []
-                            
-                            c1, c2 = st.columns(2)
-                            with c1:
-                                st.subheader("Učinak (Performance)")
-                                for m in survey_data['p']:
-                                    key_p = f"p_{kid}_{m['id']}"
-                                    val = int(saved.get(str(m['id']), 3))
-                                    s = render_metric_input(m['title'], m['def'], m['crit'], key_p, val, "perf")
-                                    scores_p.append((str(m['id']), s))
-                                    
-                            with c2:
-                                st.subheader("Potencijal (Potential)")
-                                for m in survey_data['pot']:
-                                    key_pot = f"pot_{kid}_{m['id']}"
-                                    val = int(saved.get(str(m['id']), 3))
-                                    s = render_metric_input(m['title'], m['def'], m['crit'], key_pot, val, "pot")
-                                    scores_pot.append((str(m['id']), s))
-
-                            plan = st.text_area("Komentar / Akcijski plan", r['action_plan'] if r is not None else "")
-                            
-                            col_draft, col_final = st.columns(2)
-                            is_draft = col_draft.form_submit_button("💾 Spremi kao Nacrt")
-                            is_final = col_final.form_submit_button("✅ Pošalji i Zaključaj")
-                            
-                            if is_draft or is_final:
-                                vals_p = [x[1] for x in scores_p]
-                                vals_pot = [x[1] for x in scores_pot]
-                                avg_p = sum(vals_p) / len(vals_p) if vals_p else 0
-                                avg_pot = sum(vals_pot) / len(vals_pot) if vals_pot else 0
-                                cat = calculate_category(avg_p, avg_pot)
-                                
-                                all_answers = {}
-                                for pid, pval in scores_p: all_answers[pid] = pval
-                                for potid, potval in scores_pot: all_answers[potid] = potval
-                                
-                                user_data = {'ime': emp['ime_prezime'], 'radno_mjesto': emp['radno_mjesto'], 'odjel': emp['department']}
-                                target_status = "Submitted" if is_final else "Draft"
-                                
-                                success, msg = save_evaluation_json_method(
-                                    company_id, current_period, kid, username, user_data, 
-                                    vals_p, vals_pot, avg_p, avg_pot, cat, plan, 
-                                    all_answers, False, target_status
-                                )
-                                
-                                if success:
-                                    if is_final: st.balloons()
-                                    st.success(f"Procjena {target_status}!")
-                                    time.sleep(1)
-                                    st.rerun()
-                                else: st.error(msg)
-
-                with tab_gap:
-                    se_df = pd.read_sql_query("SELECT * FROM evaluations WHERE kadrovski_broj=? AND period=? AND is_self_eval=1", conn, params=(kid, current_period))
-                    if not se_df.empty:
-                        se_row = se_df.iloc[0]
-                        # 4. PROMJENA: safe_load_json i ovdje
-                        mgr_json = safe_load_json(r['json_answers'] if r is not None else None)
-                        se_json = safe_load_json(se_row['json_answers'])
-                        
-                        gap_data = []
-                        for q in survey_data['p'] + survey_data['pot']:
-                            qid = str(q['id'])
-                            s_mgr = int(mgr_json.get(qid, 0))
-                            s_emp = int(se_json.get(qid, 0))
-                            gap_data.append({"Pitanje": q['title'], "Radnik": s_emp, "Manager": s_mgr, "Razlika": s_mgr - s_emp})
-                        st.table(pd.DataFrame(gap_data))
-                    else: st.warning("Radnik još nije ispunio samoprocjenu.")
+        # Zaglavlja stranice iz jednog status upita; procjena i samoprocjena se čitaju tek u otvorenom panelu
+        page = paginated_list(my_team, "mgr_evals")
+        status = load_team_status(page['kadrovski_broj'].tolist(), current_period, company_id)
+        reset_panels()
+        for _, emp in page.iterrows():
+            _evaluation_panel(emp, status[emp['kadrovski_broj']], survey_data, company_id, current_period, username)
 
     # ----------------------------------------------------------------
     # 5. IDP (RAZVOJNI PLANOVI) - EXPANDERI + BOGATI SADRŽAJ
     # ----------------------------------------------------------------
     elif menu == "🚀 Razvojni Planovi (IDP)":
         st.header("🚀 Razvojni Planovi (IDP)")
-        team = pd.read_sql_query("SELECT * FROM employees_master WHERE manager_id=?", conn, params=(username,))
+        team = get_team(username, company_id)
         
         if not team.empty:
-            for _, emp in team.iterrows():
-                eid = emp['kadrovski_broj']
-                
-                # Dohvat podataka za ovog radnika
-                res = conn.execute("SELECT * FROM development_plans WHERE kadrovski_broj=? AND period=?", (eid, current_period)).fetchone()
-                d = {}
-                if res:
-                    cols = [c[1] for c in conn.execute("PRAGMA table_info(development_plans)").fetchall()]
-                    d = dict(zip(cols, res))
-                
-                # Ikonica ovisno o statusu
-                status_icon = "🟢" if d.get('status') == 'Active' else "⚪"
-                
-                # Expander po zaposleniku
-                with st.expander(f"{status_icon} {emp['ime_prezime']} ({emp['radno_mjesto']})"):
-                    with st.form(f"idp_form_{eid}"):
-                        st.subheader("1. Dijagnoza i Smjer")
-                        c1, c2 = st.columns(2)
-                        with c1:
-                            st.text_area("💪 Ključne Snage", value=d.get('strengths',''), height=100, help="U čemu je zaposlenik izniman?", key=f"s_{eid}")
-                        with c2:
-                            st.text_area("🚧 Područja za razvoj", value=d.get('areas_improve',''), height=100, help="Što koči zaposlenika ili što mu nedostaje?", key=f"w_{eid}")
-                        
-                        st.text_input("🎯 Karijerni cilj (kratkoročni/dugoročni)", value=d.get('career_goal',''), help="Koju poziciju ili razinu stručnosti ciljamo?", key=f"g_{eid}")
-                        
-                        st.markdown("---")
-                        st.subheader("2. Akcijski plan (70-20-10 Model)")
-                        
-                        st.info("📌 **70% - Učenje kroz rad (Iskustvo)**\n\nNovi zadaci, projekti, rotacije, povećanje odgovornosti.")
-                        d70 = st.data_editor(get_df_from_json(d.get('json_70',''), ["Što razviti?", "Aktivnost", "Rok", "Dokaz"]), key=f"d70_{eid}", num_rows="dynamic", use_container_width=True)
-                        
-                        st.info("👥 **20% - Učenje od drugih (Izloženost)**\n\nMentoring, coaching, feedback, shadowing, networking.")
-                        d20 = st.data_editor(get_df_from_json(d.get('json_20',''), ["Što razviti?", "Aktivnost", "Rok"]), key=f"d20_{eid}", num_rows="dynamic", use_container_width=True)
-                        
-                        st.info("📚 **10% - Formalna edukacija**\n\nTečajevi, certifikati, knjige, konferencije.")
-                        d10 = st.data_editor(get_df_from_json(d.get('json_10',''), ["Edukacija", "Trošak", "Rok"]), key=f"d10_{eid}", num_rows="dynamic", use_container_width=True)
-                        
-                        st.markdown("---")
-                        st.subheader("3. Podrška i Resursi")
-                        
-                        sc1, sc2 = st.columns(2)
-                        with sc1:
-                            supp_opts = ["---", "Mentoring (Interni)", "Coaching (Vanjski)", "Budžet za edukaciju", "Slobodni dani za učenje", "Rotacija posla", "Tehnička oprema"]
-                            curr_supp = d.get('support_needed', '---')
-                            if curr_supp not in supp_opts: curr_supp = "---"
-                            new_supp = st.selectbox("Primarna vrsta podrške:", supp_opts, index=supp_opts.index(curr_supp), key=f"supp_{eid}")
-                        
-                        with sc2:
-                            new_notes = st.text_area("Dodatne napomene / Detalji podrške:", value=d.get('support_notes',''), key=f"notes_{eid}")
-
-                        st.markdown("---")
-                        if st.form_submit_button("💾 Spremi Razvojni Plan"):
-                            with sqlite3.connect(DB_FILE) as db:
-                                db.execute("DELETE FROM development_plans WHERE kadrovski_broj=? AND period=?", (eid, current_period))
-                                db.execute("""INSERT INTO development_plans 
-                                           (period, kadrovski_broj, manager_id, strengths, areas_improve, career_goal, 
-                                           json_70, json_20, json_10, support_needed, support_notes, status, company_id) 
-                                           VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)""",
-                                           (current_period, eid, username, d.get('strengths',''), d.get('areas_improve',''), d.get('career_goal',''), 
-                                            table_to_json_string(d70), table_to_json_string(d20), table_to_json_string(d10), 
-                                            new_supp, new_notes, 'Active', company_id))
-                            st.toast(f"IDP za {emp['ime_prezime']} spremljen!", icon="✅")
-                            time.sleep(1)
-                            st.rerun()
+            # Zaglavlja stranice iz jednog status upita; IDP se čita tek u otvorenom panelu
+            page = paginated_list(team, "mgr_idp")
+            status = load_team_status(page['kadrovski_broj'].tolist(), current_period, company_id)
+            reset_panels()
+            for _, emp in page.iterrows():
+                _idp_panel(emp, status[emp['kadrovski_broj']], company_id, current_period, username)
         else:
             st.info("Nemate dodijeljenih članova tima.")
 
@@ -424,7 +180,7 @@ def render_manager_view():
     # ----------------------------------------------------------------
     elif menu == "🤝 Upravljanje Ljudima":
         st.header("🤝 Upravljanje Ljudima")
-        my_team = pd.read_sql_query("SELECT * FROM employees_master WHERE manager_id=?", conn, params=(username,))
+        my_team = get_team(username, company_id)
         t1, t2 = st.tabs(["Pohvale", "Delegiranje"])
         
         with t1:
@@ -433,11 +189,268 @@ def render_manager_view():
                 msg = st.text_area("Poruka:")
                 if st.form_submit_button("Pošalji"):
                     rid = my_team[my_team['ime_prezime']==rec]['kadrovski_broj'].values[0]
-                    conn.execute("INSERT INTO recognitions (sender_id, receiver_id, message, timestamp, company_id) VALUES (?,?,?,?,?)", (username, rid, msg, str(date.today()), company_id))
-                    conn.commit()
+                    add_recognition(company_id, username, rid, msg)
                     st.success("Poslano!")
 
         with t2:
             st.info("Ovdje možete delegirati procjene drugim voditeljima.")
 
-    conn.close()
\ No newline at end of file
+# ----------------------------------------------------------------
+# PANELI PO ZAPOSLENIKU (st.fragment)
+# Zaglavlje dolazi iz status upita stranice; podaci zaposlenika se učitavaju tek kad se
+# panel otvori, a spremanje u panelu ponovno učitava podatke i status zaposlenika (za
+# zaglavlje) i izvodi samo taj panel.
+# ----------------------------------------------------------------
+def _load_goals(eid, period):
+    goals_by_emp, kpis_by_goal = load_team_goals([eid], period)
+    return goals_by_emp[eid], kpis_by_goal
+
+def _load_status(eid, period, company_id):
+    return load_team_status([eid], period, company_id)[eid]
+
+@st.fragment
+def _goals_panel(emp, period, status, company_id):
+    """Ciljevi i KPI-evi jednog zaposlenika; spremanje ponovno izvodi samo ovaj panel."""
+    eid = emp['kadrovski_broj']
+    with profiler.fragment("👔 Voditeljski pogled › 🎯 Ciljevi Tima (panel)", st.session_state.get('username')):
+        status = panel_status(f"goals_{eid}", status)
+        color = "green" if status['goal_weight'] == 100 else "red"
+        with panel_expander(f"👤 {emp['ime_prezime']} ({status['goals']} ciljeva, ukupna težina: :{color}[{status['goal_weight']}%])", f"goals_{eid}") as box:
+            if not box.open: return
+            goals, kpis_by_goal = panel_data(f"goals_{eid}", lambda: _load_goals(eid, period))
+            tot_w = goals['weight'].sum() if not goals.empty else 0
+            if tot_w != 100: st.warning(f"⚠️ Zbroj težina svih ciljeva mora biti točno 100%! Trenutno: {tot_w}%")
+            
+            for _, g in goals.iterrows():
+                gid = g['id']
+                
+                c_title, c_act = st.columns([4, 1])
+                c_title.markdown(f"### 🎯 {g['title']} ({g['weight']}%)")
+                
+                if c_act.button("🗑️ Briši", key=f"pre_del_{gid}"):
+                    st.session_state[f"confirm_del_{gid}"] = True
+                
+                if st.session_state.get(f"confirm_del_{gid}"):
+                    st.error("Jeste li sigurni? Ovo briše cilj i sve njegove KPI-eve.")
+                    col_yes, col_no = st.columns(2)
+                    if col_yes.button("DA, Obriši", key=f"yes_del_{gid}"):
+                        delete_goal(gid)
+                        refresh_panel(f"goals_{eid}", _load_goals(eid, period), _load_status(eid, period, company_id))
+                    if col_no.button("Odustani", key=f"no_del_{gid}"):
+                        st.session_state[f"confirm_del_{gid}"] = False
+                        rerun_panel()
+
+                with st.expander("✏️ Uredi detalje cilja"):
+                    with st.form(f"edit_goal_{gid}"):
+                        nt = st.text_input("Naziv", g['title'])
+                        nw = st.number_input("Težina (%)", 1, 100, g['weight'])
+                        nd = st.text_area("Opis", g['description'])
+                        if st.form_submit_button("Ažuriraj Cilj"):
+                            update_goal(gid, nt, nw, nd)
+                            st.toast("Cilj ažuriran!", icon="✅")
+                            refresh_panel(f"goals_{eid}", _load_goals(eid, period), _load_status(eid, period, company_id))
+
+                st.write("**Ključni pokazatelji (KPI) unutar ovog cilja:**")
+                kpis = kpis_by_goal[gid]
+                
+                df_k = kpis.rename(columns={'description':'KPI Naziv','weight':'Težina (%)','progress':'Ostvarenje (%)'}) if not kpis.empty else pd.DataFrame(columns=['KPI Naziv','Težina (%)','Ostvarenje (%)'])
+                
+                ed = st.data_editor(df_k, key=f"k_{gid}", num_rows="dynamic", use_container_width=True)
+                
+                if st.button("💾 Spremi KPI i Izračunaj", key=f"s_{gid}"):
+                    ed['Težina (%)'] = pd.to_numeric(ed['Težina (%)'], errors='coerce').fillna(0)
+                    ed['Ostvarenje (%)'] = pd.to_numeric(ed['Ostvarenje (%)'], errors='coerce').fillna(0)
+                    
+                    current_kpi_sum = ed['Težina (%)'].sum()
+                    
+                    kpis = [(str(r['KPI Naziv']), float(r['Težina (%)']), float(r['Ostvarenje (%)']))
+                            for _, r in ed.iterrows() if str(r['KPI Naziv']).strip()]
+                    weighted_progress_sum = save_goal_kpis(gid, kpis)
+                    
+                    if current_kpi_sum != 100:
+                        st.toast(f"KPI-evi su spremljeni, ali zbroj težina je {current_kpi_sum}% (cilj je 100%).", icon="⚠️")
+                    else:
+                        st.toast(f"Spremljeno! Napredak cilja: {weighted_progress_sum:.1f}%", icon="✅")
+                    refresh_panel(f"goals_{eid}", _load_goals(eid, period))
+                
+                # 3. PROMJENA: Dodan normalize_progress u st.progress
+                st.progress(normalize_progress(g['progress']))
+                st.caption(f"Ostvarenje cilja: {g['progress']:.1f}%")
+                st.divider()
+
+@st.fragment
+def _evaluation_panel(emp, status, survey_data, company_id, period, username):
+    """Forma procjene jednog zaposlenika; spremanje ponovno izvodi samo ovaj panel."""
+    kid = emp['kadrovski_broj']
+    with profiler.fragment("👔 Voditeljski pogled › 📝 Unos Procjena (panel)", username):
+        status = panel_status(f"eval_{kid}", status)
+        submitted = str(status['eval_status']).strip() == 'Submitted'
+        status_icon = "🔒" if submitted else "✏️"
+        status_text = "Završeno" if submitted else ("U tijeku" if status['eval_status'] is not None else "Nije započeto")
+        self_text = ", samoprocjena ✅" if status['self_eval'] else ""
+        
+        with panel_expander(f"{status_icon} {emp['ime_prezime']} ({status_text}{self_text})", f"eval_{kid}") as box:
+            if not box.open: return
+            ev = panel_data(f"eval_{kid}", lambda: load_team_evaluations([kid], period, company_id)[kid])
+            r = ev['mgr']
+            is_locked = (r is not None and str(r['status']).strip() == 'Submitted')
+            tab_input, tab_gap = st.tabs(["🖊️ Unos Ocjena", "🔍 Gap Analiza (Usporedba)"])
+            
+            with tab_input:
+                if is_locked:
+                    st.success("✅ Ova procjena je zaključana i poslana.")
+                    c1, c2, c3 = st.columns(3)
+                    c1.metric("Učinak", f"{r['avg_performance']:.2f}")
+                    c2.metric("Potencijal", f"{r['avg_potential']:.2f}")
+                    c3.metric("Kategorija", r['category'])
+                    
+                    st.markdown("---")
+                    st.markdown("### 📋 Detaljni prikaz ocjena (Read-Only)")
+                    
+                    saved = ev['mgr_answers']
+                    
+                    cr1, cr2 = st.columns(2)
+                    with cr1:
+                        st.markdown("#### Učinak")
+                        for m in survey_data['p']:
+                            val = saved.get(str(m['id']), "-")
+                            st.markdown(f"**{m['title']}**: :blue[{val}]")
+                            st.caption(f"_{m['def']}_")
+                            st.divider()
+                    with cr2:
+                        st.markdown("#### Potencijal")
+                        for m in survey_data['pot']:
+                            val = saved.get(str(m['id']), "-")
+                            st.markdown(f"**{m['title']}**: :blue[{val}]")
+                            st.caption(f"_{m['def']}_")
+                            st.divider()
+
+                    st.write("**Zaključni komentar:**")
+                    st.info(r['action_plan'])
+                else:
+                    with st.form(f"eval_form_{kid}"):
+                        saved = ev['mgr_answers']
+                        
+                        scores_p = []
+                        scores_pot = []
+                        
+                        c1, c2 = st.columns(2)
+                        with c1:
+                            st.subheader("Učinak (Performance)")
+                            for m in survey_data['p']:
+                                key_p = f"p_{kid}_{m['id']}"
+                                val = int(saved.get(str(m['id']), 3))
+                                s = render_metric_input(m['title'], m['def'], m['crit'], key_p, val, "perf")
+                                scores_p.append((str(m['id']), s))
+                                
+                        with c2:
+                            st.subheader("Potencijal (Potential)")
+                            for m in survey_data['pot']:
+                                key_pot = f"pot_{kid}_{m['id']}"
+                                val = int(saved.get(str(m['id']), 3))
+                                s = render_metric_input(m['title'], m['def'], m['crit'], key_pot, val, "pot")
+                                scores_pot.append((str(m['id']), s))
+
+                        plan = st.text_area("Komentar / Akcijski plan", r['action_plan'] if r is not None else "")
+                        
+                        col_draft, col_final = st.columns(2)
+                        is_draft = col_draft.form_submit_button("💾 Spremi kao Nacrt")
+                        is_final = col_final.form_submit_button("✅ Pošalji i Zaključaj")
+                        
+                        if is_draft or is_final:
+                            vals_p = [x[1] for x in scores_p]
+                            vals_pot = [x[1] for x in scores_pot]
+                            avg_p = sum(vals_p) / len(vals_p) if vals_p else 0
+                            avg_pot = sum(vals_pot) / len(vals_pot) if vals_pot else 0
+                            cat = calculate_category(avg_p, avg_pot)
+                            
+                            all_answers = {}
+                            for pid, pval in scores_p: all_answers[pid] = pval
+                            for potid, potval in scores_pot: all_answers[potid] = potval
+                            
+                            user_data = {'ime': emp['ime_prezime'], 'radno_mjesto': emp['radno_mjesto'], 'odjel': emp['department']}
+                            target_status = "Submitted" if is_final else "Draft"
+                            
+                            success, msg = save_evaluation_json_method(
+                                company_id, period, kid, username, user_data, 
+                                vals_p, vals_pot, avg_p, avg_pot, cat, plan, 
+                                all_answers, False, target_status
+                            )
+                            
+                            if success:
+                                if is_final: st.balloons()
+                                st.toast(f"Procjena za {emp['ime_prezime']}: {target_status}", icon="✅")
+                                refresh_panel(f"eval_{kid}", load_team_evaluations([kid], period, company_id)[kid],
+                                              _load_status(kid, period, company_id))
+                            else: st.error(msg)
+
+            with tab_gap:
+                if ev['self'] is not None:
+                    # Ocjene obje procjene po pitanju iz evaluation_answers (jedan upit, bez json.loads)
+                    answers = load_answer_gap(company_id, period, kid)
+                    
+                    gap_data = []
+                    for q in survey_data['p'] + survey_data['pot']:
+                        a = answers.get(str(q['id']), {})
+                        s_mgr = int(a.get('mgr') or 0)
+                        s_emp = int(a.get('self') or 0)
+                        gap_data.append({"Pitanje": q['title'], "Radnik": s_emp, "Manager": s_mgr, "Razlika": s_mgr - s_emp})
+                    st.table(pd.DataFrame(gap_data))
+                else: st.warning("Radnik još nije ispunio samoprocjenu.")
+
+@st.fragment
+def _idp_panel(emp, status, company_id, period, username):
+    """IDP forma jednog zaposlenika; spremanje ponovno izvodi samo ovaj panel."""
+    eid = emp['kadrovski_broj']
+    with profiler.fragment("👔 Voditeljski pogled › 🚀 IDP (panel)", username):
+        status = panel_status(f"idp_{eid}", status)
+        # Ikonica ovisno o statusu
+        status_icon = "🟢" if status['idp_status'] == 'Active' else "⚪"
+        
+        # Expander po zaposleniku
+        with panel_expander(f"{status_icon} {emp['ime_prezime']} ({emp['radno_mjesto']})", f"idp_{eid}") as box:
+            if not box.open: return
+            d = panel_data(f"idp_{eid}", lambda: load_team_development_plans([eid], period)[eid]) or {}
+            with st.form(f"idp_form_{eid}"):
+                st.subheader("1. Dijagnoza i Smjer")
+                c1, c2 = st.columns(2)
+                with c1:
+                    new_strengths = st.text_area("💪 Ključne Snage", value=d.get('strengths',''), height=100, help="U čemu je zaposlenik izniman?", key=f"s_{eid}")
+                with c2:
+                    new_areas = st.text_area("🚧 Područja za razvoj", value=d.get('areas_improve',''), height=100, help="Što koči zaposlenika ili što mu nedostaje?", key=f"w_{eid}")
+                
+                new_goal = st.text_input("🎯 Karijerni cilj (kratkoročni/dugoročni)", value=d.get('career_goal',''), help="Koju poziciju ili razinu stručnosti ciljamo?", key=f"g_{eid}")
+                
+                st.markdown("---")
+                st.subheader("2. Akcijski plan (70-20-10 Model)")
+                
+                st.info("📌 **70% - Učenje kroz rad (Iskustvo)**\n\nNovi zadaci, projekti, rotacije, povećanje odgovornosti.")
+                d70 = st.data_editor(get_df_from_json(d.get('json_70',''), ["Što razviti?", "Aktivnost", "Rok", "Dokaz"]), key=f"d70_{eid}", num_rows="dynamic", use_container_width=True)
+                
+                st.info("👥 **20% - Učenje od drugih (Izloženost)**\n\nMentoring, coaching, feedback, shadowing, networking.")
+                d20 = st.data_editor(get_df_from_json(d.get('json_20',''), ["Što razviti?", "Aktivnost", "Rok"]), key=f"d20_{eid}", num_rows="dynamic", use_container_width=True)
+                
+                st.info("📚 **10% - Formalna edukacija**\n\nTečajevi, certifikati, knjige, konferencije.")
+                d10 = st.data_editor(get_df_from_json(d.get('json_10',''), ["Edukacija", "Trošak", "Rok"]), key=f"d10_{eid}", num_rows="dynamic", use_container_width=True)
+                
+                st.markdown("---")
+                st.subheader("3. Podrška i Resursi")
+                
+                sc1, sc2 = st.columns(2)
+                with sc1:
+                    supp_opts = ["---", "Mentoring (Interni)", "Coaching (Vanjski)", "Budžet za edukaciju", "Slobodni dani za učenje", "Rotacija posla", "Tehnička oprema"]
+                    curr_supp = d.get('support_needed', '---')
+                    if curr_supp not in supp_opts: curr_supp = "---"
+                    new_supp = st.selectbox("Primarna vrsta podrške:", supp_opts, index=supp_opts.index(curr_supp), key=f"supp_{eid}")
+                
+                with sc2:
+                    new_notes = st.text_area("Dodatne napomene / Detalji podrške:", value=d.get('support_notes',''), key=f"notes_{eid}")
+
+                st.markdown("---")
+                if st.form_submit_button("💾 Spremi Razvojni Plan"):
+                    save_development_plan(company_id, period, eid, username, {
+                        'strengths': new_strengths, 'areas_improve': new_areas, 'career_goal': new_goal,
+                        'json_70': table_to_json_string(d70), 'json_20': table_to_json_string(d20), 'json_10': table_to_json_string(d10),
+                        'support_needed': new_supp, 'support_notes': new_notes, 'status': 'Active'})
+                    st.toast(f"IDP za {emp['ime_prezime']} spremljen!", icon="✅")
+                    refresh_panel(f"idp_{eid}", load_team_development_plans([eid], period)[eid], _load_status(eid, period, company_id))
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# Testovi se pokreću iz korijena repozitorija (pytest ili python -m pytest), kao i main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,31 @@
+# tests/test_importer.py
+from modules.importer import _hierarchy_rejects, REJECT_CYCLE, REJECT_DANGLING
+
+
+def test_rejected_managers_cascade_to_their_reports():
+    rows = {"A": "B", "B": "A", "C": "A", "D": "E", "E": "ZZZ"}
+    assert _hierarchy_rejects({}, rows) == {
+        "A": REJECT_CYCLE, "B": REJECT_CYCLE, "E": REJECT_DANGLING, "C": REJECT_DANGLING, "D": REJECT_DANGLING,
+    }
+
+
+def test_cascade_through_several_levels():
+    rows = {"A": "MISSING", "B": "A", "C": "B", "D": ""}
+    assert _hierarchy_rejects({}, rows) == {"A": REJECT_DANGLING, "B": REJECT_DANGLING, "C": REJECT_DANGLING}
+
+
+def test_rejected_existing_employee_keeps_reports_valid():
+    # X postoji u bazi; njegov novi red je odbijen, ali X ostaje pa Y smije prijavljivati njemu
+    parent = {"X": "BOSS", "BOSS": ""}
+    rows = {"X": "ZZZ", "Y": "X"}
+    assert _hierarchy_rejects(parent, rows) == {"X": REJECT_DANGLING}
+
+
+def test_cycle_with_existing_hierarchy():
+    parent = {"M": "N", "N": ""}
+    rows = {"N": "M", "P": "N"}
+    assert _hierarchy_rejects(parent, rows) == {"N": REJECT_CYCLE}
+
+
+def test_valid_hierarchy_has_no_rejects():
+    assert _hierarchy_rejects({"BOSS": ""}, {"A": "BOSS", "B": "A", "C": ""}) == {}
@@ -0,0 +1,237 @@
+# tools/benchmark.py
+"""Benchmark pristupa podacima iza pogleda, na više veličina generiranih baza.
+
+Za svaku skalu se (jednom, pa se čuva u --data-dir) generira baza alatom generate_data.py,
+a mjerenja se rade u zasebnom procesu s TALENT_DB_FILE na tu bazu (čisti cachevi po skali).
+Rezultat se uspoređuje sa spremljenom baseline datotekom; regresija je medijan sporiji od
+baselinea za više od --tolerance (i više od NOISE_FLOOR_MS), i tada je izlazni kod 1.
+Izlazni kod je 1 i kad baseline datoteka (tools/benchmark_baseline.json, u repozitoriju)
+ne postoji ili nema neku od traženih skala.
+
+    python tools/benchmark.py --scales small,medium           # mjerenje + usporedba
+    python tools/benchmark.py --scales small --save-baseline  # spremi novi baseline
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# (tvrtki, zaposlenika po tvrtki, razdoblja)
+SCALES = {
+    "small": (1, 500, 4),
+    "medium": (2, 5000, 4),
+    "large": (4, 20000, 6),
+}
+SEED = 42
+DEFAULT_BASELINE = os.path.join(ROOT, "tools", "benchmark_baseline.json")
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "talent_bench")
+NOISE_FLOOR_MS = 5.0
+
+
+# --- SLUČAJEVI (izvode se u procesu s TALENT_DB_FILE) ---
+def _cases():
+    """{naziv: funkcija} - svaki slučaj je pristup podacima jednog pogleda za tvrtku 1."""
+    import pandas as pd
+    from modules import bootstrap, cache
+    from modules.database import read_connection, get_active_period_info
+    from modules.repository import (
+        load_team_goals, load_team_evaluations, load_team_status, load_ninebox_summary, load_team_development_plans,
+        load_ninebox_cells, get_team, get_company_employees, get_submitted_evaluations,
+        load_question_stats, load_score_distribution
+    )
+    from modules.history import get_history, employee_trail, transition_matrix
+    from modules.exporter import export_to_file
+    from modules.importer import import_employees, IMPORT_COLUMNS
+    from modules.utils import make_hashes
+    from modules.constants import DEFAULT_PASSWORD, EMPLOYEE_PAGE_SIZE, NINEBOX_PAGE_SIZE
+
+    # Spremljena baza može biti starije sheme - migrira se kao pri pokretanju aplikacije
+    bootstrap.ensure_ready()
+    company_id = 1
+    period, _ = get_active_period_info(company_id)
+    with read_connection() as conn:
+        manager = conn.execute("""SELECT manager_id FROM employees_master WHERE company_id=? AND manager_id != ''
+                                  GROUP BY manager_id ORDER BY COUNT(*) DESC, manager_id LIMIT 1""", (company_id,)).fetchone()[0]
+        employees = pd.read_sql_query(f"SELECT {', '.join(IMPORT_COLUMNS)} FROM employees_master WHERE company_id=? AND kadrovski_broj != 'admin'",
+                                      conn, params=(company_id,))
+    password = make_hashes(DEFAULT_PASSWORD)
+
+    def cold():
+        for scope in (cache.PERIOD_SCOPE, cache.SURVEY_SCOPE, cache.HISTORY_SCOPE):
+            cache.invalidate(scope)
+
+    def manager_dashboard():
+        team = get_team(manager, company_id)
+        load_ninebox_summary(company_id, period, manager_id=manager)
+        load_ninebox_cells(company_id, period, manager_id=manager)
+        employee_trail(company_id, team['kadrovski_broj'].iloc[0])
+
+    def evaluation_list():
+        ids = get_team(manager, company_id)['kadrovski_broj'].tolist()
+        load_team_evaluations(ids, period, company_id)
+        load_team_goals(ids, period)
+
+    def idp_list():
+        load_team_development_plans(get_company_employees(company_id)['kadrovski_broj'].tolist(), period)
+
+    def idp_page():
+        # HR pregled IDP-a: zaglavlja jedne stranice iz status upita + jedan otvoreni panel
+        ids = get_company_employees(company_id)['kadrovski_broj'].tolist()[:EMPLOYEE_PAGE_SIZE]
+        load_team_status(ids, period, company_id)
+        load_team_development_plans(ids[:1], period)
+
+    def hr_dashboard():
+        # Metrike i kategorije iz agregata, 9-box iz brojeva po ćeliji, tablica i ćelija po stranici
+        load_ninebox_summary(company_id, period)
+        load_ninebox_cells(company_id, period)
+        get_submitted_evaluations(company_id, period, limit=NINEBOX_PAGE_SIZE)
+        get_submitted_evaluations(company_id, period, cell=4, limit=NINEBOX_PAGE_SIZE)
+
+    def question_stats():
+        # HR tab "Po Pitanjima": prosjeci, gap i distribucija iz evaluation_answers
+        load_question_stats(company_id, period)
+        load_score_distribution(company_id, period)
+
+    def history_cold():
+        cold()
+        get_history(company_id)
+        transition_matrix(company_id, to_period=period)
+
+    def export(fmt):
+        def run():
+            path, _ = export_to_file(fmt, company_id)
+            os.remove(path)
+        return run
+
+    def import_unchanged():
+        # Ponovni import istih zaposlenika: staging, validacija i usporedba, bez promjena u bazi
+        import_employees([(employees, 1.0)], company_id, password)
+
+    return {
+        "manager_dashboard": manager_dashboard,
+        "evaluation_list": evaluation_list,
+        "hr_dashboard": hr_dashboard,
+        "idp_list": idp_list,
+        "idp_page": idp_page,
+        "question_stats": question_stats,
+        "history_cold": history_cold,
+        "export_csv": export("csv"),
+        "export_xlsx": export("xlsx"),
+        "import_unchanged": import_unchanged,
+    }
+
+
+def run_worker(repeat):
+    """Mjeri sve slučajeve (1 zagrijavanje + repeat mjerenja) i ispisuje JSON na stdout."""
+    results = {}
+    for name, fn in _cases().items():
+        fn()
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            times.append((time.perf_counter() - t0) * 1000)
+        results[name] = {"median_ms": round(statistics.median(times), 3), "min_ms": round(min(times), 3)}
+    print(json.dumps(results))
+
+
+# --- ORKESTRACIJA ---
+def ensure_database(scale, data_dir):
+    companies, employees, periods = SCALES[scale]
+    path = os.path.join(data_dir, f"bench_{scale}_c{companies}_e{employees}_p{periods}_s{SEED}.db")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"[{scale}] generiranje baze {path} ...", flush=True)
+        subprocess.run([sys.executable, os.path.join(ROOT, "tools", "generate_data.py"), path,
+                        "--companies", str(companies), "--employees", str(employees),
+                        "--periods", str(periods), "--seed", str(SEED)],
+                       check=True, stdout=subprocess.DEVNULL)
+    return path
+
+
+def measure(scale, data_dir, repeat):
+    db_file = ensure_database(scale, data_dir)
+    env = dict(os.environ, TALENT_DB_FILE=db_file)
+    env.pop("TALENT_PROFILE", None)
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", "--repeat", str(repeat)],
+                         env=env, check=True, capture_output=True, text=True, cwd=ROOT)
+    # init_db/migracije mogu ispisati poruke - rezultat je zadnji redak
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """Ispisuje tablicu i vraća listu regresija [(skala, slučaj, baseline_ms, sada_ms)]."""
+    regressions = []
+    print(f"{'skala':<8} {'slučaj':<20} {'medijan ms':>11} {'min ms':>9} {'baseline':>10} {'promjena':>9}")
+    for scale, cases in results.items():
+        for name, r in cases.items():
+            base = baseline.get(scale, {}).get(name)
+            change, flag = "", ""
+            if base is not None:
+                change = f"{(r['median_ms'] / base - 1) * 100:+.0f}%" if base else ""
+                if r["median_ms"] > base * (1 + tolerance) and r["median_ms"] - base > NOISE_FLOOR_MS:
+                    regressions.append((scale, name, base, r["median_ms"]))
+                    flag = "  REGRESIJA"
+            base_txt = f"{base:.1f}" if base is not None else "-"
+            print(f"{scale:<8} {name:<20} {r['median_ms']:>11.1f} {r['min_ms']:>9.1f} {base_txt:>10} {change:>9}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pristupa podacima Talent App")
+    parser.add_argument("--scales", default="small,medium", help=f"popis skala odvojen zarezom ({', '.join(SCALES)})")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="zapiši rezultate kao novi baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="dopušteno usporenje (0.25 = 25%%)")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args.repeat)
+        return 0
+
+    scales = [s.strip() for s in args.scales.split(",") if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"nepoznate skale: {', '.join(unknown)}")
+    results = {scale: measure(scale, args.data_dir, args.repeat) for scale in scales}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = {scale: {name: v["median_ms"] for name, v in cases.items()} for scale, cases in json.load(f).items()}
+    regressions = compare(results, baseline, args.tolerance)
+    # Bez baselinea nema usporedbe - to ne smije proći kao "bez regresija"
+    missing = [scale for scale in scales if scale not in baseline]
+
+    if args.save_baseline:
+        saved = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                saved = json.load(f)
+        saved.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(saved, f, indent=1)
+        print(f"Baseline spremljen u {args.baseline}")
+        return 0
+    if missing:
+        print(f"UPOZORENJE: {args.baseline} nema baseline za skale: {', '.join(missing)} "
+              f"(spremite ga s --save-baseline)", file=sys.stderr)
+        return 1
+    if regressions:
+        print(f"{len(regressions)} regresija iznad {args.tolerance:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+# tools/generate_data.py
+"""Generator sintetičkih podataka za testiranje performansi.
+
+Puni novu bazu točno shemom iz init_db: N tvrtki s M zaposlenika (hijerarhija voditelja po
+odjelima), P razdoblja procjena s json_answers, ciljevi s KPI-evima, IDP-ovi, pohvale i audit log.
+Isti seed uvijek daje istu bazu (i datumi su fiksni, ne ovise o današnjem danu), osim datuma
+audit loga: on pada unutar retencije AUDIT_RETENTION_MONTHS prije dana generiranja, pa ga
+bootstrap pri pokretanju ne arhivira.
+
+    python tools/generate_data.py /tmp/talent_big.db --companies 2 --employees 5000 --periods 4 --seed 42
+
+Svi računi imaju lozinku DEFAULT_PASSWORD; HR korisnik tvrtke je 'hr<id>', a SuperAdmin 'admin'.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIRST_NAMES = ["Ana", "Ivan", "Marija", "Luka", "Petra", "Marko", "Ivana", "Josip", "Maja", "Tomislav",
+               "Lucija", "Filip", "Katarina", "Matej", "Nikolina", "Ante", "Martina", "Karlo", "Sara", "Domagoj"]
+LAST_NAMES = ["Horvat", "Kovačević", "Babić", "Marić", "Jurić", "Novak", "Kovačić", "Knežević", "Vuković", "Marković",
+              "Petrović", "Matić", "Tomić", "Pavlović", "Kovač", "Božić", "Blažević", "Grgić", "Pavić", "Radić"]
+DEPARTMENTS = ["IT", "Prodaja", "Financije", "Logistika", "Marketing", "Proizvodnja", "Nabava", "Pravni", "Korisnička podrška"]
+POSITIONS = ["Referent", "Stručni suradnik", "Specijalist", "Analitičar", "Inženjer", "Koordinator"]
+GOAL_TITLES = ["Povećati prodaju", "Smanjiti troškove", "Uvesti novi proces", "Završiti projekt", "Poboljšati kvalitetu",
+               "Skratiti vrijeme isporuke", "Edukacija tima", "Automatizirati izvještaje"]
+GOAL_STATUSES = ["On Track", "At Risk", "Off Track", "Completed"]
+AUDIT_ACTIONS = ["LOGIN", "SAVE_EVAL", "SAVE_GOAL", "SAVE_IDP", "EXPORT", "IMPORT"]
+
+P_IDS = ["P1", "P2", "P3", "P4", "P5"]
+POT_IDS = ["POT1", "POT2", "POT3", "POT4", "POT5"]
+
+# Zadnje (aktivno) razdoblje; prethodna idu unatrag po kvartalima
+LAST_PERIOD = (2026, 4)
+
+
+def build_periods(count):
+    """[(naziv, start_date, deadline, end_date)] za count kvartala koji završavaju s LAST_PERIOD."""
+    year, q = LAST_PERIOD
+    out = []
+    for _ in range(count):
+        start = date(year, 3 * q - 2, 1)
+        end = (date(year + 1, 1, 1) if q == 4 else date(year, 3 * q + 1, 1)) - timedelta(days=1)
+        out.append((f"{year}-Q{q}", start.isoformat(), end.isoformat(), end.isoformat()))
+        year, q = (year - 1, 4) if q == 1 else (year, q - 1)
+    return out[::-1]
+
+
+def build_hierarchy(rng, company_id, size):
+    """Zaposlenici jedne tvrtke: direktor, voditelji odjela i timovi od 3-8 ljudi po voditelju."""
+    ids = [str(company_id * 1_000_000 + i) for i in range(1, size + 1)]
+    manager = {ids[0]: ""}
+    dept = {ids[0]: "Uprava"}
+    # Red voditelja (BFS): svaki novi zaposlenik ide u tim prvog voditelja s praznim mjestom,
+    # a zatim i sam postaje voditelj s timom od 3-8 ljudi
+    queue = deque()
+    for i, kid in enumerate(ids[1:], start=1):
+        if i <= len(DEPARTMENTS):
+            # Voditelji odjela su izravno ispod direktora
+            manager[kid], dept[kid] = ids[0], DEPARTMENTS[i - 1]
+        else:
+            slot = queue[0]
+            manager[kid], dept[kid] = slot[0], dept[slot[0]]
+            slot[1] -= 1
+            if slot[1] == 0: queue.popleft()
+        queue.append([kid, rng.randint(3, 8)])
+    managers = set(manager.values())
+    rows = []
+    for kid in ids:
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        is_mgr = 1 if kid in managers else 0
+        position = "Direktor" if kid == ids[0] else ("Voditelj" if is_mgr else rng.choice(POSITIONS))
+        rows.append((kid, name, position, dept[kid], manager[kid], company_id, is_mgr, 1))
+    return rows
+
+
+def _scores(rng, perf, pot, bias=0.0):
+    answers = {q: min(5, max(1, round(rng.gauss(perf + bias, 0.6)))) for q in P_IDS}
+    answers.update({q: min(5, max(1, round(rng.gauss(pot + bias, 0.6)))) for q in POT_IDS})
+    avg_p = round(sum(answers[q] for q in P_IDS) / len(P_IDS), 2)
+    avg_pot = round(sum(answers[q] for q in POT_IDS) / len(POT_IDS), 2)
+    return answers, avg_p, avg_pot
+
+
+def build_company_data(rng, company_id, employees, periods, audit_rows, audit_from, audit_days):
+    """Procjene, ciljevi (+KPI), IDP-ovi, pohvale i audit redovi (audit_days dana od audit_from) za jednu tvrtku."""
+    from modules.utils import calculate_category
+    evals, goals, idps, recognitions, audit = [], [], [], [], []
+    traits = {e[0]: [rng.uniform(2.0, 4.6), rng.uniform(2.0, 4.6)] for e in employees}
+    last = len(periods) - 1
+    for pi, (period, start, deadline, _) in enumerate(periods):
+        active = pi == last
+        for kid, name, position, dept, manager_id, _, _, _ in employees:
+            if not manager_id: continue
+            t = traits[kid]
+            t[0] = min(5.0, max(1.0, t[0] + rng.gauss(0, 0.25)))
+            t[1] = min(5.0, max(1.0, t[1] + rng.gauss(0, 0.25)))
+            # Voditeljska procjena: u prošlim razdobljima zaključana, u aktivnom dio tek započet
+            if not active or rng.random() < 0.6:
+                answers, avg_p, avg_pot = _scores(rng, t[0], t[1])
+                status = "Submitted" if not active or rng.random() < 0.65 else "Draft"
+                evals.append((period, kid, name, position, dept, manager_id, avg_p, avg_pot,
+                              calculate_category(avg_p, avg_pot), "", status, deadline, company_id, 0,
+                              json.dumps(answers, ensure_ascii=False)))
+            if not active or rng.random() < 0.5:
+                answers, avg_p, avg_pot = _scores(rng, t[0], t[1], bias=0.3)
+                evals.append((period, kid, name, position, dept, "Self", avg_p, avg_pot,
+                              calculate_category(avg_p, avg_pot), "", "Submitted" if rng.random() < 0.8 else "Draft",
+                              deadline, company_id, 1, json.dumps(answers, ensure_ascii=False)))
+
+            n_goals = rng.randint(1, 4)
+            weights = [100 // n_goals] * n_goals
+            weights[0] += 100 - sum(weights)
+            for w in weights:
+                progress = 100.0 if not active and rng.random() < 0.5 else round(rng.uniform(0, 100), 1)
+                kpis = [(rng.choice(GOAL_TITLES), 50, round(rng.uniform(0, 100), 1), deadline)
+                        for _ in range(rng.randint(0, 3))]
+                goals.append(((period, kid, manager_id, rng.choice(GOAL_TITLES), "", w, progress,
+                               rng.choice(GOAL_STATUSES), start, deadline, company_id), kpis))
+
+            if rng.random() < 0.7:
+                j70 = [{"Što razviti?": rng.choice(GOAL_TITLES), "Aktivnost": "Rad na projektu", "Rok": deadline, "Dokaz": ""}]
+                j20 = [{"Što razviti?": "Mentorstvo", "Aktivnost": "Sastanci s mentorom", "Rok": deadline}]
+                j10 = [{"Edukacija": "Tečaj", "Trošak": str(rng.randint(1, 20) * 50), "Rok": deadline}]
+                idps.append((period, kid, manager_id, "Stručnost", "Komunikacija", rng.choice(POSITIONS),
+                             json.dumps(j70, ensure_ascii=False), json.dumps(j20, ensure_ascii=False),
+                             json.dumps(j10, ensure_ascii=False), "", "", "Active", company_id))
+
+    ids = [e[0] for e in employees]
+    first_day = date.fromisoformat(periods[0][1])
+    span = (date.fromisoformat(periods[-1][3]) - first_day).days + 1
+    for _ in range(len(ids) // 2):
+        ts = (first_day + timedelta(days=rng.randrange(span))).isoformat() + " 10:00:00"
+        recognitions.append((rng.choice(ids), rng.choice(ids), "Hvala na pomoći!", ts, company_id))
+    for _ in range(audit_rows):
+        ts = f"{audit_from + timedelta(days=rng.randrange(audit_days))} {rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}"
+        audit.append((ts, rng.choice(ids), rng.choice(AUDIT_ACTIONS), "Generirani zapis", company_id))
+    audit.sort()
+    return evals, goals, idps, recognitions, audit
+
+
+def generate(db_file, companies=1, employees=500, periods=4, seed=42, audit_per_employee=5):
+    """Kreira novu bazu db_file s generiranim podacima. Vraća {tablica: broj redova}."""
+    if os.path.exists(db_file):
+        raise FileExistsError(f"{db_file} već postoji")
+    os.environ["TALENT_DB_FILE"] = db_file
+    from modules import database
+    from modules.utils import make_hashes
+    from modules.constants import DEFAULT_PASSWORD, AUDIT_RETENTION_MONTHS
+    if database.DB_FILE != db_file:
+        raise RuntimeError("modules.database je već učitan s drugom bazom - pokrenite generator u novom procesu")
+
+    database.init_db()
+    rng = random.Random(seed)
+    period_rows = build_periods(periods)
+    password = make_hashes(DEFAULT_PASSWORD)
+    # Audit log od početka mjeseca nakon granice retencije do jučer (mjesec zalihe za kasnija pokretanja)
+    today = date.today()
+    year, month = divmod(today.year * 12 + today.month - AUDIT_RETENTION_MONTHS, 12)
+    audit_from = date(year, month + 1, 1)
+
+    with database.write_connection() as conn:
+        # init_db kreira početno razdoblje s današnjim datumom - zamjenjujemo ga generiranim
+        conn.execute("DELETE FROM periods")
+        conn.execute("DELETE FROM app_settings")
+        conn.executemany("INSERT INTO periods (period_name, start_date, deadline, end_date, is_active, company_id) VALUES (?,?,?,?,?,1)",
+                         [(name, start, dl, end, 1 if i == len(period_rows) - 1 else 0) for i, (name, start, dl, end) in enumerate(period_rows)])
+        conn.execute("INSERT INTO app_settings (setting_key, setting_value, company_id) VALUES ('active_period', ?, 1)", (period_rows[-1][0],))
+        conn.execute("INSERT INTO employees_master VALUES ('admin', 'System Admin', 'Admin', 'System', '', 1, 0, 1)")
+        conn.execute("INSERT INTO users VALUES ('admin', ?, 'SuperAdmin', 'System', 1)", (password,))
+
+    for cid in range(1, companies + 1):
+        with database.write_connection() as conn:
+            conn.execute("INSERT INTO companies (id, name, subdomain, plan_type) VALUES (?, ?, ?, 'Enterprise')",
+                         (cid, f"Tvrtka {cid}", f"tvrtka{cid}"))
+            staff = build_hierarchy(rng, cid, employees)
+            conn.executemany("INSERT INTO employees_master VALUES (?,?,?,?,?,?,?,?)", staff)
+            conn.execute("INSERT INTO employees_master VALUES (?, 'HR Voditelj', 'HR Manager', 'HR', '', ?, 0, 1)", (f"hr{cid}", cid))
+            conn.execute("INSERT INTO users VALUES (?, ?, 'HR', 'HR', ?)", (f"hr{cid}", password, cid))
+
+            evals, goals, idps, recognitions, audit = build_company_data(
+                rng, cid, staff, period_rows, employees * audit_per_employee, audit_from, (today - audit_from).days)
+            conn.executemany("""INSERT INTO evaluations (period, kadrovski_broj, ime_prezime, radno_mjesto, department, manager_id,
+                                avg_performance, avg_potential, category, action_plan, status, feedback_date, company_id, is_self_eval, json_answers)
+                                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)""", evals)
+            for goal, kpis in goals:
+                goal_id = conn.execute("""INSERT INTO goals (period, kadrovski_broj, manager_id, title, description, weight, progress,
+                                          status, last_updated, deadline, company_id) VALUES (?,?,?,?,?,?,?,?,?,?,?)""", goal).lastrowid
+                if kpis:
+                    conn.executemany("INSERT INTO goal_kpis (goal_id, description, weight, progress, deadline) VALUES (?,?,?,?,?)",
+                                     [(goal_id,) + k for k in kpis])
+            conn.executemany("""INSERT INTO development_plans (period, kadrovski_broj, manager_id, strengths, areas_improve, career_goal,
+                                json_70, json_20, json_10, support_needed, support_notes, status, company_id)
+                                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)""", idps)
+            conn.executemany("INSERT INTO recognitions (sender_id, receiver_id, message, timestamp, company_id) VALUES (?,?,?,?,?)", recognitions)
+            conn.executemany("INSERT INTO audit_log (timestamp, user, action, details, company_id) VALUES (?,?,?,?,?)", audit)
+        database.sync_user_accounts(cid, password)
+
+    database.rebuild_ninebox_agg()
+    database.rebuild_evaluation_answers()
+    with database.write_connection() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        tables = ["employees_master", "users", "evaluations", "goals", "goal_kpis", "development_plans",
+                  "recognitions", "audit_log", "ninebox_agg", "evaluation_answers"]
+        return {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in tables}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generator sintetičkih podataka za Talent App")
+    parser.add_argument("db_file", help="putanja nove baze (ne smije postojati, osim uz --force)")
+    parser.add_argument("--companies", type=int, default=1)
+    parser.add_argument("--employees", type=int, default=500, help="zaposlenika po tvrtki")
+    parser.add_argument("--periods", type=int, default=4, help="broj kvartala s procjenama")
+    parser.add_argument("--audit-per-employee", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true", help="obriši postojeću bazu")
+    args = parser.parse_args(argv)
+
+    db_file = os.path.abspath(args.db_file)
+    if args.force:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_file + suffix): os.remove(db_file + suffix)
+    t0 = time.perf_counter()
+    counts = generate(db_file, args.companies, args.employees, args.periods, args.seed, args.audit_per_employee)
+    print(f"Baza {db_file} generirana za {time.perf_counter() - t0:.1f}s")
+    for table, n in counts.items():
+        print(f"  {table:<18} {n:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# tools/import_benchmark.py
+"""Benchmark vremena importa (python -X importtime) za put prijave i pojedine poglede.
+
+Svaki cilj se uvozi u svježem procesu (nakon streamlita, koji worker ionako učita) i mjeri se
+samo vrijeme koje dodaje aplikacija. Rezultat (medijan ponavljanja + najskuplji paketi) se
+uspoređuje sa spremljenim digestom u tools/import_baseline.json; regresija je cilj sporiji od
+baselinea za više od --tolerance (i više od NOISE_FLOOR_MS) ili teški modul na putu prijave.
+Tada je izlazni kod 1.
+
+    python tools/import_benchmark.py                  # mjerenje + usporedba s digestom
+    python tools/import_benchmark.py --save-baseline  # spremi novi digest
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Ono što main.py uvozi prije prijave; pogledi se uvoze tek kad su odabrani (main.load_view)
+LOGIN_MODULES = ["modules.database", "modules.auth", "modules.profiler", "modules.bootstrap"]
+TARGETS = {
+    "login": LOGIN_MODULES,
+    "views_emp": LOGIN_MODULES + ["modules.views_emp"],
+    "views_mgr": LOGIN_MODULES + ["modules.views_mgr"],
+    "views_hr": LOGIN_MODULES + ["modules.views_hr"],
+    "views_admin": LOGIN_MODULES + ["modules.views_admin"],
+}
+# Paketi koji ne smiju biti na putu prijave
+LOGIN_FORBIDDEN = ("pandas", "numpy", "plotly.express", "pyarrow", "openpyxl", "xlsxwriter")
+DEFAULT_BASELINE = os.path.join(ROOT, "tools", "import_baseline.json")
+NOISE_FLOOR_MS = 20.0
+TOP_PACKAGES = 8
+
+
+def _parse(stderr):
+    """[(self_us, cumulative_us, dubina, modul)] iz izlaza -X importtime (dubina 0 = import iz -c)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line: continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(self_us), int(cum_us), depth, name.strip()))
+    return rows
+
+
+def _packages(rows):
+    """Vrijeme po paketu: vanjski paket se broji kad ga izravno uvozi modul aplikacije (ili -c),
+    a 'modules' je vlastito (self) vrijeme modula aplikacije."""
+    packages = {"modules": 0}
+    stack = []
+    # -X importtime ispisuje dijete prije roditelja, pa se roditelj traži unatrag
+    for self_us, cum_us, depth, name in reversed(rows):
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        parent = stack[-1][1].split(".")[0] if stack else None
+        root = name.split(".")[0]
+        if root == "modules":
+            packages["modules"] += self_us
+        elif parent in (None, "modules"):
+            packages[root] = packages.get(root, 0) + cum_us
+        stack.append((depth, name))
+    return packages
+
+
+def measure_once(modules, db_file):
+    code = "import streamlit\nimport sys; sys.stderr.write('--- app ---\\n')\n" + "".join(f"import {m}\n" for m in modules)
+    env = dict(os.environ, TALENT_DB_FILE=db_file)
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env, cwd=ROOT,
+                         check=True, capture_output=True, text=True)
+    app = _parse(out.stderr.split("--- app ---", 1)[1])
+    return {
+        "total_ms": sum(r[1] for r in app if r[2] == 0) / 1000,
+        "loaded": {r[3] for r in app},
+        "packages": {k: v / 1000 for k, v in _packages(app).items()},
+    }
+
+
+def measure(name, repeat, db_file):
+    runs = [measure_once(TARGETS[name], db_file) for _ in range(repeat)]
+    packages = {k: statistics.median(r["packages"].get(k, 0) for r in runs) for k in runs[0]["packages"]}
+    top = sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:TOP_PACKAGES]
+    return {
+        "median_ms": statistics.median(r["total_ms"] for r in runs),
+        "min_ms": min(r["total_ms"] for r in runs),
+        "modules": len(runs[0]["loaded"]),
+        "top": {k: round(v, 1) for k, v in top},
+        "forbidden": [m for m in LOGIN_FORBIDDEN if m in runs[0]["loaded"]] if name == "login" else [],
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Ispisuje tablicu i vraća listu regresija [(cilj, opis)]."""
+    regressions = []
+    print(f"{'cilj':<12} {'medijan ms':>11} {'min ms':>9} {'modula':>7} {'baseline':>10} {'promjena':>9}  najskuplji paketi")
+    for name, r in results.items():
+        base = baseline.get(name, {}).get("median_ms")
+        change, flag = "", ""
+        if base:
+            change = f"{(r['median_ms'] / base - 1) * 100:+.0f}%"
+            if r["median_ms"] > base * (1 + tolerance) and r["median_ms"] - base > NOISE_FLOOR_MS:
+                regressions.append((name, f"{base:.0f} ms -> {r['median_ms']:.0f} ms"))
+                flag = "  REGRESIJA"
+        if r["forbidden"]:
+            regressions.append((name, f"teški moduli na putu prijave: {', '.join(r['forbidden'])}"))
+            flag += f"  UVOZI {', '.join(r['forbidden'])}"
+        top = ", ".join(f"{k} {v:.0f}" for k, v in list(r["top"].items())[:4])
+        base_txt = f"{base:.1f}" if base else "-"
+        print(f"{name:<12} {r['median_ms']:>11.1f} {r['min_ms']:>9.1f} {r['modules']:>7} {base_txt:>10} {change:>9}  {top}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark vremena importa Talent App")
+    parser.add_argument("--targets", default=",".join(TARGETS), help=f"popis ciljeva odvojen zarezom ({', '.join(TARGETS)})")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="zapiši rezultate kao novi digest")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="dopušteno usporenje (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = [t for t in targets if t not in TARGETS]
+    if unknown:
+        parser.error(f"nepoznati ciljevi: {', '.join(unknown)}")
+    # Import ne smije dirati pravu bazu (modul database samo računa putanje, ali za svaki slučaj)
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {t: measure(t, args.repeat, os.path.join(tmp, "import_bench.db")) for t in targets}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=1)
+        print(f"Digest spremljen u {args.baseline}")
+        return 0
+    for name, what in regressions:
+        print(f"{name}: {what}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())